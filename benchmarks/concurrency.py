@@ -0,0 +1,151 @@
+"""
+Concurrency benchmark: sync (WSGI) versus async (ASGI) serving.
+
+Drives concurrent ``GET /api/alerts/`` and ``POST /api/events/`` requests
+against a running server and prints throughput and latency percentiles for
+each concurrency level. With ``--compare`` it starts the project under
+gunicorn's sync workers and under uvicorn workers itself, one after the
+other, with the same worker count, so the two modes can be compared on
+the same machine and database:
+
+    python benchmarks/concurrency.py --compare --workers 4 --concurrency 10,50,200
+
+The benchmark user is registered on first use, like verify_api.py does.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'wsgi': ['gunicorn', 'config.wsgi:application'],
+    'asgi': ['gunicorn', '-k', 'uvicorn.workers.UvicornWorker', 'config.asgi:application'],
+}
+
+# Servers started here must not throttle the benchmark itself.
+SERVER_ENV = {
+    f'THROTTLE_{scope}_RATE': '100000000/day' for scope in ('USER', 'ANON', 'QUERY', 'INGEST')
+}
+
+EVENT = {
+    'source': 'Benchmark',
+    'event_type': 'PortScan',
+    'severity': 'LOW',
+    'description': 'Synthetic event from benchmarks/concurrency.py',
+}
+
+
+def login(base_url, username, password):
+    credentials = {'username': username, 'password': password}
+    requests.post(f'{base_url}/api/auth/register/', json={**credentials, 'role': 'ANALYST'})
+    response = requests.post(f'{base_url}/api/auth/login/', json=credentials)
+    response.raise_for_status()
+    return response.json()['access']
+
+
+def run_level(base_url, token, concurrency, total, write_ratio):
+    """Send ``total`` requests from ``concurrency`` threads, return the samples."""
+    local = threading.local()
+    headers = {'Authorization': f'Bearer {token}'}
+    writes_every = round(1 / write_ratio) if write_ratio else 0
+
+    def one(i):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+            session.headers.update(headers)
+        started = time.perf_counter()
+        try:
+            if writes_every and i % writes_every == 0:
+                ok = session.post(f'{base_url}/api/events/', json=EVENT).status_code == 201
+            else:
+                ok = session.get(f'{base_url}/api/alerts/').status_code == 200
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(total)))
+    return samples, time.perf_counter() - started
+
+
+def report(mode, concurrency, samples, elapsed):
+    latencies = sorted(latency for latency, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+
+    def ms(value):
+        return f'{value * 1000:8.1f}'
+
+    print(
+        f'{mode:<6}{concurrency:>6}{len(samples):>8}{errors:>8}{len(samples) / elapsed:>10.1f}'
+        f'{ms(quantiles[49])}{ms(quantiles[94])}{ms(quantiles[98])}'
+    )
+
+
+def wait_until_up(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f'{base_url}/api/alerts/', timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.5)
+    raise SystemExit(f'Server at {base_url} did not come up within {timeout}s')
+
+
+def benchmark(mode, base_url, args):
+    token = login(base_url, args.username, args.password)
+    # Warm up connections, caches and compiled rules before measuring.
+    run_level(base_url, token, 4, 20, args.write_ratio)
+    for concurrency in args.concurrency:
+        samples, elapsed = run_level(base_url, token, concurrency, args.requests, args.write_ratio)
+        report(mode, concurrency, samples, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--compare', action='store_true', help='Start and benchmark WSGI and ASGI servers.')
+    parser.add_argument('--workers', type=int, default=2, help='Worker processes per server with --compare.')
+    parser.add_argument('--port', type=int, default=8100, help='Port for the servers started by --compare.')
+    parser.add_argument(
+        '--concurrency', default='10,50,100',
+        type=lambda value: [int(level) for level in value.split(',')],
+    )
+    parser.add_argument('--requests', type=int, default=1000, help='Requests per concurrency level.')
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='Share of requests that ingest an event.')
+    parser.add_argument('--username', default='bench_analyst')
+    parser.add_argument('--password', default='bench-password-123')
+    args = parser.parse_args()
+
+    print(f"{'mode':<6}{'conc':>6}{'reqs':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}")
+    if not args.compare:
+        benchmark('server', args.base_url.rstrip('/'), args)
+        return
+
+    base_url = f'http://127.0.0.1:{args.port}'
+    for mode, command in SERVERS.items():
+        server = subprocess.Popen(
+            [*command, '--workers', str(args.workers), '--bind', f'127.0.0.1:{args.port}'],
+            cwd=ROOT, env={**os.environ, **SERVER_ENV}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_up(base_url)
+            benchmark(mode, base_url, args)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
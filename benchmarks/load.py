@@ -0,0 +1,242 @@
+"""
+Load benchmark for the ingest and query APIs.
+
+Drives concurrent traffic at each endpoint of a local server in turn and
+reports throughput, p50/p95/p99 latency and the number of SQL queries a
+single request runs. The query counts are measured in-process against the
+same database, with the response cache disabled. Results are saved as
+JSON so runs can be compared between commits:
+
+    python manage.py seed_events --events 1000000
+    python benchmarks/load.py --serve asgi --output benchmarks/results/before.json
+    python benchmarks/load.py --serve asgi --baseline benchmarks/results/before.json
+
+Run it from an environment that points at the server's database, e.g. the
+same DATABASE_URL. The benchmark users are created directly in it.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+from concurrency import ROOT, SERVERS, SERVER_ENV, wait_until_up
+
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from users.tokens import ClaimsAccessToken  # noqa: E402
+
+from monitoring.models import SecurityEvent, Alert  # noqa: E402
+from monitoring.seeding import generate_events, WORDS  # noqa: E402
+
+
+def bench_user(username, **fields):
+    user, _ = get_user_model().objects.update_or_create(username=username, defaults=fields)
+    return str(ClaimsAccessToken.for_user(user))
+
+
+class Scenario:
+    """One endpoint: how to build a request and who sends it."""
+
+    def __init__(self, name, method, build, admin=False):
+        self.name = name
+        self.method = method
+        self.build = build
+        self.admin = admin
+
+
+def scenarios(alert_ids):
+    events = [
+        {'source': e.source, 'event_type': e.event_type, 'severity': e.severity, 'description': e.description}
+        for e in generate_events(10000, days=1, seed=1)
+    ]
+    alert_ids = alert_ids or [0]
+
+    def event(i):
+        return '/api/events/', events[i % len(events)]
+
+    def batch(i):
+        start = i * 100 % len(events)
+        return '/api/events/batch/', events[start:start + 100]
+
+    return [
+        Scenario('ingest', 'POST', event),
+        Scenario('ingest_batch_100', 'POST', batch),
+        Scenario('alert_list', 'GET', lambda _: ('/api/alerts/', None)),
+        Scenario('alert_list_page_size_100', 'GET', lambda _: ('/api/alerts/?page_size=100', None)),
+        Scenario('alert_filter', 'GET', lambda i: (
+            '/api/alerts/?status=%s&event__severity=CRITICAL' % ('OPEN', 'ACKNOWLEDGED')[i % 2], None,
+        )),
+        Scenario('alert_search', 'GET', lambda i: (f'/api/alerts/?search={WORDS[i % len(WORDS)]}', None)),
+        Scenario('alert_detail', 'GET', lambda i: (f'/api/alerts/{alert_ids[i % len(alert_ids)]}/', None)),
+        Scenario('alert_status_update', 'PATCH', lambda i: (
+            f'/api/alerts/{alert_ids[i % len(alert_ids)]}/status/',
+            {'status': ('ACKNOWLEDGED', 'OPEN')[i % 2]},
+        ), admin=True),
+        Scenario('event_stats', 'GET', lambda _: ('/api/stats/?window=24h&by=severity', None)),
+    ]
+
+
+def count_queries(scenario, token):
+    """Run one request in-process and return the number of SQL queries."""
+    client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+    path, body = scenario.build(0)
+    with override_settings(ALERT_CACHE_TIMEOUT=0), CaptureQueriesContext(connection) as ctx:
+        response = client.generic(
+            scenario.method, path, json.dumps(body) if body is not None else '',
+            content_type='application/json',
+        )
+    return len(ctx.captured_queries) if response.status_code < 400 else None
+
+
+def drive(base_url, scenario, token, concurrency, total):
+    local = threading.local()
+
+    def one(i):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+            session.headers['Authorization'] = f'Bearer {token}'
+        path, body = scenario.build(i)
+        started = time.perf_counter()
+        try:
+            response = session.request(scenario.method, base_url + path, json=body)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(total)))
+    return samples, time.perf_counter() - started
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(latency for latency, _ in samples)
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, ok in samples if not ok),
+        'throughput': round(len(samples) / elapsed, 1),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+        'p50_ms': round(cuts[49] * 1000, 2),
+        'p95_ms': round(cuts[94] * 1000, 2),
+        'p99_ms': round(cuts[98] * 1000, 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_row(name, result, baseline=None):
+    queries = '-' if result['queries'] is None else result['queries']
+    line = (
+        f"{name:<26}{result['throughput']:>9.1f}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}"
+        f"{result['p99_ms']:>9.1f}{result['errors']:>7}{queries:>6}"
+    )
+    if baseline:
+        change = (result['p95_ms'] - baseline['p95_ms']) / baseline['p95_ms'] * 100 if baseline['p95_ms'] else 0
+        line += f"   p95 {change:+6.1f}%  req/s {baseline['throughput']:.1f} -> {result['throughput']:.1f}"
+    print(line)
+
+
+def run(args, base_url):
+    analyst = bench_user('bench_analyst', role='ANALYST', is_staff=False)
+    admin = bench_user('bench_admin', role='ADMIN', is_staff=True)
+    alert_ids = list(Alert.objects.order_by('-id').values_list('id', flat=True)[:1000])
+    random.Random(0).shuffle(alert_ids)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['endpoints']
+
+    results = {
+        'commit': git_commit(),
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'base_url': base_url,
+        'database': connection.vendor,
+        'rows': {'events': SecurityEvent.objects.count(), 'alerts': Alert.objects.count()},
+        'concurrency': args.concurrency,
+        'requests_per_endpoint': args.requests,
+        'alert_cache_timeout': settings.ALERT_CACHE_TIMEOUT,
+        'endpoints': {},
+    }
+    print(f"{results['rows']['events']} events, {results['rows']['alerts']} alerts, "
+          f"concurrency {args.concurrency}, {args.requests} requests per endpoint")
+    print(f"{'endpoint':<26}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>7}{'SQL':>6}")
+
+    for scenario in scenarios(alert_ids):
+        if args.only and scenario.name not in args.only:
+            continue
+        token = admin if scenario.admin else analyst
+        queries = count_queries(scenario, token)
+        drive(base_url, scenario, token, min(args.concurrency, 4), 10)  # warm up
+        samples, elapsed = drive(base_url, scenario, token, args.concurrency, args.requests)
+        result = {**summarize(samples, elapsed), 'queries': queries}
+        results['endpoints'][scenario.name] = result
+        print_row(scenario.name, result, baseline.get(scenario.name))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Saved results to {args.output}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--serve', choices=sorted(SERVERS), help='Start a server of this kind for the run.')
+    parser.add_argument('--workers', type=int, default=4, help='Worker processes with --serve.')
+    parser.add_argument('--port', type=int, default=8100, help='Port for the server started by --serve.')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint.')
+    parser.add_argument('--only', nargs='*', help='Endpoint names to run, e.g. alert_list ingest.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    parser.add_argument('--baseline', help='Compare against results saved earlier with --output.')
+    args = parser.parse_args()
+
+    if not args.serve:
+        run(args, args.base_url.rstrip('/'))
+        return
+
+    base_url = f'http://127.0.0.1:{args.port}'
+    server = subprocess.Popen(
+        [*SERVERS[args.serve], '--workers', str(args.workers), '--bind', f'127.0.0.1:{args.port}'],
+        cwd=ROOT, env={**os.environ, **SERVER_ENV}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_up(base_url)
+        run(args, base_url)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
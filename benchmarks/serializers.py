@@ -0,0 +1,80 @@
+"""
+Micro-benchmark of the alert list response body: DRF's ModelSerializer and
+JSONRenderer against the .values() fast path and the orjson renderer.
+
+    python benchmarks/serializers.py --rows 100 --repeat 200
+
+Rows are built in memory, so no database is needed. The two outputs are
+checked to be byte-for-byte identical before timing.
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.utils import timezone  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from monitoring.models import SecurityEvent, Alert  # noqa: E402
+from monitoring.renderers import FastJSONRenderer, orjson  # noqa: E402
+from monitoring.seeding import generate_events  # noqa: E402
+from monitoring.serializers import AlertSerializer, AlertValuesSerializer  # noqa: E402
+
+
+def build_rows(count):
+    now = timezone.now()
+    columns = AlertValuesSerializer.columns()
+    alerts, rows = [], []
+    for pk, seed in enumerate(generate_events(count, days=1), start=1):
+        event = SecurityEvent(pk=pk, **seed._asdict())
+        alert = Alert.for_event(
+            event, pk=pk, status='OPEN', created_at=seed.timestamp,
+            occurrences=pk % 7 + 1, last_seen=now - timedelta(seconds=pk),
+        )
+        alerts.append(alert)
+        rows.append({
+            column: getattr(event, column[7:]) if column.startswith('event__') else alert.serializable_value(column)
+            for column in columns
+        })
+    return alerts, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=100, help='Alerts per response (the max page size is 100).')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    alerts, rows = build_rows(args.rows)
+    missing = set(AlertValuesSerializer.columns()) - set(rows[0])
+    if missing:
+        raise SystemExit(f'Benchmark rows lack columns {sorted(missing)}')
+
+    def drf():
+        return JSONRenderer().render(AlertSerializer(alerts, many=True).data)
+
+    def fast():
+        return FastJSONRenderer().render(AlertValuesSerializer(rows, many=True).data)
+
+    if drf() != fast():
+        raise SystemExit('Fast path output differs from AlertSerializer + JSONRenderer')
+
+    print(f"{args.rows} rows, {args.repeat} repeats, orjson {'available' if orjson else 'not installed'}")
+    baseline = None
+    for name, func in (('ModelSerializer + JSONRenderer', drf), ('values() + FastJSONRenderer', fast)):
+        seconds = min(timeit.repeat(func, number=args.repeat, repeat=3)) / args.repeat
+        baseline = baseline or seconds
+        print(f'{name:<34}{seconds * 1000:8.3f} ms/response  {baseline / seconds:5.1f}x')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
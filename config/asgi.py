@@ -0,0 +1,13 @@
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+django.setup(set_prefix=False)
+
+from monitoring.asgi import StreamingBodyASGIHandler  # noqa: E402
+
+# Django's handler, except that views with stream_request_body (backfill
+# uploads) read their body as it arrives instead of after it was spooled.
+application = StreamingBodyASGIHandler()
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -70,11 +71,31 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 # Caching
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# REDIS_URL gives every worker one shared cache (rule versions, detection
+# counters). CACHE_DIR shares a file-based cache between local processes.
+# Without either each process has its own in-memory cache.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+elif os.environ.get('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['CACHE_DIR'],
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
     }
-}
 
 
 # Database
@@ -82,10 +103,12 @@ CACHES = {
 
 import dj_database_url
 
+# Under ASGI, set DB_CONN_MAX_AGE=0: persistent connections are not reused
+# across requests there and would pile up instead.
 DATABASES = {
     'default': dj_database_url.config(
         default=os.environ.get('DATABASE_URL'),
-        conn_max_age=600,
+        conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', 600)),
         conn_health_checks=True,
     )
 }
@@ -140,27 +163,131 @@ AUTH_USER_MODEL = 'users.User'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'monitoring.pagination.KeysetPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    # GCRA limits kept in THROTTLE_CACHE (see monitoring.throttling). Reads
+    # are charged to 'query', ingest to 'ingest' one unit per event, any
+    # other request of a logged-in client to 'user'.
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'monitoring.throttling.ClientRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '100/day',
-        'user': '1000/day',
+        'anon': os.environ.get('THROTTLE_ANON_RATE', '100/day'),
+        'user': os.environ.get('THROTTLE_USER_RATE', '1000/day'),
+        'query': os.environ.get('THROTTLE_QUERY_RATE', '20/s'),
+        'ingest': os.environ.get('THROTTLE_INGEST_RATE', '5000/s'),
         'burst': '60/min',
     }
 }
 
+# Rate limits are kept here. Use a shared backend (REDIS_URL) so all workers
+# enforce one limit; the Redis cache also updates each limit atomically.
+THROTTLE_CACHE = os.environ.get('THROTTLE_CACHE', 'default')
+
+# Per-source ingest quotas in events, shared by every client, e.g.
+# THROTTLE_SOURCE_RATES="Firewall-1=1000/s,*=2000/s" ('*' for every other source).
+THROTTLE_SOURCE_RATES = dict(
+    item.strip().rsplit('=', 1) for item in os.environ.get('THROTTLE_SOURCE_RATES', '').split(',') if item.strip()
+)
+
+# Page-number pagination reports the planner's row estimate instead of
+# running COUNT(*) once a result set is estimated to be at least this large.
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = int(os.environ.get('PAGINATION_COUNT_ESTIMATE_THRESHOLD', 10000))
+
+# Event Ingestion
+EVENT_BATCH_MAX_SIZE = int(os.environ.get('EVENT_BATCH_MAX_SIZE', 5000))
+
+# Resumable NDJSON uploads (/api/events/uploads/<id>/) commit every
+# UPLOAD_BATCH_SIZE lines in one transaction. Longer lines than
+# UPLOAD_MAX_LINE_BYTES are rejected; an upload keeps its first
+# UPLOAD_MAX_ERRORS errors.
+UPLOAD_BATCH_SIZE = int(os.environ.get('UPLOAD_BATCH_SIZE', 1000))
+UPLOAD_MAX_LINE_BYTES = int(os.environ.get('UPLOAD_MAX_LINE_BYTES', 1024 * 1024))
+UPLOAD_MAX_ERRORS = int(os.environ.get('UPLOAD_MAX_ERRORS', 100))
+
+# Exports (/api/alerts/export/, /api/events/export/) read this many rows per
+# round trip of a server-side cursor and write them out as one chunk.
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+
+# SecurityEvent partitioning and retention (see `manage.py partition_events`).
+# Partitions cover one 'day' or 'week'; EVENT_RETENTION_DAYS=0 keeps events forever.
+EVENT_PARTITION_INTERVAL = os.environ.get('EVENT_PARTITION_INTERVAL', 'day')
+EVENT_PARTITIONS_AHEAD = int(os.environ.get('EVENT_PARTITIONS_AHEAD', 7))
+EVENT_RETENTION_DAYS = int(os.environ.get('EVENT_RETENTION_DAYS', 90))
+
+# Per-minute event rollups are only needed for the leading partial hour of a
+# stats window; hourly rollups are kept indefinitely.
+ROLLUP_MINUTE_RETENTION_HOURS = int(os.environ.get('ROLLUP_MINUTE_RETENTION_HOURS', 48))
+
+# Compiled alert rules are rebuilt on every rule change and at least this
+# often (seconds), in case the change was made through another cache.
+ALERT_RULE_CACHE_TTL = int(os.environ.get('ALERT_RULE_CACHE_TTL', 60))
+
+# Alert deduplication: matching events with the same values for these fields
+# ('rule' or any SecurityEvent field) within the same window (seconds) are
+# counted on one open alert. ALERT_DEDUP_WINDOW=0 raises one alert per event.
+ALERT_DEDUP_FIELDS = [
+    field.strip() for field in os.environ.get('ALERT_DEDUP_FIELDS', 'rule,source,event_type,severity').split(',')
+]
+ALERT_DEDUP_WINDOW = int(os.environ.get('ALERT_DEDUP_WINDOW', 3600))
+
+# Threshold rules keep their sliding-window counters in this cache. Use a
+# shared backend (REDIS_URL) so all workers count together.
+DETECTION_CACHE = os.environ.get('DETECTION_CACHE', 'default')
+
+# Alert list/detail responses are cached in this cache until an alert
+# changes, for at most ALERT_CACHE_TIMEOUT seconds (0 disables caching).
+# Use a shared backend (REDIS_URL) so workers see each other's invalidations.
+ALERT_RESPONSE_CACHE = os.environ.get('ALERT_RESPONSE_CACHE', 'default')
+ALERT_CACHE_TIMEOUT = int(os.environ.get('ALERT_CACHE_TIMEOUT', 300))
+
+# Most alert ids accepted by one bulk status change (POST /api/alerts/status/)
+ALERT_BULK_MAX_IDS = int(os.environ.get('ALERT_BULK_MAX_IDS', 10000))
+
+# Live alert stream (/api/alerts/stream/, served under ASGI only). Each
+# connection buffers at most LIVE_STREAM_QUEUE_SIZE changes before it is
+# switched to catching up from the database.
+LIVE_STREAM_QUEUE_SIZE = int(os.environ.get('LIVE_STREAM_QUEUE_SIZE', 1000))
+LIVE_STREAM_REPLAY_CHUNK = 500
+LIVE_STREAM_HEARTBEAT = 15
+LIVE_STREAM_RETRY_MS = 3000
+# Redis whose pub/sub carries alert changes to the streams of every
+# process. Without it, streams only see alerts changed in their process.
+LIVE_STREAM_REDIS_URL = os.environ.get('LIVE_STREAM_REDIS_URL', os.environ.get('REDIS_URL', ''))
+
+# Request metrics: every response carries a Server-Timing header with its
+# database and serializer time unless SERVER_TIMING is off. /metrics serves
+# per-view histograms to Prometheus: to scrapers sending METRICS_TOKEN as a
+# bearer token, and to staff sessions. Unset, only staff can read it.
+SERVER_TIMING = os.environ.get('SERVER_TIMING', 'True') == 'True'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 # JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    # Tokens carry role and is_staff, so requests are authenticated
+    # without loading the user (see users.authentication).
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.ClaimsTokenRefreshSerializer',
+    'TOKEN_USER_CLASS': 'users.authentication.ClaimsUser',
 }
+
+# Deactivation, revocation and role changes are checked against a per-process
+# cache of user statuses, each trusted for AUTH_USER_CACHE_TTL seconds. Saving
+# a user invalidates it at once, in every process sharing the cache (REDIS_URL).
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', 30))
+AUTH_USER_CACHE_SIZE = int(os.environ.get('AUTH_USER_CACHE_SIZE', 10000))
+
+# Ingest API keys (monitoring.apikeys) are stored as HMACs under this secret
+# and verified through a per-process cache, each key trusted for
+# INGEST_KEY_CACHE_TTL seconds. Changing the secret invalidates every key.
+INGEST_KEY_SECRET = os.environ.get('INGEST_KEY_SECRET', SECRET_KEY)
+INGEST_KEY_CACHE_TTL = int(os.environ.get('INGEST_KEY_CACHE_TTL', 60))
+INGEST_KEY_CACHE_SIZE = int(os.environ.get('INGEST_KEY_CACHE_SIZE', 10000))
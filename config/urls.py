@@ -4,6 +4,7 @@ from django.conf import settings
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from monitoring.metrics import metrics_view
 
 schema_view = get_schema_view(
    openapi.Info(
@@ -20,6 +21,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('users.urls')),
     path('api/', include('monitoring.urls')),
+    path('metrics', metrics_view, name='metrics'),
     
     # Swagger Documentation
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SecurityEvent, Alert
+from .models import SecurityEvent, Alert, AlertRule, QueuedEvent, IngestKey, EventUpload
 
 @admin.register(SecurityEvent)
 class SecurityEventAdmin(admin.ModelAdmin):
@@ -7,8 +7,36 @@ class SecurityEventAdmin(admin.ModelAdmin):
     list_filter = ('severity', 'timestamp')
     search_fields = ('source', 'event_type')
 
+@admin.register(AlertRule)
+class AlertRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'enabled', 'priority', 'source', 'event_type', 'severities', 'threshold', 'window_seconds')
+    list_filter = ('enabled',)
+    search_fields = ('name', 'source', 'event_type')
+
 @admin.register(Alert)
 class AlertAdmin(admin.ModelAdmin):
-    list_display = ('event', 'status', 'created_at')
+    list_display = ('event', 'rule', 'status', 'created_at')
     list_filter = ('status',)
-    search_fields = ('status', 'event__source')
+    search_fields = ('status', 'source')
+
+@admin.register(QueuedEvent)
+class QueuedEventAdmin(admin.ModelAdmin):
+    list_display = ('receipt', 'enqueued_at')
+    search_fields = ('receipt',)
+
+@admin.register(IngestKey)
+class IngestKeyAdmin(admin.ModelAdmin):
+    """Keys are created with the create_ingest_key command, which shows the key once."""
+    list_display = ('name', 'prefix', 'source', 'rate', 'is_active', 'created_at')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'source', 'prefix')
+    readonly_fields = ('prefix', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(EventUpload)
+class EventUploadAdmin(admin.ModelAdmin):
+    list_display = ('id', 'owner', 'lines', 'created', 'failed', 'updated_at')
+    search_fields = ('id', 'owner')
+    readonly_fields = ('lines', 'created', 'failed', 'errors', 'started_at', 'updated_at')
@@ -6,3 +6,5 @@ class MonitoringConfig(AppConfig):
 
     def ready(self):
         import monitoring.signals
+        import monitoring.metrics
+        import monitoring.apikeys
@@ -0,0 +1,92 @@
+"""
+Streamed request bodies under ASGI.
+
+Django's ASGI handler reads the whole request body into a temporary file
+before the view runs, and drops the request if the client disconnects
+meanwhile. Views that set ``stream_request_body = True`` get a body that
+pulls ``http.request`` messages from the server as the view reads it
+instead, so e.g. a backfill upload commits its lines as they arrive, and a
+broken connection reaches the view as ``UnreadablePostError`` once it has
+read everything sent before it.
+"""
+import asyncio
+import io
+
+from asgiref.sync import async_to_sync
+from django.core.handlers.asgi import ASGIHandler, get_script_prefix
+from django.urls import Resolver404, resolve
+
+
+class StreamedReceive:
+    """An ASGI ``receive`` whose body messages are read by the view."""
+
+    def __init__(self, receive):
+        self.receive = receive
+        # Set once the whole body was read; a disconnect can only be
+        # listened for after that.
+        self.body_read = asyncio.Event()
+
+    async def __call__(self):
+        return await self.receive()
+
+    async def next_body_message(self):
+        message = await self.receive()
+        if message['type'] == 'http.request' and not message.get('more_body', False):
+            self.body_read.set()
+        return message
+
+
+class ReceiveStream(io.RawIOBase):
+    """The request body as a file, read from the server one message at a time (from a sync view)."""
+
+    def __init__(self, receive):
+        self.receive = receive
+        self.pending = b''
+        self.more_body = True
+        self.disconnected = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending and self.more_body:
+            if self.disconnected:
+                raise OSError('The client disconnected before sending the whole body.')
+            message = async_to_sync(self.receive.next_body_message)()
+            if message['type'] == 'http.disconnect':
+                self.disconnected = True
+                continue
+            self.pending = message.get('body', b'')
+            self.more_body = message.get('more_body', False)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+class StreamingBodyASGIHandler(ASGIHandler):
+    """Django's ASGI handler, streaming the bodies of views with ``stream_request_body``."""
+
+    def streams_body(self, scope):
+        if scope['method'] not in ('POST', 'PUT', 'PATCH'):
+            return False
+        try:
+            match = resolve(scope['path'].removeprefix(get_script_prefix(scope)))
+        except Resolver404:
+            return False
+        return getattr(getattr(match.func, 'view_class', None), 'stream_request_body', False)
+
+    async def handle(self, scope, receive, send):
+        if self.streams_body(scope):
+            receive = StreamedReceive(receive)
+        await super().handle(scope, receive, send)
+
+    async def read_body(self, receive):
+        if isinstance(receive, StreamedReceive):
+            return io.BufferedReader(ReceiveStream(receive))
+        return await super().read_body(receive)
+
+    async def listen_for_disconnect(self, receive):
+        if isinstance(receive, StreamedReceive):
+            await receive.body_read.wait()
+        return await super().listen_for_disconnect(receive)
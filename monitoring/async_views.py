@@ -0,0 +1,70 @@
+"""
+Async counterparts of the DRF views used by the hot endpoints.
+
+DRF only dispatches to synchronous handlers. ``AsyncAPIView`` runs the usual
+authentication, permission and throttle checks in a worker thread, then
+awaits an ``async def`` handler on the event loop. Under ASGI a request
+waiting on the database or a slow client no longer holds a whole worker.
+Under WSGI Django still runs these views, it just gains nothing from them.
+"""
+import inspect
+
+from asgiref.sync import sync_to_async
+from rest_framework import generics, mixins
+from rest_framework.response import Response
+
+
+class AsyncAPIView(generics.GenericAPIView):
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # Authentication and throttling may hit the database or the cache.
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncCreateAPIView(mixins.CreateModelMixin, AsyncAPIView):
+    async def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.instance = await self.aperform_create(serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=201, headers=headers)
+
+    async def aperform_create(self, serializer):
+        return await self.get_queryset().model.objects.acreate(**serializer.validated_data)
+
+
+class AsyncListAPIView(AsyncAPIView):
+    async def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        paginator = self.paginator
+        if paginator is not None:
+            if hasattr(paginator, 'apaginate_queryset'):
+                page = await paginator.apaginate_queryset(queryset, request, view=self)
+            else:
+                page = await sync_to_async(paginator.paginate_queryset)(queryset, request, view=self)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer([obj async for obj in queryset], many=True)
+        return Response(serializer.data)
@@ -0,0 +1,59 @@
+"""
+Backfill of the event columns copied onto alerts (``Alert.EVENT_FIELDS``).
+
+Alerts are filled in primary key ranges, each with one ``UPDATE ... FROM``
+joined to the event table in its own short transaction. Only alerts whose
+copies are still empty are touched, so the backfill can run against a live
+database and be interrupted and rerun at any point.
+"""
+from django.db import connections, router, transaction
+from django.db.models import Max, Min
+
+from .caching import bump_alert_generation
+from .models import SecurityEvent, Alert
+
+
+def backfill_alert_event_fields(chunk_size=5000, progress=None):
+    """
+    Copy the event columns onto every alert that lacks them. ``progress``
+    is called with ``(last alert id done, highest alert id, alerts filled)``
+    after each chunk. Returns the number of alerts filled.
+    """
+    filled = fill_event_fields(Alert, SecurityEvent, Alert.EVENT_FIELDS, chunk_size, progress)
+    if filled:
+        bump_alert_generation()
+    return filled
+
+
+def fill_event_fields(alert_model, event_model, fields, chunk_size=5000, progress=None):
+    """
+    The backfill proper, on the given models and ``{alert field: event
+    field}`` mapping so that migrations can run it on historical models.
+    """
+    bounds = alert_model.objects.filter(severity__isnull=True).aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return 0
+
+    connection = connections[router.db_for_write(alert_model)]
+    quote = connection.ops.quote_name
+    alert_table = quote(alert_model._meta.db_table)
+    event_table = quote(event_model._meta.db_table)
+    assignments = ', '.join(
+        f"{quote(alert_model._meta.get_field(name).column)} = e.{quote(event_model._meta.get_field(source).column)}"
+        for name, source in fields.items()
+    )
+    severity = quote(alert_model._meta.get_field('severity').column)
+    sql = (
+        f"UPDATE {alert_table} SET {assignments} FROM {event_table} e "
+        f"WHERE e.id = {alert_table}.event_id AND {alert_table}.id >= %s AND {alert_table}.id < %s "
+        f"AND {alert_table}.{severity} IS NULL"
+    )
+
+    filled = 0
+    for start in range(bounds['low'], bounds['high'] + 1, chunk_size):
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(sql, [start, start + chunk_size])
+            filled += cursor.rowcount
+        if progress:
+            progress(min(start + chunk_size - 1, bounds['high']), bounds['high'], filled)
+    return filled
@@ -0,0 +1,131 @@
+"""
+Response caching for the alert read endpoints.
+
+Responses are cached under a key built from the current alert generation,
+the user's role, the request path and its normalised query parameters.
+Creating or changing alerts bumps the generation, so stale entries are
+never read again and simply age out. The hashed key doubles as the ETag.
+A client that sends it back in ``If-None-Match`` gets a 304 after a single
+cache lookup for the generation.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+GENERATION_KEY = 'monitoring:alerts:generation'
+RESPONSE_KEY_PREFIX = 'monitoring:alerts:response'
+
+
+def response_cache():
+    return caches[settings.ALERT_RESPONSE_CACHE]
+
+
+def alert_generation():
+    # Seeded from the clock so a generation key lost to eviction or a
+    # cache clear never comes back at a value used before.
+    return response_cache().get_or_set(GENERATION_KEY, lambda: time.time_ns(), timeout=None)
+
+
+async def aalert_generation():
+    return await response_cache().aget_or_set(GENERATION_KEY, lambda: time.time_ns(), timeout=None)
+
+
+def _bump():
+    cache = response_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def bump_alert_generation():
+    """
+    Invalidate cached alert responses. Bumped again once the surrounding
+    transaction commits, so a response cached from data read before the
+    commit is not served afterwards.
+    """
+    _bump()
+    transaction.on_commit(_bump)
+
+
+class CachedResponseMixin:
+    """
+    Cache successful GET responses of a DRF view, see the module docstring.
+    ``ALERT_CACHE_TIMEOUT = 0`` turns caching off.
+    """
+
+    def get_response_cache_key(self, request, generation):
+        user = request.user
+        params = sorted(
+            (key, tuple(values)) for key, values in request.query_params.lists()
+        )
+        raw = repr((
+            getattr(user, 'role', ''), user.is_staff, request.get_host(), request.path, params,
+        ))
+        digest = hashlib.sha1(raw.encode()).hexdigest()
+        return f'{RESPONSE_KEY_PREFIX}:{generation}:{digest}'
+
+    def get_response_etag(self, key):
+        return '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+
+    def not_modified(self, request, etag):
+        return etag in parse_etags(request.headers.get('If-None-Match', ''))
+
+    def finalize_cached_response(self, response, etag):
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def get(self, request, *args, **kwargs):
+        timeout = settings.ALERT_CACHE_TIMEOUT
+        if not timeout:
+            return super().get(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request, alert_generation())
+        etag = self.get_response_etag(key)
+        if self.not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache = response_cache()
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = super().get(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(key, response.data, timeout=timeout)
+        return self.finalize_cached_response(response, etag)
+
+
+class AsyncCachedResponseMixin(CachedResponseMixin):
+    """``CachedResponseMixin`` for views with an ``async def get``."""
+
+    async def get(self, request, *args, **kwargs):
+        timeout = settings.ALERT_CACHE_TIMEOUT
+        if not timeout:
+            return await super(CachedResponseMixin, self).get(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request, await aalert_generation())
+        etag = self.get_response_etag(key)
+        if self.not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache = response_cache()
+            data = await cache.aget(key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = await super(CachedResponseMixin, self).get(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                await cache.aset(key, response.data, timeout=timeout)
+        return self.finalize_cached_response(response, etag)
@@ -0,0 +1,90 @@
+"""
+Alert deduplication.
+
+Matched events are grouped by a fingerprint of ``ALERT_DEDUP_FIELDS`` and
+the ``ALERT_DEDUP_WINDOW`` they fall in. Each group is written with one
+``INSERT ... ON CONFLICT DO UPDATE`` against the unique index on the
+fingerprint of open alerts. A new alert is inserted, or the open alert
+already holding the fingerprint has its ``occurrences`` and ``last_seen``
+bumped. The database resolves concurrent workers racing on the same
+fingerprint, with no read-then-write.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db import connections, router
+from django.utils import timezone
+
+from .models import Alert
+
+UPSERT_CHUNK_SIZE = 100
+
+
+def alert_fingerprint(event, rule_id, window):
+    """Hash of the configured fields of ``event`` and its window number."""
+    parts = [
+        str(rule_id) if field == 'rule' else str(getattr(event, field))
+        for field in settings.ALERT_DEDUP_FIELDS
+    ]
+    parts.append(str(int(event.timestamp.timestamp()) // window))
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+
+def upsert_alerts(matches, window):
+    """
+    Record ``[(event, rule_id)]`` matches as deduplicated alerts. Returns
+    ``(created, updated)`` lists of alert ids.
+    """
+    groups = {}
+    for event, rule_id in matches:
+        key = alert_fingerprint(event, rule_id, window)
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [event, rule_id, 1, event.timestamp]
+        else:
+            group[2] += 1
+            group[3] = max(group[3], event.timestamp)
+    if not groups:
+        return [], []
+
+    connection = connections[router.db_for_write(Alert)]
+    quote = connection.ops.quote_name
+    adapt = connection.ops.adapt_datetimefield_value
+    table = quote(Alert._meta.db_table)
+    # The event columns the alert keeps copies of
+    copied = [(Alert._meta.get_field(name), source) for name, source in Alert.EVENT_FIELDS.items()]
+    columns = ', '.join(quote(column) for column in (
+        'event_id', 'rule_id', 'status', 'created_at', 'fingerprint', 'occurrences', 'last_seen',
+        *(field.column for field, _ in copied),
+    ))
+    occurrences, last_seen = quote('occurrences'), quote('last_seen')
+    now = adapt(timezone.now())
+
+    created, updated = [], []
+    # Sorted so concurrent writers take row locks in the same order.
+    rows = sorted(groups.items())
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            chunk = rows[i:i + UPSERT_CHUNK_SIZE]
+            values = ', '.join(['(%s)' % ', '.join(['%s'] * (7 + len(copied)))] * len(chunk))
+            params = [
+                value
+                for key, (event, rule_id, count, seen) in chunk
+                for value in (
+                    event.pk, rule_id, 'OPEN', now, key, count, adapt(seen),
+                    *(field.get_db_prep_value(getattr(event, source), connection) for field, source in copied),
+                )
+            ]
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) VALUES {values} "
+                f"ON CONFLICT ({quote('fingerprint')}) WHERE {quote('status')} = 'OPEN' DO UPDATE SET "
+                f"{occurrences} = {table}.{occurrences} + EXCLUDED.{occurrences}, "
+                f"{last_seen} = CASE WHEN EXCLUDED.{last_seen} > {table}.{last_seen} "
+                f"THEN EXCLUDED.{last_seen} ELSE {table}.{last_seen} END "
+                f"RETURNING {quote('id')}, {quote('fingerprint')}, {occurrences}",
+                params,
+            )
+            for pk, key, total in cursor.fetchall():
+                # A fresh row holds exactly this batch's count.
+                (created if total == groups[key][2] else updated).append(pk)
+    return created, updated
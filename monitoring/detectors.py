@@ -0,0 +1,67 @@
+"""
+Sliding-window threshold detection.
+
+Each threshold rule counts matching events per group key in two fixed
+buckets of the shared cache, the current window and the previous one.
+The sliding count is the current bucket plus the part of the previous
+bucket still inside the window. State per key is two integers whatever
+the rate. Every bucket expires two windows after it was opened, so idle
+keys are evicted by the cache itself and memory stays bounded.
+"""
+import hashlib
+import math
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+KEY_PREFIX = 'monitoring:threshold'
+
+
+class SlidingWindowCounter:
+    def __init__(self, cache=None):
+        self.cache = cache or caches[settings.DETECTION_CACHE]
+
+    def add(self, key, amount, window, now=None):
+        """Count ``amount`` hits for ``key`` and return the sliding-window total."""
+        now = time.time() if now is None else now
+        bucket = int(now // window)
+        current = f'{KEY_PREFIX}:{key}:{window}:{bucket}'
+        previous = f'{KEY_PREFIX}:{key}:{window}:{bucket - 1}'
+
+        self.cache.add(current, 0, timeout=window * 2)
+        try:
+            count = self.cache.incr(current, amount)
+        except ValueError:
+            # Evicted between add() and incr().
+            self.cache.set(current, amount, timeout=window * 2)
+            count = amount
+        overlap = 1 - (now % window) / window
+        return self.cache.get(previous, 0) * overlap + count
+
+
+def group_key(rule, event):
+    value = getattr(event, rule.group_by) if rule.group_by else ''
+    digest = hashlib.sha1(str(value).encode()).hexdigest()[:16]
+    return f'{rule.id}:{digest}'
+
+
+def detect_thresholds(hits, counter=None):
+    """
+    Count ``[(event, rule)]`` threshold rule hits and return
+    ``[(event, rule_id)]`` for every event that arrived while its rule's
+    count was over the threshold.
+    """
+    counter = counter or SlidingWindowCounter()
+    groups = defaultdict(list)
+    for event, rule in hits:
+        groups[(rule, group_key(rule, event))].append(event)
+
+    matches = []
+    for (rule, key), events in groups.items():
+        total = counter.add(key, len(events), rule.window)
+        # Events are over the threshold from the (threshold + 1)th hit on.
+        first_over = max(0, math.floor(rule.threshold - (total - len(events))))
+        matches.extend((event, rule.id) for event in events[first_over:])
+    return matches
@@ -0,0 +1,39 @@
+"""
+Streaming exports.
+
+Rows are read with ``.values().iterator(chunk_size=EXPORT_CHUNK_SIZE)``,
+which uses a server-side cursor on PostgreSQL, rendered with the plan of a
+``ValuesSerializer`` and written out one chunk at a time. Memory stays flat
+whatever the number of rows, and the response starts as soon as the first
+chunk is read (the CSV header even before that).
+
+Under ASGI the rows are read with ``.aiterator()``: Django would otherwise
+read a synchronous iterator to the end before sending anything.
+"""
+from .serializers import represent
+
+
+def export_chunks(queryset, serializer, renderer, chunk_size):
+    plan, tz = serializer.selected_plan, serializer.output_timezone
+    yield renderer.start(serializer.headers)
+    rows = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        rows.append(represent(row, plan, tz))
+        if len(rows) >= chunk_size:
+            yield renderer.render_rows(rows, serializer.headers)
+            rows = []
+    if rows:
+        yield renderer.render_rows(rows, serializer.headers)
+
+
+async def aexport_chunks(queryset, serializer, renderer, chunk_size):
+    plan, tz = serializer.selected_plan, serializer.output_timezone
+    yield renderer.start(serializer.headers)
+    rows = []
+    async for row in queryset.aiterator(chunk_size=chunk_size):
+        rows.append(represent(row, plan, tz))
+        if len(rows) >= chunk_size:
+            yield renderer.render_rows(rows, serializer.headers)
+            rows = []
+    if rows:
+        yield renderer.render_rows(rows, serializer.headers)
@@ -0,0 +1,89 @@
+import uuid
+
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import SecurityEvent, QueuedEvent
+from .serializers import SecurityEventSerializer
+from .signals import create_alerts_for_events
+from .rollups import record_rollups
+
+
+def validate_events(items, source=None, serializer_class=SecurityEventSerializer):
+    """
+    Validate a list of raw event payloads in a single pass. With
+    ``source``, events from any other source are rejected.
+
+    Returns ``(valid, errors)`` where ``valid`` is a list of
+    ``(index, validated_data)`` tuples and ``errors`` a list of
+    ``{'index': ..., 'errors': ...}`` dicts for the rejected items.
+    """
+    serializer = serializer_class(context={'ingest_source': source})
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'errors': {'non_field_errors': ['Expected an object.']}})
+            continue
+        try:
+            valid.append((index, serializer.run_validation(item)))
+        except serializers.ValidationError as exc:
+            errors.append({'index': index, 'errors': exc.detail})
+    return valid, errors
+
+
+@transaction.atomic
+def ingest_events(validated_data, live=False):
+    """
+    Insert already validated events with one bulk INSERT and create the
+    matching alerts with a second one. ``post_save`` is not sent for
+    bulk inserts, so the alert rule and the rollups are applied here
+    explicitly. Events given a ``timestamp`` (backfills) are history:
+    they are counted in the rollups but raise no alerts, unless ``live``
+    says the timestamps are when the events were received.
+    """
+    events = SecurityEvent.objects.bulk_create(
+        [SecurityEvent(**data) for data in validated_data]
+    )
+    create_alerts_for_events([
+        event for event, data in zip(events, validated_data) if live or 'timestamp' not in data
+    ])
+    record_rollups(events)
+    return events
+
+
+def enqueue_events(validated_data):
+    """Stage validated events for the ingest worker and return the receipt ID."""
+    receipt = uuid.uuid4()
+    QueuedEvent.objects.bulk_create(
+        [QueuedEvent(receipt=receipt, payload=data) for data in validated_data]
+    )
+    return receipt
+
+
+def drain_queue(batch_size):
+    """
+    Move up to ``batch_size`` queued events into ``SecurityEvent`` in one
+    transaction. Events keep the time they were accepted at as their
+    timestamp, however long they waited in the queue. Rows locked by a
+    concurrent worker are skipped, so several workers can drain the same
+    queue. Returns the number of events written.
+    """
+    with transaction.atomic():
+        rows = list(
+            QueuedEvent.objects.select_for_update(skip_locked=True)
+            .order_by('id')[:batch_size]
+        )
+        if not rows:
+            return 0
+        ingest_events([{**row.payload, 'timestamp': row.enqueued_at} for row in rows], live=True)
+        QueuedEvent.objects.filter(pk__in=[row.pk for row in rows]).delete()
+    return len(rows)
+
+
+def queue_stats():
+    """Return the queue depth and the age in seconds of the oldest queued event."""
+    stats = QueuedEvent.objects.aggregate(depth=Count('id'), oldest=Min('enqueued_at'))
+    lag = (timezone.now() - stats['oldest']).total_seconds() if stats['oldest'] else 0.0
+    return {'depth': stats['depth'], 'lag_seconds': round(lag, 3)}
@@ -0,0 +1,292 @@
+"""
+Live alert stream.
+
+``AlertHub`` fans out alert changes published by the alert-creation path
+to the server-sent event streams connected to this process. With
+``LIVE_STREAM_REDIS_URL`` set, the ids of changed alerts are published to
+a Redis channel instead, and every process serving streams feeds its hub
+from it, so alerts changed by other processes (e.g. ``ingest_worker``)
+reach its clients too.
+
+Each stream owns a bounded queue. A client too slow to keep up has its
+backlog dropped, then catches up from the database: alerts created after
+the last alert id it received, and the alerts whose updates were dropped.
+Clients resume the same way after reconnecting, through ``Last-Event-ID``.
+Only ``alert.created`` events carry an SSE id, so the resume point always
+moves forward.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+
+import redis
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Max
+
+from .models import Alert
+from .serializers import AlertSerializer
+
+OVERFLOW = object()
+CHANNEL = 'monitoring:alerts'
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self, loop, severities=None, statuses=None, maxsize=None):
+        self.loop = loop
+        self.severities = severities
+        self.statuses = statuses
+        self.queue = asyncio.Queue(maxsize or settings.LIVE_STREAM_QUEUE_SIZE)
+        self.overflowed = False
+        self.missed = set()
+
+    def wants(self, message):
+        if self.severities and message['severity'] not in self.severities:
+            return False
+        return not self.statuses or message['status'] in self.statuses
+
+    def offer(self, message):
+        """Queue ``message``. Runs on the subscriber's event loop."""
+        if self.overflowed:
+            self.miss(message)
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflow()
+            self.miss(message)
+
+    def miss(self, message):
+        # Dropped creations are caught up from the last alert id sent,
+        # dropped updates by alert id.
+        if message['kind'] == 'alert.updated':
+            self.missed.add(message['id'])
+
+    def overflow(self):
+        """Drop the backlog and have the stream catch up. Runs on the subscriber's event loop."""
+        if self.overflowed:
+            return
+        self.overflowed = True
+        while not self.queue.empty():
+            message = self.queue.get_nowait()
+            if message is not OVERFLOW:
+                self.miss(message)
+        self.queue.put_nowait(OVERFLOW)
+
+
+class AlertHub:
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.add(subscription)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def publish(self, messages):
+        """Hand ``messages`` to every interested subscriber. Safe from any thread."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            for message in messages:
+                if subscription.wants(message):
+                    subscription.loop.call_soon_threadsafe(subscription.offer, message)
+
+    def catch_up(self):
+        """Have every subscriber catch up from the database. Safe from any thread."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.overflow)
+
+
+hub = AlertHub()
+
+
+class RedisRelay:
+    """
+    Carries the ids of changed alerts between processes over a Redis
+    channel. A listener thread, started with the first stream of the
+    process, feeds them to ``hub``. Changes published while it was not
+    subscribed are lost, so every stream catches up when it (re)subscribes.
+    """
+
+    def __init__(self, url, channel=CHANNEL):
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def has_listeners(self):
+        try:
+            return any(count for _, count in self.client.pubsub_numsub(self.channel))
+        except redis.RedisError:
+            return False
+
+    def publish(self, created, updated):
+        try:
+            self.client.publish(self.channel, json.dumps({'created': created, 'updated': updated}))
+        except redis.RedisError:
+            logger.warning('Could not publish alert changes to %s', self.channel, exc_info=True)
+
+    def start(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self.listen, name='alert-relay', daemon=True)
+                self._listener.start()
+
+    def listen(self):
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                hub.catch_up()
+                for message in pubsub.listen():
+                    ids = json.loads(message['data'])
+                    close_old_connections()
+                    deliver(ids['created'], ids['updated'])
+            except Exception:
+                logger.warning('Alert relay on %s failed, resubscribing', self.channel, exc_info=True)
+                time.sleep(1)
+            finally:
+                pubsub.close()
+
+
+relay = RedisRelay(settings.LIVE_STREAM_REDIS_URL) if settings.LIVE_STREAM_REDIS_URL else None
+
+
+def alert_messages(alerts, kind):
+    return [
+        {
+            'kind': kind,
+            'id': alert.pk,
+            'severity': alert.event.severity,
+            'status': alert.status,
+            'data': AlertSerializer(alert).data,
+        }
+        for alert in alerts
+    ]
+
+
+def has_subscribers():
+    """Whether alert changes have streams to go to: in any process with a relay, else in this one."""
+    return relay.has_listeners() if relay else hub.has_subscribers()
+
+
+def deliver(created, updated):
+    """Load the created and updated alerts and hand them to this process's streams."""
+    if not hub.has_subscribers():
+        return
+    alerts = Alert.objects.select_related('event').in_bulk([*created, *updated])
+    hub.publish(
+        alert_messages([alerts[pk] for pk in created if pk in alerts], 'alert.created')
+        + alert_messages([alerts[pk] for pk in updated if pk in alerts], 'alert.updated')
+    )
+
+
+def publish_alerts(created, updated):
+    """Publish created and updated alert ids once the transaction commits."""
+    if not (created or updated) or not has_subscribers():
+        return
+    if relay:
+        transaction.on_commit(lambda: relay.publish(created, updated))
+    else:
+        transaction.on_commit(lambda: deliver(created, updated))
+
+
+def format_event(message):
+    lines = [f"event: {message['kind']}"]
+    if message['kind'] == 'alert.created':
+        lines.append(f"id: {message['id']}")
+    lines.append(f"data: {json.dumps(message['data'], separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def filtered_alerts(severities, statuses):
+    queryset = Alert.objects.select_related('event').order_by('pk')
+    if severities:
+        queryset = queryset.filter(severity__in=severities)
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    return queryset
+
+
+async def replay(last_id, severities, statuses):
+    """Yield ``alert.created`` messages for matching alerts after ``last_id``."""
+    queryset = filtered_alerts(severities, statuses)
+    while True:
+        alerts = [alert async for alert in queryset.filter(pk__gt=last_id)[:settings.LIVE_STREAM_REPLAY_CHUNK]]
+        for message in alert_messages(alerts, 'alert.created'):
+            yield message
+        if len(alerts) < settings.LIVE_STREAM_REPLAY_CHUNK:
+            return
+        last_id = alerts[-1].pk
+
+
+async def replay_updates(ids, severities, statuses):
+    """Yield ``alert.updated`` messages for the matching alerts of ``ids``."""
+    queryset = filtered_alerts(severities, statuses)
+    ids = sorted(ids)
+    for i in range(0, len(ids), settings.LIVE_STREAM_REPLAY_CHUNK):
+        chunk = ids[i:i + settings.LIVE_STREAM_REPLAY_CHUNK]
+        alerts = [alert async for alert in queryset.filter(pk__in=chunk)]
+        for message in alert_messages(alerts, 'alert.updated'):
+            yield message
+
+
+async def alert_stream(last_id=None, severities=None, statuses=None):
+    """
+    Server-sent event stream of alert changes after alert ``last_id``, or
+    from now on if it is ``None``. See the module docstring.
+    """
+    if last_id is None:
+        last_id = (await Alert.objects.aaggregate(last=Max('pk')))['last'] or 0
+    subscription = Subscription(asyncio.get_running_loop(), severities, statuses)
+    hub.subscribe(subscription)
+    if relay:
+        relay.start()
+    try:
+        yield f"retry: {settings.LIVE_STREAM_RETRY_MS}\n\n"
+        # Replay after subscribing so nothing created in between is missed;
+        # live copies of replayed alerts are skipped by id.
+        async for message in replay(last_id, severities, statuses):
+            last_id = message['id']
+            yield format_event(message)
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=settings.LIVE_STREAM_HEARTBEAT
+                )
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if message is OVERFLOW:
+                # Alerts created after last_id are sent as they are now.
+                missed = {pk for pk in subscription.missed if pk <= last_id}
+                subscription.overflowed = False
+                subscription.missed = set()
+                yield ': overflow, catching up\n\n'
+                async for message in replay(last_id, severities, statuses):
+                    last_id = message['id']
+                    yield format_event(message)
+                async for message in replay_updates(missed, severities, statuses):
+                    yield format_event(message)
+                continue
+            if message['kind'] == 'alert.created':
+                if message['id'] <= last_id:
+                    continue
+                last_id = message['id']
+            yield format_event(message)
+    finally:
+        hub.unsubscribe(subscription)
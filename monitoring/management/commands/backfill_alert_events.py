@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from monitoring.backfill import backfill_alert_event_fields
+
+
+class Command(BaseCommand):
+    help = ("Copy severity, source, event type and timestamp from each alert's event onto alerts "
+            "created before those columns existed. Safe to interrupt and rerun.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Alert ids covered per UPDATE and transaction.')
+
+    def handle(self, *args, **options):
+        def progress(done, last, filled):
+            self.stdout.write(f"Up to alert {done}/{last}: {filled} alerts filled")
+
+        filled = backfill_alert_event_fields(options['chunk_size'], progress=progress)
+        self.stdout.write(f"Backfilled {filled} alerts")
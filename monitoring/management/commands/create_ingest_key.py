@@ -0,0 +1,25 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring.apikeys import create_ingest_key
+
+
+class Command(BaseCommand):
+    help = ('Create an API key for a sensor to call the ingest endpoints with. '
+            'The key is printed once and cannot be recovered later.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help='Label for the key, e.g. the sensor fleet it belongs to.')
+        parser.add_argument('--source', default='',
+                            help='Only accept events with this source (default: any source).')
+        parser.add_argument('--rate', default='',
+                            help='Limits on the events sent with the key, comma-separated, '
+                                 'e.g. "50/s,10000/hour" (default: none).')
+
+    def handle(self, *args, **options):
+        try:
+            key, raw_key = create_ingest_key(options['name'], source=options['source'], rate=options['rate'])
+        except ValidationError as exc:
+            raise CommandError('; '.join(exc.messages))
+        self.stderr.write(f"Created ingest key {key.pk} ({key.prefix}...). Store it now, it is not shown again:")
+        self.stdout.write(raw_key)
@@ -0,0 +1,38 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from monitoring.ingest import drain_queue, queue_stats
+
+
+class Command(BaseCommand):
+    help = 'Drain the asynchronous ingest queue into SecurityEvent in large transactions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Maximum number of events written per transaction.')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the queue until it is empty, then exit.')
+        parser.add_argument('--stats', action='store_true',
+                            help='Print the queue depth and lag as JSON and exit.')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(queue_stats()))
+            return
+
+        while True:
+            written = drain_queue(options['batch_size'])
+            if written:
+                stats = queue_stats()
+                self.stdout.write(
+                    f"Ingested {written} events "
+                    f"(queue depth {stats['depth']}, lag {stats['lag_seconds']}s)"
+                )
+                continue
+            if options['once']:
+                return
+            time.sleep(options['interval'])
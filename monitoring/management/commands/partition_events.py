@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from monitoring.partitions import (
+    is_partitioned, ensure_partitions, expire_partitions, delete_expired_events,
+)
+from monitoring.rollups import prune_rollups
+
+
+class Command(BaseCommand):
+    help = ('Pre-create future SecurityEvent partitions, drop or archive expired ones '
+            'and prune old minute rollups. Run it at least once per partition interval, '
+            'e.g. daily from cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=None,
+                            help='Number of future partitions to keep ready (default: EVENT_PARTITIONS_AHEAD).')
+        parser.add_argument('--retention-days', type=int, default=None,
+                            help='Expire events older than this (default: EVENT_RETENTION_DAYS, 0 keeps all).')
+        parser.add_argument('--archive', action='store_true',
+                            help='Detach expired partitions as standalone tables instead of dropping them.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would change without changing anything.')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        if not dry_run:
+            self.stdout.write(f"Pruned {prune_rollups()} minute rollups")
+        if not is_partitioned(connection):
+            deleted = delete_expired_events(options['retention_days'], dry_run=dry_run)
+            verb = 'Would delete' if dry_run else 'Deleted'
+            self.stdout.write(f"{verb} {deleted} expired events (table is not partitioned)")
+            return
+
+        verb = 'Would create' if dry_run else 'Created'
+        for name in ensure_partitions(connection, ahead=options['ahead'], dry_run=dry_run):
+            self.stdout.write(f"{verb} partition {name}")
+
+        expired = expire_partitions(
+            connection, retention_days=options['retention_days'],
+            archive=options['archive'], dry_run=dry_run,
+        )
+        verb = 'archive' if options['archive'] else 'drop'
+        verb = f'Would {verb}' if dry_run else {'archive': 'Archived', 'drop': 'Dropped'}[verb]
+        for name in expired:
+            self.stdout.write(f"{verb} partition {name}")
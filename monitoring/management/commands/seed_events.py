@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from monitoring.seeding import seed_events
+
+
+class Command(BaseCommand):
+    help = ('Insert generated SecurityEvent rows, and alerts for the high and critical ones, '
+            'for benchmarking. Writes straight to the tables; alert rules are not applied.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=1_000_000,
+                            help='Number of events to insert.')
+        parser.add_argument('--days', type=int, default=30,
+                            help='Spread event timestamps over this many past days.')
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Events written per transaction.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed, so runs with the same arguments insert the same data.')
+
+    def handle(self, *args, **options):
+        def progress(written):
+            self.stdout.write(f"Inserted {written}/{options['events']} events")
+
+        events, alerts = seed_events(
+            options['events'], days=options['days'], batch_size=options['batch_size'],
+            seed=options['seed'], progress=progress,
+        )
+        self.stdout.write(f"Seeded {events} events and {alerts} alerts")
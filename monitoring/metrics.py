@@ -0,0 +1,179 @@
+"""
+Per-request instrumentation.
+
+``RequestMetricsMiddleware`` opens a ``RequestStats`` for every request.
+A database execute wrapper, installed on each connection as it is
+created, adds every query's count and time to the current stats.
+``TimedSerializerMixin`` adds serializer time. The stats travel in a
+context variable, so queries and serialization running in
+``sync_to_async`` threads for async views are counted too. Totals are
+reported in a ``Server-Timing`` header and aggregated into in-process
+histograms, which ``metrics_view`` serves in the Prometheus text format.
+Each worker process keeps its own histograms.
+"""
+import bisect
+import contextvars
+import hmac
+import threading
+import time
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class RequestStats:
+    __slots__ = ('started', 'queries', 'db_time', 'serializer_time', 'serializing')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+
+def current_stats():
+    return _current.get()
+
+
+def start_request():
+    """Start collecting stats for a request. Returns ``(stats, token)``."""
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - started
+        stats.queries += 1
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedSerializerMixin:
+    """
+    Add the time spent in ``to_representation`` to the request's serializer
+    time. Only the outermost call is timed, so nested serializers and the
+    rows of a ``many=True`` list are not counted twice.
+    """
+
+    def to_representation(self, instance):
+        stats = _current.get()
+        if stats is None or stats.serializing:
+            return super().to_representation(instance)
+        stats.serializing = True
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serializer_time += time.perf_counter() - started
+            stats.serializing = False
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum:g}'
+        yield f'{name}_count{{{labels}}} {cumulative}'
+
+
+METRICS = (
+    # (name, help, buckets)
+    ('http_request_duration_seconds', 'Time spent handling the request.', DURATION_BUCKETS),
+    ('http_request_db_queries', 'SQL queries run by the request.', QUERY_BUCKETS),
+    ('http_request_db_duration_seconds', 'Time spent in SQL queries.', DURATION_BUCKETS),
+    ('http_request_serializer_duration_seconds', 'Time spent in DRF serializers.', DURATION_BUCKETS),
+    ('http_response_size_bytes', 'Response body size, streaming responses excluded.', SIZE_BUCKETS),
+)
+
+
+class MetricsRegistry:
+    """Histograms per ``(view, method, status class)``, one set per metric."""
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, view, method, status, duration, stats, size):
+        key = (view, method, f'{status // 100}xx')
+        values = (duration, stats.queries, stats.db_time, stats.serializer_time, size)
+        with self._lock:
+            histograms = self._series.get(key)
+            if histograms is None:
+                histograms = self._series[key] = [Histogram(buckets) for _, _, buckets in METRICS]
+            for histogram, value in zip(histograms, values):
+                if value is not None:
+                    histogram.observe(value)
+
+    def render(self):
+        with self._lock:
+            series = sorted(self._series.items())
+            lines = []
+            for i, (name, help_text, _) in enumerate(METRICS):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for (view, method, status), histograms in series:
+                    labels = f'view="{view}",method="{method}",status="{status}"'
+                    lines.extend(histograms[i].samples(name, labels))
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+registry = MetricsRegistry()
+
+
+def server_timing(duration, stats):
+    return (
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+        f'serialize;dur={stats.serializer_time * 1000:.1f}, '
+        f'total;dur={duration * 1000:.1f}'
+    )
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Scrapers send ``METRICS_TOKEN`` as a bearer
+    token; staff users may also read it with their session. Without a
+    token configured only staff get in.
+    """
+    token = settings.METRICS_TOKEN
+    scraper = token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not scraper and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
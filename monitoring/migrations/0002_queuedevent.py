@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('receipt', models.UUIDField(db_index=True)),
+                ('payload', models.JSONField()),
+                ('enqueued_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
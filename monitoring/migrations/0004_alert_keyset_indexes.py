@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0003_alert_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='alert',
+            name='alert_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='alert',
+            name='alert_status_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='alert',
+            name='alert_open_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['-created_at', '-id'], name='alert_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='alert_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(condition=models.Q(('status', 'OPEN')), fields=['-created_at', '-id'], name='alert_open_created_idx'),
+        ),
+    ]
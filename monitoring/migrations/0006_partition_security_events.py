@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+from monitoring.partitions import partition_event_table, unpartition_event_table
+
+
+def partition(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        partition_event_table(schema_editor)
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        unpartition_event_table(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0005_event_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='alert',
+            name='event',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='monitoring.securityevent'),
+        ),
+        migrations.RunPython(partition, unpartition),
+    ]
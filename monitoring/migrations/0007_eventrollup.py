@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncHour, TruncMinute
+from django.utils import timezone
+
+
+def backfill(apps, schema_editor):
+    SecurityEvent = apps.get_model('monitoring', 'SecurityEvent')
+    EventRollup = apps.get_model('monitoring', 'EventRollup')
+    minutes_since = timezone.now() - timedelta(hours=settings.ROLLUP_MINUTE_RETENTION_HOURS)
+    for resolution, trunc, events in (
+        ('hour', TruncHour, SecurityEvent.objects.all()),
+        ('minute', TruncMinute, SecurityEvent.objects.filter(timestamp__gte=minutes_since)),
+    ):
+        rows = (
+            events.annotate(bucket=trunc('timestamp'))
+            .values('bucket', 'severity', 'event_type', 'source')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        EventRollup.objects.bulk_create(
+            (EventRollup(resolution=resolution, **row) for row in rows.iterator()),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0006_partition_security_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour')], max_length=6)),
+                ('bucket', models.DateTimeField()),
+                ('severity', models.CharField(choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High'), ('CRITICAL', 'Critical')], max_length=10)),
+                ('event_type', models.CharField(max_length=100)),
+                ('source', models.CharField(max_length=100)),
+                ('count', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('resolution', 'bucket', 'severity', 'event_type', 'source'), name='event_rollup_key')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_default_rule(apps, schema_editor):
+    AlertRule = apps.get_model('monitoring', 'AlertRule')
+    AlertRule.objects.get_or_create(
+        name='High and critical events',
+        defaults={'severities': 'HIGH,CRITICAL', 'priority': 1000},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0007_eventrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('enabled', models.BooleanField(default=True)),
+                ('priority', models.PositiveIntegerField(default=100, help_text='Lower runs first.')),
+                ('source', models.CharField(blank=True, max_length=100)),
+                ('event_type', models.CharField(blank=True, max_length=100)),
+                ('severities', models.CharField(blank=True, help_text='Comma-separated, e.g. HIGH,CRITICAL. Blank matches any.', max_length=40)),
+                ('description_regex', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['priority', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='rule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='alerts', to='monitoring.alertrule'),
+        ),
+        migrations.RunPython(create_default_rule, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_created_at(apps, schema_editor):
+    Alert = apps.get_model('monitoring', 'Alert')
+    Alert.objects.update(last_seen=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0008_alertrule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='occurrences',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='last_seen',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='alert',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'OPEN')), fields=('fingerprint',), name='alert_open_fingerprint_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['-last_seen', '-id'], name='alert_last_seen_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0009_alert_dedup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertrule',
+            name='threshold',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alertrule',
+            name='window_seconds',
+            field=models.PositiveIntegerField(default=60),
+        ),
+        migrations.AddField(
+            model_name='alertrule',
+            name='group_by',
+            field=models.CharField(blank=True, choices=[('source', 'Source'), ('event_type', 'Event type'), ('severity', 'Severity')], help_text='Blank counts all matching events together.', max_length=20),
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0010_alertrule_threshold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='event_timestamp',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='event_type',
+            field=models.CharField(editable=False, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='severity',
+            field=models.CharField(choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High'), ('CRITICAL', 'Critical')], editable=False, max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='source',
+            field=models.CharField(editable=False, max_length=100, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['severity', '-created_at', '-id'], name='alert_severity_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['status', 'severity', '-created_at', '-id'], name='alert_status_severity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['event_timestamp'], name='alert_event_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['source', '-created_at'], name='alert_source_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['event_type', '-created_at'], name='alert_type_created_idx'),
+        ),
+    ]
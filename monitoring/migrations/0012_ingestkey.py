@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0011_alert_event_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('source', models.CharField(blank=True, help_text='Events sent with this key must have this source. Blank allows any source.', max_length=100)),
+                ('prefix', models.CharField(editable=False, max_length=12)),
+                ('key_hash', models.CharField(editable=False, max_length=64, unique=True)),
+                ('rate', models.CharField(blank=True, help_text='Comma-separated request limits, e.g. "50/s,10000/hour". Blank for no limit.', max_length=100)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0012_ingestkey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventUpload',
+            fields=[
+                ('id', models.UUIDField(primary_key=True, serialize=False)),
+                ('owner', models.CharField(help_text='The user or ingest key that started the upload.', max_length=150)),
+                ('lines', models.PositiveBigIntegerField(default=0)),
+                ('created', models.PositiveBigIntegerField(default=0)),
+                ('failed', models.PositiveBigIntegerField(default=0)),
+                ('errors', models.JSONField(default=list, help_text='The first UPLOAD_MAX_ERRORS rejected lines.')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0013_eventupload'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='alertrule',
+            constraint=models.CheckConstraint(condition=models.Q(('threshold__isnull', True), ('window_seconds__gt', 0), _connector='OR'), name='alert_rule_threshold_window'),
+        ),
+    ]
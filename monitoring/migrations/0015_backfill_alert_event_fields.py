@@ -0,0 +1,28 @@
+from django.db import migrations
+
+from monitoring.backfill import fill_event_fields
+
+# Alert.EVENT_FIELDS as of 0011_alert_event_fields.
+EVENT_FIELDS = {
+    'severity': 'severity',
+    'source': 'source',
+    'event_type': 'event_type',
+    'event_timestamp': 'timestamp',
+}
+
+
+def backfill(apps, schema_editor):
+    fill_event_fields(apps.get_model('monitoring', 'Alert'), apps.get_model('monitoring', 'SecurityEvent'), EVENT_FIELDS)
+
+
+class Migration(migrations.Migration):
+    # Each chunk commits on its own, as with manage.py backfill_alert_events.
+    atomic = False
+
+    dependencies = [
+        ('monitoring', '0014_alertrule_threshold_window'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
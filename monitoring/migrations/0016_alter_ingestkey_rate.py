@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0015_backfill_alert_event_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ingestkey',
+            name='rate',
+            field=models.CharField(blank=True, help_text='Limits on the events sent with this key, comma-separated, e.g. "50/s,10000/hour". Blank for no limit.', max_length=100),
+        ),
+    ]
@@ -0,0 +1,24 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0016_alter_ingestkey_rate'),
+    ]
+
+    # The column is unchanged: the default is applied by Django, as
+    # auto_now_add was. Altering it for real would make SQLite rebuild the
+    # table and drop its full-text search triggers.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='securityevent',
+                    name='timestamp',
+                    field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+                ),
+            ],
+        ),
+    ]
@@ -1,4 +1,8 @@
+import re
+
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 
 class SecurityEvent(models.Model):
     SEVERITY_CHOICES = (
@@ -12,21 +16,255 @@ class SecurityEvent(models.Model):
     event_type = models.CharField(max_length=100)
     severity = models.CharField(max_length=10, choices=SEVERITY_CHOICES)
     description = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set on arrival; only backfill uploads may give an earlier time.
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['severity', '-timestamp'], name='event_severity_ts_idx'),
+        ]
 
     def __str__(self):
         return f"{self.event_type} ({self.severity})"
 
+class AlertRule(models.Model):
+    """
+    Detection rule. An event matches when every non-blank criterion does:
+    exact ``source`` and ``event_type``, one of ``severities`` and a
+    ``description_regex`` search. Rules are tried in ``priority`` order.
+
+    With a ``threshold`` the rule only fires once more than that many
+    matching events, per ``group_by`` value, arrive within
+    ``window_seconds`` (see monitoring.detectors).
+    """
+    GROUP_BY_CHOICES = (
+        ('source', 'Source'),
+        ('event_type', 'Event type'),
+        ('severity', 'Severity'),
+    )
+    name = models.CharField(max_length=100, unique=True)
+    enabled = models.BooleanField(default=True)
+    priority = models.PositiveIntegerField(default=100, help_text='Lower runs first.')
+    source = models.CharField(max_length=100, blank=True)
+    event_type = models.CharField(max_length=100, blank=True)
+    severities = models.CharField(
+        max_length=40, blank=True, help_text='Comma-separated, e.g. HIGH,CRITICAL. Blank matches any.'
+    )
+    description_regex = models.TextField(blank=True)
+    threshold = models.PositiveIntegerField(null=True, blank=True)
+    window_seconds = models.PositiveIntegerField(default=60)
+    group_by = models.CharField(
+        max_length=20, choices=GROUP_BY_CHOICES, blank=True, help_text='Blank counts all matching events together.'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['priority', 'id']
+        constraints = [
+            # clean() is skipped by bulk_create() and update(), and the
+            # detectors divide by the window.
+            models.CheckConstraint(
+                condition=models.Q(threshold__isnull=True) | models.Q(window_seconds__gt=0),
+                name='alert_rule_threshold_window',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def severity_set(self):
+        return frozenset(s.strip().upper() for s in self.severities.split(',') if s.strip())
+
+    def clean(self):
+        errors = {}
+        unknown = self.severity_set() - {value for value, _ in SecurityEvent.SEVERITY_CHOICES}
+        if unknown:
+            errors['severities'] = f"Unknown severities: {', '.join(sorted(unknown))}"
+        try:
+            re.compile(self.description_regex)
+        except re.error as exc:
+            errors['description_regex'] = f'Invalid regular expression: {exc}'
+        if self.threshold is not None and not self.window_seconds:
+            errors['window_seconds'] = 'Threshold rules need a window.'
+        if errors:
+            raise ValidationError(errors)
+
 class Alert(models.Model):
     STATUS_CHOICES = (
         ('OPEN', 'Open'),
         ('ACKNOWLEDGED', 'Acknowledged'),
         ('RESOLVED', 'Resolved'),
     )
+    # Bulk status changes only move alerts forward. Target status: the
+    # statuses it can be reached from; an open alert can be resolved directly.
+    TRANSITIONS = {
+        'ACKNOWLEDGED': ('OPEN',),
+        'RESOLVED': ('OPEN', 'ACKNOWLEDGED'),
+    }
 
-    event = models.ForeignKey(SecurityEvent, on_delete=models.CASCADE, related_name='alerts')
+    # No database-level constraint: PostgreSQL cannot reference ``id`` alone
+    # on the partitioned event table. Expiring a partition deletes its alerts.
+    event = models.ForeignKey(
+        SecurityEvent, on_delete=models.CASCADE, related_name='alerts', db_constraint=False
+    )
+    rule = models.ForeignKey(AlertRule, null=True, blank=True, on_delete=models.SET_NULL, related_name='alerts')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='OPEN')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Deduplication: events with the same fingerprint are counted on the
+    # one open alert instead of raising new ones (see monitoring.dedup).
+    fingerprint = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    occurrences = models.PositiveIntegerField(default=1)
+    last_seen = models.DateTimeField(default=timezone.now)
+    # Copies of the event's columns, so filtering and listing alerts does
+    # not join the event table. Set when the alert is created; alerts that
+    # predate them are filled by the backfill_alert_events command.
+    severity = models.CharField(max_length=10, choices=SecurityEvent.SEVERITY_CHOICES, null=True, editable=False)
+    source = models.CharField(max_length=100, null=True, editable=False)
+    event_type = models.CharField(max_length=100, null=True, editable=False)
+    event_timestamp = models.DateTimeField(null=True, editable=False)
+
+    # alert field: event field it copies
+    EVENT_FIELDS = {
+        'severity': 'severity',
+        'source': 'source',
+        'event_type': 'event_type',
+        'event_timestamp': 'timestamp',
+    }
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fingerprint'], condition=models.Q(status='OPEN'),
+                name='alert_open_fingerprint_uniq',
+            ),
+        ]
+        indexes = [
+            # AlertListView: unfiltered listing, newest first
+            models.Index(fields=['-created_at', '-id'], name='alert_created_idx'),
+            # AlertListView: ?status=... ordered by created_at
+            models.Index(fields=['status', '-created_at', '-id'], name='alert_status_created_idx'),
+            # Dashboards polling the open queue only
+            models.Index(
+                fields=['-created_at', '-id'], name='alert_open_created_idx',
+                condition=models.Q(status='OPEN'),
+            ),
+            # AlertListView: ?ordering=-last_seen
+            models.Index(fields=['-last_seen', '-id'], name='alert_last_seen_idx'),
+            # AlertListView: ?event__severity=..., alone or with ?status=
+            models.Index(fields=['severity', '-created_at', '-id'], name='alert_severity_created_idx'),
+            models.Index(fields=['status', 'severity', '-created_at', '-id'], name='alert_status_severity_idx'),
+            # AlertListView: ?event__timestamp__gte=...&event__timestamp__lt=...
+            models.Index(fields=['event_timestamp'], name='alert_event_ts_idx'),
+            # AlertListView: ?source=... and ?event_type=...
+            models.Index(fields=['source', '-created_at'], name='alert_source_created_idx'),
+            models.Index(fields=['event_type', '-created_at'], name='alert_type_created_idx'),
+        ]
 
     def __str__(self):
         return f"Alert for {self.event}"
+
+    @classmethod
+    def for_event(cls, event, **fields):
+        """An unsaved alert for ``event``, with the event's columns copied."""
+        copies = {name: getattr(event, source) for name, source in cls.EVENT_FIELDS.items()}
+        return cls(event=event, **copies, **fields)
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.severity is None:
+            for name, source in self.EVENT_FIELDS.items():
+                setattr(self, name, getattr(self.event, source))
+        super().save(*args, **kwargs)
+
+class QueuedEvent(models.Model):
+    """
+    Staging row for an event accepted by the asynchronous ingest endpoint
+    but not yet written to ``SecurityEvent`` by the ingest worker.
+    """
+    receipt = models.UUIDField(db_index=True)
+    payload = models.JSONField()
+    enqueued_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Queued event {self.pk} ({self.receipt})"
+
+class EventRollup(models.Model):
+    """
+    Pre-aggregated event counts per minute or hour bucket and per
+    ``(severity, event_type, source)``, kept up to date on ingest so that
+    dashboards never have to group the raw event table.
+    """
+    RESOLUTION_CHOICES = (
+        ('minute', 'Minute'),
+        ('hour', 'Hour'),
+    )
+
+    resolution = models.CharField(max_length=6, choices=RESOLUTION_CHOICES)
+    bucket = models.DateTimeField()
+    severity = models.CharField(max_length=10, choices=SecurityEvent.SEVERITY_CHOICES)
+    event_type = models.CharField(max_length=100)
+    source = models.CharField(max_length=100)
+    count = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Upsert target, and serves the time range scans of the stats API
+            models.UniqueConstraint(
+                fields=['resolution', 'bucket', 'severity', 'event_type', 'source'],
+                name='event_rollup_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.count} {self.severity} events per {self.resolution} at {self.bucket}"
+
+class IngestKey(models.Model):
+    """
+    Long-lived API key of one event source, accepted by the ingest
+    endpoints only. Just a keyed hash of the key is stored, see
+    monitoring.apikeys.
+    """
+    RATE_PATTERN = re.compile(r'^\d+/(s|sec|second|m|min|minute|h|hour|d|day)$')
+
+    name = models.CharField(max_length=100)
+    source = models.CharField(
+        max_length=100, blank=True,
+        help_text='Events sent with this key must have this source. Blank allows any source.',
+    )
+    prefix = models.CharField(max_length=12, editable=False)
+    key_hash = models.CharField(max_length=64, unique=True, editable=False)
+    rate = models.CharField(
+        max_length=100, blank=True,
+        help_text='Limits on the events sent with this key, comma-separated, e.g. "50/s,10000/hour". Blank for no limit.',
+    )
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.prefix}...)"
+
+    @property
+    def rates(self):
+        return [rate.strip() for rate in self.rate.split(',') if rate.strip()]
+
+    def clean(self):
+        invalid = [rate for rate in self.rates if not self.RATE_PATTERN.match(rate)]
+        if invalid:
+            raise ValidationError({'rate': f"Invalid rates: {', '.join(invalid)}. Use e.g. 50/s or 1000/min."})
+
+class EventUpload(models.Model):
+    """
+    Progress of a resumable NDJSON upload (see monitoring.uploads). ``lines``
+    counts the lines committed so far, which is where an interrupted upload
+    resumes.
+    """
+    id = models.UUIDField(primary_key=True)
+    owner = models.CharField(max_length=150, help_text='The user or ingest key that started the upload.')
+    lines = models.PositiveBigIntegerField(default=0)
+    created = models.PositiveBigIntegerField(default=0)
+    failed = models.PositiveBigIntegerField(default=0)
+    errors = models.JSONField(default=list, help_text='The first UPLOAD_MAX_ERRORS rejected lines.')
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.pk} ({self.lines} lines)"
@@ -0,0 +1,264 @@
+import base64
+import contextlib
+import json
+from datetime import datetime
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class EstimatedCountPaginator(DjangoPaginator):
+    """
+    Django paginator that takes the row count from the Postgres planner
+    instead of running ``COUNT(*)`` once the estimate is large enough for
+    an exact figure to be expensive and not very useful.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate_count()
+        if estimate is not None and estimate >= settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD:
+            self.count_is_estimate = True
+            return estimate
+        self.count_is_estimate = False
+        return super().count
+
+    def estimate_count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPageNumberPagination(PageNumberPagination):
+    """
+    Page-number pagination for clients that need total counts. Large
+    result sets report a planner estimate and flag it with
+    ``count_is_estimate``.
+    """
+    django_paginator_class = EstimatedCountPaginator
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_paginated_response(self, data):
+        paginator = self.page.paginator
+        return Response({
+            'count': paginator.count,
+            'count_is_estimate': paginator.count_is_estimate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_previous_link(self):
+        # Keep ``page`` on the first page link as well, otherwise following
+        # it would switch the client over to keyset pagination.
+        if not self.page.has_previous():
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page.previous_page_number())
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over ``(ordering field, pk)``.
+
+    Each page is fetched with a ``WHERE (field, pk) < (last seen)`` range
+    condition instead of ``OFFSET``, and no ``COUNT(*)`` is issued, so the
+    cost of a page does not depend on how deep the client has scrolled.
+    The queryset must be ordered by a single non-nullable field; the pk is
+    added as a tie-breaker. Requests carrying ``?page=`` or using any other
+    ordering are served by ``EstimatedCountPageNumberPagination`` instead.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    fallback_class = EstimatedCountPageNumberPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.prepare_queryset(queryset, request)
+        if queryset is None:
+            return self.fallback.paginate_queryset(self.fallback_queryset, request, view)
+        return self.finish_page(list(queryset[:self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views, fetching the page without a thread hop."""
+        queryset = self.prepare_queryset(queryset, request)
+        if queryset is None:
+            return await sync_to_async(self.fallback.paginate_queryset)(
+                self.fallback_queryset, request, view
+            )
+        return self.finish_page([row async for row in queryset[:self.page_size + 1]])
+
+    def prepare_queryset(self, queryset, request):
+        """
+        Return the seek queryset for this request, or ``None`` after setting
+        up ``self.fallback`` when the request is paginated by page number.
+        """
+        self.request = request
+        self.fallback = None
+
+        ordering = self.get_keyset_ordering(queryset)
+        if ordering is None or self.fallback_class.page_query_param in request.query_params:
+            self.fallback = self.fallback_class()
+            self.fallback_queryset = queryset
+            return None
+
+        self.field_name, self.descending = ordering
+        self.pk_name = queryset.model._meta.pk.attname
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(queryset.model, request)
+
+        # Walking backwards means reading the opposite direction and then
+        # flipping the page.
+        descending = self.descending != self.reverse
+        prefix = '-' if descending else ''
+        if self.field_name == 'pk':
+            queryset = queryset.order_by(f'{prefix}pk')
+        else:
+            queryset = queryset.order_by(f'{prefix}{self.field_name}', f'{prefix}pk')
+        if self.cursor:
+            queryset = queryset.filter(self.seek_condition(descending))
+        # .values() rows must carry the columns the cursor is built from,
+        # even when the client did not ask for them.
+        selected = queryset.query.values_select
+        missing = [name for name in (self.field_name, self.pk_name) if name != 'pk' and name not in selected]
+        if selected and missing:
+            queryset = queryset.values(*selected, *missing)
+        return queryset
+
+    @property
+    def reverse(self):
+        return bool(self.cursor and self.cursor['reverse'])
+
+    def finish_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_keyset_ordering(self, queryset):
+        """Return ``(field_name, descending)`` or ``None`` if keyset paging is not possible."""
+        ordering = tuple(queryset.query.order_by) or tuple(queryset.model._meta.ordering)
+        if not ordering:
+            return 'pk', True
+        if len(ordering) != 1 or not isinstance(ordering[0], str):
+            return None
+        name = ordering[0]
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        if name in ('pk', queryset.model._meta.pk.name):
+            return 'pk', descending
+        try:
+            field = queryset.model._meta.get_field(name)
+        except Exception:
+            return None
+        if field.null or not field.concrete:
+            return None
+        return name, descending
+
+    def seek_condition(self, descending):
+        lookup = 'lt' if descending else 'gt'
+        value, pk = self.cursor['value'], self.cursor['pk']
+        if self.field_name == 'pk':
+            return Q(**{f'pk__{lookup}': pk})
+        # Written as ``field <= v AND (field < v OR pk < p)`` rather than a
+        # plain OR so the database can range-scan the ordering index.
+        return Q(**{f'{self.field_name}__{lookup}e': value}) & (
+            Q(**{f'{self.field_name}__{lookup}': value}) | Q(**{f'pk__{lookup}': pk})
+        )
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            with contextlib.suppress(KeyError, ValueError):
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size,
+                )
+        return self.page_size
+
+    def encode_cursor(self, row, reverse):
+        # Rows are model instances, or dicts from .values() (see
+        # prepare_queryset).
+        get = row.__getitem__ if isinstance(row, dict) else partial(getattr, row)
+        value = None
+        if self.field_name != 'pk':
+            value = get(self.field_name)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+        pk = get(self.pk_name)
+        payload = json.dumps({'v': value, 'p': pk, 'r': int(reverse)}, separators=(',', ':'))
+        token = base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, token)
+
+    def decode_cursor(self, model, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            value = payload['v']
+            if self.field_name != 'pk':
+                value = model._meta.get_field(self.field_name).to_python(value)
+            return {'value': value, 'pk': int(payload['p']), 'reverse': bool(payload['r'])}
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # Walked backwards past the start; restart from the top.
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
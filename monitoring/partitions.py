@@ -0,0 +1,279 @@
+"""
+Time-range partitioning of ``SecurityEvent`` on ``timestamp``.
+
+On PostgreSQL the event table is a ``PARTITION BY RANGE`` parent with one
+partition per day or week (``EVENT_PARTITION_INTERVAL``) plus a default
+partition that catches rows no pre-created partition covers. Expired
+partitions are dropped or detached whole, so retention costs the same no
+matter how many events they hold. Other databases keep a plain table and
+retention falls back to chunked deletes.
+"""
+import re
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection as default_connection, transaction
+from django.utils import timezone
+
+from .models import SecurityEvent, Alert
+from .caching import bump_alert_generation
+
+EVENT_TABLE = SecurityEvent._meta.db_table
+DEFAULT_PARTITION = f'{EVENT_TABLE}_default'
+PARTITION_PREFIX = f'{EVENT_TABLE}_p'
+INTERVALS = ('day', 'week')
+DELETE_CHUNK_SIZE = 10000
+
+BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def period_start(moment, interval):
+    """Return the UTC start of the day or ISO week containing ``moment``."""
+    if interval not in INTERVALS:
+        raise ValueError(f'EVENT_PARTITION_INTERVAL must be one of {INTERVALS}, not {interval!r}')
+    day = moment.astimezone(dt_timezone.utc).date()
+    if interval == 'week':
+        day -= timedelta(days=day.weekday())
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def period_end(start, interval):
+    return start + timedelta(days=7 if interval == 'week' else 1)
+
+
+def partition_name(start):
+    return f'{PARTITION_PREFIX}{start:%Y%m%d}'
+
+
+def partition_columns():
+    """Model columns, in table order. Excludes the generated search column."""
+    return [field.column for field in SecurityEvent._meta.concrete_fields]
+
+
+def is_partitioned(connection=default_connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [EVENT_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(connection=default_connection):
+    """Return ``[(name, start, end)]`` for every range partition, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND pg_table_is_visible(p.oid)",
+            [EVENT_TABLE],
+        )
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound in rows:
+        match = BOUND_RE.search(bound)
+        if match:
+            start, end = (datetime.fromisoformat(value) for value in match.groups())
+            partitions.append((name, start, end))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partition(connection, start, end):
+    """
+    Create the partition for ``[start, end)``. Rows for that range that
+    already landed in the default partition are moved into it.
+    """
+    name = partition_name(start)
+    columns = ', '.join(connection.ops.quote_name(column) for column in partition_columns())
+    timestamp = connection.ops.quote_name(SecurityEvent._meta.get_field('timestamp').column)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+            f"WHERE {timestamp} >= %s AND {timestamp} < %s)",
+            [start, end],
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF {EVENT_TABLE} "
+                f"FOR VALUES FROM (%s) TO (%s)",
+                [start, end],
+            )
+            return name
+        cursor.execute(f"ALTER TABLE {EVENT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}")
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF {EVENT_TABLE} FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            f"WHERE {timestamp} >= %s AND {timestamp} < %s RETURNING {columns}) "
+            f"INSERT INTO {EVENT_TABLE} ({columns}) SELECT {columns} FROM moved",
+            [start, end],
+        )
+        cursor.execute(f"ALTER TABLE {EVENT_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+    return name
+
+
+def ensure_partitions(connection=default_connection, ahead=None, since=None, now=None, dry_run=False):
+    """
+    Create any missing partitions from ``since`` (default: now) up to
+    ``ahead`` periods in the future. Periods that overlap an existing
+    partition, e.g. after switching from daily to weekly, are skipped.
+    Returns the names of the partitions created.
+    """
+    interval = settings.EVENT_PARTITION_INTERVAL
+    ahead = settings.EVENT_PARTITIONS_AHEAD if ahead is None else ahead
+    now = now or timezone.now()
+    existing = list_partitions(connection)
+
+    start = period_start(since or now, interval)
+    last = period_start(now, interval)
+    for _ in range(ahead):
+        last = period_end(last, interval)
+
+    created = []
+    while start <= last:
+        end = period_end(start, interval)
+        if not any(s < end and start < e for _, s, e in existing):
+            if not dry_run:
+                create_partition(connection, start, end)
+            created.append(partition_name(start))
+            existing.append((partition_name(start), start, end))
+        start = end
+    return created
+
+
+def expire_partitions(connection=default_connection, retention_days=None, archive=False, now=None, dry_run=False):
+    """
+    Remove every partition whose whole range is older than the retention
+    period, together with the alerts of its events. ``archive`` detaches the
+    partitions, leaving them as standalone tables, instead of dropping them.
+    Returns the names of the partitions removed.
+    """
+    retention_days = settings.EVENT_RETENTION_DAYS if retention_days is None else retention_days
+    if not retention_days:
+        return []
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+    expired = [(name, end) for name, _, end in list_partitions(connection) if end <= cutoff]
+    if dry_run or not expired:
+        return [name for name, _ in expired]
+
+    with transaction.atomic(using=connection.alias):
+        # Alert.event has no database-level foreign key on a partitioned
+        # table, so the cascade is done here. The range lets the planner
+        # prune the join down to the expired partitions.
+        Alert.objects.using(connection.alias).filter(event__timestamp__lt=expired[-1][1]).delete()
+        bump_alert_generation()
+        with connection.cursor() as cursor:
+            for name, _ in expired:
+                if archive:
+                    cursor.execute(f"ALTER TABLE {EVENT_TABLE} DETACH PARTITION {name}")
+                    cursor.execute(f"ALTER TABLE {name} RENAME TO {name}_archived")
+                else:
+                    cursor.execute(f"DROP TABLE {name}")
+    return [name for name, _ in expired]
+
+
+def delete_expired_events(retention_days=None, now=None, dry_run=False):
+    """
+    Retention for databases without partitioning: delete events older
+    than the retention period, and their alerts, in chunks. Returns the
+    number of events deleted, or that would be deleted with ``dry_run``.
+    """
+    retention_days = settings.EVENT_RETENTION_DAYS if retention_days is None else retention_days
+    if not retention_days:
+        return 0
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+    expired = SecurityEvent.objects.filter(timestamp__lt=cutoff)
+    if dry_run:
+        return expired.count()
+
+    deleted = 0
+    while True:
+        ids = list(expired.values_list('pk', flat=True)[:DELETE_CHUNK_SIZE])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            Alert.objects.filter(event_id__in=ids).delete()
+            SecurityEvent.objects.filter(pk__in=ids).delete()
+            bump_alert_generation()
+        deleted += len(ids)
+
+
+def _table_columns(connection, table):
+    # Migrations work from the table as it is in the database, not from
+    # the current model, which may have moved on since.
+    with connection.cursor() as cursor:
+        description = connection.introspection.get_table_description(cursor, table)
+    return ', '.join(connection.ops.quote_name(column.name) for column in description)
+
+
+def partition_event_table(schema_editor):
+    """
+    Convert the plain event table into a partitioned one and copy the rows
+    over. The primary key becomes ``(id, timestamp)`` because PostgreSQL
+    requires the partition key in every unique constraint. Used from
+    migrations.
+    """
+    from .search import install_search_index, uninstall_search_index
+
+    connection = schema_editor.connection
+    legacy = f'{EVENT_TABLE}_legacy'
+
+    uninstall_search_index(schema_editor)
+    schema_editor.execute("DROP INDEX IF EXISTS event_severity_ts_idx")
+    schema_editor.execute(f"ALTER TABLE {EVENT_TABLE} RENAME TO {legacy}")
+    schema_editor.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT {EVENT_TABLE}_pkey TO {legacy}_pkey")
+    columns = _table_columns(connection, legacy)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT coalesce(max(id), 0) + 1, min("timestamp") FROM {legacy}')
+        next_id, oldest = cursor.fetchone()
+    schema_editor.execute(f"ALTER TABLE {legacy} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+
+    schema_editor.execute(f"CREATE SEQUENCE {EVENT_TABLE}_id_seq START WITH {int(next_id)}")
+    schema_editor.execute(
+        f'CREATE TABLE {EVENT_TABLE} (LIKE {legacy}, PRIMARY KEY (id, "timestamp")) '
+        f'PARTITION BY RANGE ("timestamp")'
+    )
+    schema_editor.execute(
+        f"ALTER TABLE {EVENT_TABLE} ALTER COLUMN id SET DEFAULT nextval('{EVENT_TABLE}_id_seq')"
+    )
+    schema_editor.execute(f"ALTER SEQUENCE {EVENT_TABLE}_id_seq OWNED BY {EVENT_TABLE}.id")
+    schema_editor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {EVENT_TABLE} DEFAULT")
+    ensure_partitions(connection, since=oldest)
+
+    schema_editor.execute(f'CREATE INDEX event_severity_ts_idx ON {EVENT_TABLE} (severity, "timestamp" DESC)')
+    install_search_index(schema_editor)
+    schema_editor.execute(f"INSERT INTO {EVENT_TABLE} ({columns}) SELECT {columns} FROM {legacy}")
+    schema_editor.execute(f"DROP TABLE {legacy}")
+
+
+def unpartition_event_table(schema_editor):
+    """Reverse of ``partition_event_table``: copy back into a plain table."""
+    from .search import install_search_index, uninstall_search_index
+
+    connection = schema_editor.connection
+    partitioned = f'{EVENT_TABLE}_partitioned'
+
+    uninstall_search_index(schema_editor)
+    schema_editor.execute("DROP INDEX IF EXISTS event_severity_ts_idx")
+    schema_editor.execute(f"ALTER TABLE {EVENT_TABLE} RENAME TO {partitioned}")
+    schema_editor.execute(f"ALTER TABLE {partitioned} RENAME CONSTRAINT {EVENT_TABLE}_pkey TO {partitioned}_pkey")
+    columns = _table_columns(connection, partitioned)
+    schema_editor.execute(f"ALTER TABLE {partitioned} ALTER COLUMN id DROP DEFAULT")
+    schema_editor.execute(f"DROP SEQUENCE {EVENT_TABLE}_id_seq")
+
+    schema_editor.execute(f"CREATE TABLE {EVENT_TABLE} (LIKE {partitioned}, PRIMARY KEY (id))")
+    schema_editor.execute(f"ALTER TABLE {EVENT_TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY")
+    schema_editor.execute(f"INSERT INTO {EVENT_TABLE} ({columns}) SELECT {columns} FROM {partitioned}")
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{EVENT_TABLE}', 'id'), "
+        f"coalesce((SELECT max(id) FROM {EVENT_TABLE}), 0) + 1, false)"
+    )
+    schema_editor.execute(f"DROP TABLE {partitioned}")
+
+    schema_editor.execute(f'CREATE INDEX event_severity_ts_idx ON {EVENT_TABLE} (severity, "timestamp" DESC)')
+    install_search_index(schema_editor)
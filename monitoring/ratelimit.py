@@ -0,0 +1,126 @@
+"""
+GCRA rate limiting in a shared cache.
+
+A rate of N per period lets a key spend up to N units at once, and gives
+them back at one unit every period / N. The generic cell rate algorithm
+(GCRA) tracks this with a single number per key, the theoretical arrival
+time (TAT): the moment the key's allowance is whole again. A request
+costing c units is allowed if pushing the TAT c intervals later leaves it
+at most one period ahead of now. State per key is one integer whatever the
+rate, and it expires when the allowance is whole again, so idle keys are
+evicted by the cache itself.
+
+With the Redis cache the check and the update run as one Lua script,
+registered once per process, so all workers share each limit exactly.
+Other caches do a get and a set under a process lock, which is only exact
+within one process.
+"""
+import math
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+KEY_PREFIX = 'monitoring:ratelimit'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# retry_after is in seconds, 0 when allowed and None when the request
+# costs more than the whole allowance and so can never be allowed.
+# remaining is how many units the key may spend right now (after this
+# request, if it was allowed), limit the most it can ever spend at once.
+Decision = namedtuple('Decision', 'allowed remaining retry_after limit')
+
+# KEYS[1]: the TAT; ARGV: now, interval, capacity, cost (microseconds and
+# units). Returns {allowed, TAT before the request}. Numbers are written
+# with %d because Lua would print these as 1.7e+15.
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then tat = now end
+local new_tat = tat + tonumber(ARGV[4]) * tonumber(ARGV[2])
+if new_tat - now > tonumber(ARGV[3]) then
+    return {0, string.format('%d', tat)}
+end
+local ttl = math.max(math.ceil((new_tat - now) / 1000), 0) + 1000
+redis.call('SET', KEYS[1], string.format('%d', new_tat), 'PX', string.format('%d', ttl))
+return {1, string.format('%d', tat)}
+"""
+
+_lock = threading.Lock()
+# GCRA_SCRIPT registered once, on the first client that runs it; redis-py
+# loads it into any server that does not know it yet.
+_gcra_script = None
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """``'50/s'`` -> ``(50, 1)``: units per period in seconds. Periods are s, m, h or d."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def redis_client(cache):
+    """
+    The redis-py client Django's ``RedisCache`` writes with, or None for
+    other caches. Django has no public API for it, so a cache without the
+    expected internals is treated like any other cache and limited per
+    process.
+    """
+    if not isinstance(cache, RedisCache):
+        return None
+    get_client = getattr(getattr(cache, '_cache', None), 'get_client', None)
+    return get_client(write=True) if get_client is not None else None
+
+
+def run_gcra(client, key, args):
+    global _gcra_script
+    if _gcra_script is None:
+        _gcra_script = client.register_script(GCRA_SCRIPT)
+    return _gcra_script(keys=[key], args=args, client=client)
+
+
+class RateLimiter:
+    def __init__(self, cache=None):
+        self.cache = cache or caches[settings.THROTTLE_CACHE]
+
+    def consume(self, key, rate, cost=1, now=None):
+        """
+        Spend ``cost`` units of ``key``'s ``rate`` if it has them. A denied
+        request spends nothing; ``retry_after`` is when the same request
+        would fit, or None if it costs more than the rate's whole allowance.
+        """
+        limit, period = parse_rate(rate)
+        interval = max(1, round(period * 1_000_000 / limit))
+        capacity = interval * limit
+        now = int((time.time() if now is None else now) * 1_000_000)
+        allowed, tat = self.update(f'{KEY_PREFIX}:{key}:{rate}', now, interval, capacity, cost)
+        if allowed:
+            return Decision(True, (capacity - (tat - now)) // interval - cost, 0, limit)
+        remaining = (capacity - (tat - now)) // interval
+        if cost > limit:
+            return Decision(False, remaining, None, limit)
+        ready = tat + cost * interval - capacity
+        return Decision(False, remaining, (ready - now) / 1_000_000, limit)
+
+    def refund(self, key, rate, cost=1, now=None):
+        """Give back units spent by ``consume``, e.g. when another limit then refused the request."""
+        self.consume(key, rate, -cost, now=now)
+
+    def update(self, key, now, interval, capacity, cost):
+        """Returns ``(allowed, TAT before the request)`` and stores the new TAT if allowed."""
+        client = redis_client(self.cache)
+        if client is not None:
+            key = self.cache.make_and_validate_key(key)
+            allowed, tat = run_gcra(client, key, [now, interval, capacity, cost])
+            return bool(allowed), int(tat)
+        with _lock:
+            tat = max(self.cache.get(key) or now, now)
+            new_tat = tat + cost * interval
+            if new_tat - now > capacity:
+                return False, tat
+            self.cache.set(key, new_tat, timeout=max(math.ceil((new_tat - now) / 1_000_000), 0) + 1)
+            return True, tat
@@ -0,0 +1,118 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` that encodes with orjson when it is installed.
+
+    The output is byte-for-byte what ``JSONRenderer`` produces with DRF's
+    default compact, unicode settings. Datetimes and dataclasses still go
+    through DRF's encoder. Indented output, other settings and data that
+    orjson rejects fall back to ``JSONRenderer``. Only meant for responses
+    without floats, whose exponent notation differs between the two.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or not self.compact or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer escapes these for JavaScript's sake, do the same.
+        for raw, escaped in LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
+
+
+def flatten(item, prefix=''):
+    for name, value in item.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f'{prefix}{name}.')
+        else:
+            yield prefix + name, value
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline-delimited JSON, one object per line; a list is written one
+    item per line. Exports stream their rows through ``start`` and
+    ``render_rows``, one chunk at a time.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return self.render_rows(data if isinstance(data, list) else [data])
+
+    def start(self, columns):
+        return b''
+
+    def render_rows(self, items, columns=None):
+        if orjson is not None:
+            default = JSONEncoder().default
+            return b''.join([orjson.dumps(item, default=default) + b'\n' for item in items])
+        return ''.join([
+            json.dumps(item, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')) + '\n' for item in items
+        ]).encode()
+
+
+# Leading characters that make spreadsheets read a cell as a formula.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def escape_cell(value):
+    """Text a spreadsheet would evaluate, prefixed with ``'`` so it is shown as text."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    CSV with a header row. Nested objects are flattened into
+    ``parent.child`` columns. Text cells starting like a formula are
+    escaped (see ``escape_cell``), since event fields come from sensors.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        items = data if isinstance(data, list) else [data]
+        columns = [name for name, _ in flatten(items[0])] if items else []
+        return self.start(columns) + self.render_rows(items, columns)
+
+    def write(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
+
+    def start(self, columns):
+        return self.write([columns])
+
+    def render_rows(self, items, columns):
+        rows = []
+        for item in items:
+            values = dict(flatten(item))
+            rows.append([escape_cell(values.get(column)) for column in columns])
+        return self.write(rows)
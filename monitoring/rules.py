@@ -0,0 +1,146 @@
+"""
+Alert rule engine.
+
+Enabled ``AlertRule`` rows are compiled into a dispatch table keyed on
+``(event_type, source)``, with ``None`` standing for a blank criterion, so
+an event is only checked against the rules that can possibly match it.
+Regexes are compiled once. The compiled table is cached per process and
+rebuilt when the rule version in the shared cache changes, which every
+rule save or delete bumps, or after ``ALERT_RULE_CACHE_TTL`` seconds.
+Rules with a threshold are handed to monitoring.detectors instead of
+matching on their own.
+"""
+import logging
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional, Pattern
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import AlertRule
+from .detectors import detect_thresholds
+
+logger = logging.getLogger(__name__)
+
+RULE_VERSION_KEY = 'monitoring:alert_rules:version'
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    id: int
+    priority: int
+    severities: frozenset
+    pattern: Optional[Pattern]
+    threshold: Optional[int] = None
+    window: int = 0
+    group_by: str = ''
+
+    def matches(self, event):
+        if self.severities and event.severity not in self.severities:
+            return False
+        return self.pattern is None or self.pattern.search(event.description) is not None
+
+
+class RuleIndex:
+    """Compiled rules bucketed by ``(event_type, source)``."""
+
+    def __init__(self, rules):
+        buckets = defaultdict(list)
+        for rule in rules:
+            try:
+                pattern = re.compile(rule.description_regex) if rule.description_regex else None
+            except re.error:
+                logger.warning('Skipping alert rule %s: invalid description_regex', rule.pk)
+                continue
+            compiled = CompiledRule(
+                rule.pk, rule.priority, rule.severity_set(), pattern,
+                rule.threshold, rule.window_seconds, rule.group_by,
+            )
+            buckets[(rule.event_type or None, rule.source or None)].append(compiled)
+        self.buckets = dict(buckets)
+        self.size = sum(len(bucket) for bucket in self.buckets.values())
+
+    def candidates(self, event):
+        get = self.buckets.get
+        rules = [
+            *get((event.event_type, event.source), ()),
+            *get((event.event_type, None), ()),
+            *get((None, event.source), ()),
+            *get((None, None), ()),
+        ]
+        rules.sort(key=lambda rule: (rule.priority, rule.id))
+        return rules
+
+    def match(self, event):
+        """
+        Return ``(rule_id, threshold_rules)``: the id of the first plain rule
+        matching ``event`` or ``None``, and every matching threshold rule.
+        """
+        rule_id, threshold_rules = None, []
+        for rule in self.candidates(event):
+            if not rule.matches(event):
+                continue
+            if rule.threshold is not None:
+                threshold_rules.append(rule)
+            elif rule_id is None:
+                rule_id = rule.id
+        return rule_id, threshold_rules
+
+
+_compiled = {'index': None, 'version': None, 'loaded_at': 0.0}
+
+
+def rule_version():
+    return cache.get_or_set(RULE_VERSION_KEY, 1, timeout=None)
+
+
+def get_rule_index():
+    """Return the compiled rules, rebuilding them if they are stale."""
+    version = rule_version()
+    stale = time.monotonic() - _compiled['loaded_at'] > settings.ALERT_RULE_CACHE_TTL
+    if _compiled['index'] is None or _compiled['version'] != version or stale:
+        _compiled['index'] = RuleIndex(AlertRule.objects.filter(enabled=True))
+        _compiled['version'] = version
+        _compiled['loaded_at'] = time.monotonic()
+    return _compiled['index']
+
+
+def match_events(events):
+    """
+    Return ``[(event, rule_id)]`` for every event matched by a plain rule
+    and for every event that takes a threshold rule over its threshold.
+    """
+    index = get_rule_index()
+    if not index.size:
+        return []
+    matches, hits = [], []
+    for event in events:
+        rule_id, threshold_rules = index.match(event)
+        if rule_id is not None:
+            matches.append((event, rule_id))
+        hits.extend((event, rule) for rule in threshold_rules)
+    if hits:
+        matches.extend(detect_thresholds(hits))
+    return matches
+
+
+def bump_rule_version():
+    try:
+        cache.incr(RULE_VERSION_KEY)
+    except ValueError:
+        cache.set(RULE_VERSION_KEY, 2, timeout=None)
+
+
+@receiver(post_save, sender=AlertRule)
+@receiver(post_delete, sender=AlertRule)
+def invalidate_rules(sender=None, **kwargs):
+    # This process recompiles right away, other processes once the change
+    # is committed and visible to them.
+    _compiled['index'] = None
+    transaction.on_commit(bump_rule_version)
@@ -0,0 +1,155 @@
+"""
+Full-text search over ``SecurityEvent`` source, event type and description.
+
+PostgreSQL stores a generated ``tsvector`` column with a GIN index, SQLite
+keeps an FTS5 external-content table in sync through triggers. Both are
+maintained by the database itself, so bulk inserts are indexed too.
+"""
+import re
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+EVENT_TABLE = 'monitoring_securityevent'
+FTS_TABLE = 'monitoring_securityevent_fts'
+
+POSTGRES_INSTALL = [
+    f"""
+    ALTER TABLE {EVENT_TABLE} ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(source, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(event_type, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    f"CREATE INDEX event_search_vector_idx ON {EVENT_TABLE} USING GIN (search_vector)",
+]
+
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS event_search_vector_idx",
+    f"ALTER TABLE {EVENT_TABLE} DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        source, event_type, description,
+        content='{EVENT_TABLE}', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {EVENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, source, event_type, description)
+        VALUES (new.id, new.source, new.event_type, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {EVENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, source, event_type, description)
+        VALUES ('delete', old.id, old.source, old.event_type, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON {EVENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, source, event_type, description)
+        VALUES ('delete', old.id, old.source, old.event_type, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, source, event_type, description)
+        VALUES (new.id, new.source, new.event_type, new.description);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def install_search_index(schema_editor):
+    """Create the vendor-specific search index. Used from migrations."""
+    statements = {'postgresql': POSTGRES_INSTALL, 'sqlite': SQLITE_INSTALL}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def uninstall_search_index(schema_editor):
+    statements = {'postgresql': POSTGRES_UNINSTALL, 'sqlite': SQLITE_UNINSTALL}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def search_tokens(value):
+    """Split user input into plain word tokens, dropping any query syntax."""
+    return re.findall(r'\w+', value.lower())
+
+
+def match_sql(vendor, tokens):
+    """
+    Return ``(match, rank)`` SQL fragments with their params, or ``None``
+    if the vendor has no search index. ``match`` selects matching event ids,
+    ``rank`` scores one event whose id is substituted for ``{event_id}``.
+    Every token must match, as a prefix, like the ``icontains`` search.
+    """
+    if vendor == 'postgresql':
+        query = ' & '.join(f'{token}:*' for token in tokens)
+        match = (
+            f"SELECT id FROM {EVENT_TABLE} "
+            f"WHERE search_vector @@ to_tsquery('english', %s)"
+        )
+        rank = (
+            f"SELECT ts_rank(e.search_vector, to_tsquery('english', %s)) "
+            f"FROM {EVENT_TABLE} e WHERE e.id = {{event_id}}"
+        )
+        return (match, [query]), (rank, [query])
+    if vendor == 'sqlite':
+        query = ' '.join(f'"{token}"*' for token in tokens)
+        match = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        # bm25() is lower for better matches, negate it so higher ranks first.
+        rank = (
+            f"SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {{event_id}}"
+        )
+        return (match, [query]), (rank, [query])
+    return None
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` backed by the database full-text index instead of
+    ``icontains`` scans. Results are annotated with ``search_rank`` and,
+    unless the client asked for an explicit ``?ordering=``, ranked best
+    first. Databases without a search index fall back to ``search_fields``.
+
+    The view names the relation leading to the event with
+    ``search_event_field`` (``'event'`` for alerts, ``'pk'`` for events).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = ' '.join(self.get_search_terms(request))
+        if not terms:
+            return queryset
+        tokens = search_tokens(terms)
+        if not tokens:
+            return queryset.none()
+
+        sql = match_sql(connections[queryset.db].vendor, tokens)
+        if sql is None:
+            return super().filter_queryset(request, queryset, view)
+        (match, match_params), (rank, rank_params) = sql
+
+        field = getattr(view, 'search_event_field', 'pk')
+        opts = queryset.model._meta
+        column = opts.pk.column if field == 'pk' else opts.get_field(field).column
+        event_id = f'"{opts.db_table}"."{column}"'
+
+        queryset = queryset.filter(**{f'{field}__in': RawSQL(match, match_params)}).annotate(
+            search_rank=RawSQL(rank.format(event_id=event_id), rank_params)
+        )
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by('-search_rank', *queryset.query.order_by)
+        return queryset
@@ -0,0 +1,145 @@
+"""
+Synthetic data for benchmarks.
+
+``seed_events`` writes events straight to the table, with ``COPY`` on
+PostgreSQL and multi-row inserts elsewhere, bypassing the ORM and the
+alert signals. It then raises alerts for the high and critical events
+with one ``INSERT ... SELECT``. Millions of rows take minutes rather than
+hours. Rollups are recorded as usual, so ``/api/stats/`` matches the
+seeded data.
+"""
+import io
+import random
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .models import SecurityEvent, Alert
+from .partitions import is_partitioned, ensure_partitions
+from .rollups import record_rollups
+from .caching import bump_alert_generation
+
+SeedEvent = namedtuple('SeedEvent', 'source event_type severity description timestamp')
+
+SOURCES = [f'{kind}-{n:02d}' for kind in ('FW', 'IDS', 'EDR', 'WAF', 'Model') for n in range(20)]
+EVENT_TYPES = [
+    'PortScan', 'FailedLogin', 'Malware', 'Exploit', 'Beacon',
+    'DataExfiltration', 'PrivilegeEscalation', 'Phishing', 'DNSTunnel', 'BruteForce',
+]
+SEVERITIES = ('LOW', 'MEDIUM', 'HIGH', 'CRITICAL')
+SEVERITY_WEIGHTS = (50, 30, 15, 5)
+WORDS = (
+    'blocked allowed inbound outbound connection host user admin payload signature '
+    'ransomware trojan credential token lateral movement anomaly beacon domain '
+    'certificate suspicious process registry powershell encoded request'
+).split()
+
+
+def generate_events(count, days=30, now=None, seed=0):
+    """Yield ``count`` random events spread over the last ``days`` days."""
+    rng = random.Random(seed)
+    now = now or timezone.now()
+    span = days * 86400
+    for _ in range(count):
+        yield SeedEvent(
+            rng.choice(SOURCES),
+            rng.choice(EVENT_TYPES),
+            rng.choices(SEVERITIES, SEVERITY_WEIGHTS)[0],
+            ' '.join(rng.choices(WORDS, k=rng.randint(6, 30))),
+            now - timedelta(seconds=rng.random() * span),
+        )
+
+
+def _copy_events(connection, columns, batch):
+    buffer = io.StringIO()
+    for event in batch:
+        buffer.write('\t'.join((
+            event.source, event.event_type, event.severity, event.description,
+            event.timestamp.isoformat(),
+        )))
+        buffer.write('\n')
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {SecurityEvent._meta.db_table} ({', '.join(columns)}) FROM STDIN", buffer
+        )
+
+
+def _insert_events(connection, columns, batch, chunk_size=500):
+    adapt = connection.ops.adapt_datetimefield_value
+    placeholders = '(%s, %s, %s, %s, %s)'
+    table = connection.ops.quote_name(SecurityEvent._meta.db_table)
+    with connection.cursor() as cursor:
+        for i in range(0, len(batch), chunk_size):
+            chunk = batch[i:i + chunk_size]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([placeholders] * len(chunk))}",
+                [
+                    value
+                    for event in chunk
+                    for value in (event.source, event.event_type, event.severity,
+                                  event.description, adapt(event.timestamp))
+                ],
+            )
+
+
+def seed_alerts(connection, after_id):
+    """
+    Raise an alert for every high or critical event with an id above
+    ``after_id``. Statuses are spread 70/20/10 over open, acknowledged and
+    resolved. Returns the number of alerts created.
+    """
+    quote = connection.ops.quote_name
+    alert_table = quote(Alert._meta.db_table)
+    event_table = quote(SecurityEvent._meta.db_table)
+    timestamp = quote(SecurityEvent._meta.get_field('timestamp').column)
+    copies = ', '.join(quote(Alert._meta.get_field(name).column) for name in Alert.EVENT_FIELDS)
+    copied = ', '.join(quote(SecurityEvent._meta.get_field(name).column) for name in Alert.EVENT_FIELDS.values())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {alert_table} (event_id, status, created_at, occurrences, last_seen, {copies}) "
+            f"SELECT id, CASE WHEN id %% 10 < 7 THEN 'OPEN' WHEN id %% 10 < 9 THEN 'ACKNOWLEDGED' "
+            f"ELSE 'RESOLVED' END, {timestamp}, 1, {timestamp}, {copied} FROM {event_table} "
+            f"WHERE id > %s AND severity IN ('HIGH', 'CRITICAL')",
+            [after_id],
+        )
+        return cursor.rowcount
+
+
+def seed_events(count, days=30, batch_size=10000, seed=0, progress=None):
+    """
+    Insert ``count`` generated events and their alerts. ``progress`` is
+    called with the number of events written so far after each batch.
+    Returns ``(events, alerts)``.
+    """
+    connection = connections[router.db_for_write(SecurityEvent)]
+    now = timezone.now()
+    if is_partitioned(connection):
+        ensure_partitions(connection, since=now - timedelta(days=days), now=now)
+
+    columns = [
+        connection.ops.quote_name(SecurityEvent._meta.get_field(name).column)
+        for name in SeedEvent._fields
+    ]
+    write = _copy_events if connection.vendor == 'postgresql' else _insert_events
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {SecurityEvent._meta.db_table}")
+        after_id = cursor.fetchone()[0]
+
+    written = 0
+    events = generate_events(count, days, now, seed)
+    while written < count:
+        batch = [event for _, event in zip(range(batch_size), events)]
+        with transaction.atomic(using=connection.alias):
+            write(connection, columns, batch)
+            record_rollups(batch)
+        written += len(batch)
+        if progress:
+            progress(written)
+
+    with transaction.atomic(using=connection.alias):
+        alerts = seed_alerts(connection, after_id)
+        bump_alert_generation()
+    return written, alerts
@@ -1,15 +1,279 @@
-from rest_framework import serializers
-from .models import SecurityEvent, Alert
+from datetime import timedelta
 
-class SecurityEventSerializer(serializers.ModelSerializer):
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import ISO_8601, serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from .models import SecurityEvent, Alert, EventUpload
+from .metrics import TimedSerializerMixin
+
+# How far ahead of the server's clock a backfilled event may be stamped
+BACKFILL_CLOCK_SKEW = timedelta(minutes=5)
+
+class SecurityEventSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = SecurityEvent
         fields = '__all__'
 
-class AlertSerializer(serializers.ModelSerializer):
+    def validate_source(self, value):
+        # Set for clients authenticated with a per-source ingest key
+        source = self.context.get('ingest_source')
+        if source is not None and value != source:
+            raise serializers.ValidationError(f'This API key may only send events from {source}.')
+        return value
+
+class BackfillEventSerializer(SecurityEventSerializer):
+    """Events of a backfill upload, which may carry the time they happened."""
+    timestamp = serializers.DateTimeField(required=False)
+
+    def validate_timestamp(self, value):
+        now = timezone.now()
+        if value > now + BACKFILL_CLOCK_SKEW:
+            raise serializers.ValidationError('Timestamp is in the future.')
+        if settings.EVENT_RETENTION_DAYS and value < now - timedelta(days=settings.EVENT_RETENTION_DAYS):
+            raise serializers.ValidationError(
+                f'Timestamp is older than the {settings.EVENT_RETENTION_DAYS}-day retention.'
+            )
+        return value
+
+def split_names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+def select_fields(serializer, paths, unknown, prefix=''):
+    wanted = {}
+    for path in paths:
+        name, _, rest = path.partition('.')
+        wanted.setdefault(name, []).append(rest)
+    fieldset = []
+    for name, field in serializer.fields.items():
+        if name not in wanted or field.write_only:
+            continue
+        requested = wanted.pop(name)
+        rest = [path for path in requested if path]
+        if not isinstance(field, serializers.BaseSerializer):
+            unknown.extend(f'{prefix}{name}.{path}' for path in rest)
+            fieldset.append((name, None))
+        elif len(rest) < len(requested):
+            # Named on its own, or expanded: the whole object
+            fieldset.append((name, None))
+        else:
+            fieldset.append((name, select_fields(field, rest, unknown, f'{prefix}{name}.')))
+    unknown.extend(prefix + name for name in wanted)
+    return tuple(fieldset)
+
+def parse_fieldset(serializer, fields, expand=None):
+    """
+    Turn the ``?fields=`` and ``?expand=`` query parameters into a fieldset
+    for ``serializer``: a tuple of ``(name, nested_fieldset)`` pairs, where
+    ``nested_fieldset`` is ``None`` for every field of a nested serializer.
+    ``fields`` takes comma-separated names, with ``parent.child`` for the
+    fields of an embedded object. ``expand`` names embedded objects to
+    include in full. Returns ``None``, meaning every field, when ``fields``
+    is empty.
+    """
+    paths = split_names(fields)
+    if not paths:
+        return None
+    errors = {}
+    expanded = split_names(expand)
+    bad_expand = [
+        name for name in expanded
+        if not isinstance(serializer.fields.get(name), serializers.BaseSerializer)
+    ]
+    if bad_expand:
+        errors['expand'] = [f"Cannot expand: {', '.join(bad_expand)}."]
+    unknown = []
+    fieldset = select_fields(serializer, paths + expanded, unknown)
+    if unknown:
+        errors['fields'] = [f"Unknown fields: {', '.join(unknown)}."]
+    if errors:
+        raise ValidationError(errors)
+    return fieldset
+
+def prune_fields(serializer, fieldset):
+    selected = dict(fieldset)
+    for name in list(serializer.fields):
+        if name not in selected:
+            serializer.fields.pop(name)
+        elif selected[name] is not None:
+            prune_fields(serializer.fields[name], selected[name])
+
+class SparseFieldsetMixin:
+    """
+    Accept a ``fieldset`` keyword (see ``parse_fieldset``) and leave out
+    the fields it does not select.
+    """
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fieldset is not None:
+            prune_fields(self, fieldset)
+
+class AlertSerializer(SparseFieldsetMixin, TimedSerializerMixin, serializers.ModelSerializer):
     event_details = SecurityEventSerializer(source='event', read_only=True)
     
     class Meta:
         model = Alert
-        fields = ('id', 'event', 'event_details', 'status', 'created_at')
-        read_only_fields = ('created_at', 'event')
+        fields = ('id', 'event', 'event_details', 'status', 'created_at', 'occurrences', 'last_seen')
+        read_only_fields = ('created_at', 'event', 'occurrences', 'last_seen')
+
+class AlertBulkStatusSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=list(Alert.TRANSITIONS))
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False,
+        max_length=settings.ALERT_BULK_MAX_IDS,
+    )
+
+class EventUploadSerializer(serializers.ModelSerializer):
+    # The line to resume from
+    offset = serializers.IntegerField(source='lines', read_only=True)
+
+    class Meta:
+        model = EventUpload
+        fields = ('id', 'offset', 'created', 'failed', 'errors', 'started_at', 'updated_at')
+        read_only_fields = fields
+
+# Fields whose to_representation returns a value from .values() unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.ChoiceField, serializers.IntegerField,
+    serializers.BooleanField, serializers.PrimaryKeyRelatedField,
+)
+
+def is_iso_datetime(field):
+    return (
+        type(field) is serializers.DateTimeField and not hasattr(field, 'timezone')
+        and getattr(field, 'format', api_settings.DATETIME_FORMAT).lower() == ISO_8601
+    )
+
+def compile_representation(serializer, prefix='', aliases=None):
+    """
+    Return a plan of ``(name, column, convert, nested_plan, iso_datetime)``
+    entries that reproduces ``serializer.to_representation`` from a
+    ``.values()`` row. ``aliases`` maps a column to another one holding the
+    same value, e.g. a related column to a local copy.
+    """
+    aliases = aliases or {}
+    plan = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        column = prefix + field.source.replace('.', '__')
+        if isinstance(field, serializers.BaseSerializer):
+            nested = compile_representation(field, column + '__', aliases)
+            plan.append((name, column, None, nested, False))
+        elif isinstance(field, serializers.RelatedField) and not isinstance(field, serializers.PrimaryKeyRelatedField):
+            raise ImproperlyConfigured(f'{name}: only primary key relations can be read from .values()')
+        else:
+            convert = None if isinstance(field, PASSTHROUGH_FIELDS) else field.to_representation
+            plan.append((name, aliases.get(column, column), convert, None, is_iso_datetime(field)))
+    return plan
+
+def plan_columns(plan):
+    for _, column, _, nested, _ in plan:
+        yield column
+        if nested:
+            yield from plan_columns(nested)
+
+def plan_headers(plan, prefix=''):
+    """Flat column names for ``plan``, ``parent.child`` for nested fields (see CSVRenderer)."""
+    for name, _, _, nested, _ in plan:
+        if nested is None:
+            yield prefix + name
+        else:
+            yield from plan_headers(nested, f'{prefix}{name}.')
+
+def select_plan(plan, fieldset):
+    selected = dict(fieldset)
+    return [
+        (name, column, convert,
+         nested if nested is None or selected[name] is None else select_plan(nested, selected[name]),
+         iso_datetime)
+        for name, column, convert, nested, iso_datetime in plan
+        if name in selected
+    ]
+
+def represent(row, plan, tz):
+    ret = {}
+    for name, column, convert, nested, iso_datetime in plan:
+        value = row[column]
+        if value is None:
+            ret[name] = None
+        elif nested is not None:
+            ret[name] = represent(row, nested, tz)
+        elif iso_datetime and tz is not None and value.tzinfo is not None:
+            # DateTimeField.to_representation without its per-call timezone lookup
+            value = value.astimezone(tz).isoformat()
+            ret[name] = value[:-6] + 'Z' if value.endswith('+00:00') else value
+        else:
+            ret[name] = value if convert is None else convert(value)
+    return ret
+
+class ValuesSerializer(serializers.BaseSerializer):
+    """
+    Read-only fast path for ``model_serializer_class``. Renders rows from
+    ``queryset.values(*columns())`` with a field plan compiled once, which
+    skips model instantiation and DRF's per-field machinery. The output is
+    identical to the model serializer's.
+    """
+    model_serializer_class = None
+    # See compile_representation
+    column_aliases = {}
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        self.fieldset = fieldset
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def template(cls):
+        if '_template' not in cls.__dict__:
+            cls._template = cls.model_serializer_class()
+        return cls._template
+
+    @classmethod
+    def plan(cls, fieldset=None):
+        """The plan for ``fieldset``, compiled once per fieldset."""
+        if '_plans' not in cls.__dict__:
+            cls._plans = {None: compile_representation(cls.template(), aliases=cls.column_aliases)}
+        plan = cls._plans.get(fieldset)
+        if plan is None:
+            plan = cls._plans[fieldset] = select_plan(cls._plans[None], fieldset)
+        return plan
+
+    @classmethod
+    def columns(cls, fieldset=None):
+        """The ``.values()`` columns for ``fieldset``; unselected fields are never loaded."""
+        return list(dict.fromkeys(plan_columns(cls.plan(fieldset))))
+
+    @classmethod
+    def parse_fieldset(cls, fields, expand=None):
+        return parse_fieldset(cls.template(), fields, expand)
+
+    @cached_property
+    def output_timezone(self):
+        # Looked up once per serializer, and so once per list response.
+        return timezone.get_current_timezone() if settings.USE_TZ else None
+
+    @cached_property
+    def selected_plan(self):
+        return self.plan(self.fieldset)
+
+    @cached_property
+    def headers(self):
+        return list(plan_headers(self.selected_plan))
+
+    def to_representation(self, row):
+        return represent(row, self.selected_plan, self.output_timezone)
+
+class AlertValuesSerializer(TimedSerializerMixin, ValuesSerializer):
+    model_serializer_class = AlertSerializer
+    # Event columns the alert keeps a copy of are read without a join.
+    column_aliases = {
+        'event__id': 'event',
+        **{f'event__{source}': name for name, source in Alert.EVENT_FIELDS.items()},
+    }
+
+class EventValuesSerializer(ValuesSerializer):
+    model_serializer_class = SecurityEventSerializer
@@ -1,9 +1,57 @@
+from django.conf import settings
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .models import SecurityEvent, Alert
+from .rollups import record_rollups
+from .rules import match_events
+from .dedup import upsert_alerts
+from .caching import bump_alert_generation
+from .live import publish_alerts
+
+
+def create_alerts_for_events(events):
+    """
+    Raise alerts for every event matched by an alert rule, deduplicated
+    unless ``ALERT_DEDUP_WINDOW`` is 0. Returns ``(created, updated)`` lists
+    of alert ids.
+    """
+    matches = match_events(events)
+    if not matches:
+        return [], []
+    if settings.ALERT_DEDUP_WINDOW:
+        created, updated = upsert_alerts(matches, settings.ALERT_DEDUP_WINDOW)
+    else:
+        alerts = Alert.objects.bulk_create(
+            [Alert.for_event(event, rule_id=rule_id, last_seen=event.timestamp) for event, rule_id in matches]
+        )
+        created, updated = [alert.pk for alert in alerts], []
+    bump_alert_generation()
+    publish_alerts(created, updated)
+    return created, updated
+
 
 @receiver(post_save, sender=SecurityEvent)
 def create_alert_for_critical_events(sender, instance, created, **kwargs):
     if created:
-        if instance.severity in ['HIGH', 'CRITICAL']:
-            Alert.objects.create(event=instance)
+        create_alerts_for_events([instance])
+
+
+@receiver(post_save, sender=SecurityEvent)
+def update_event_rollups(sender, instance, created, **kwargs):
+    if created:
+        record_rollups([instance])
+
+
+@receiver(post_save, sender=Alert)
+def invalidate_alert_responses(sender, instance, **kwargs):
+    # Deletes bump explicitly instead of through post_delete, which would
+    # stop Django from deleting alerts in bulk.
+    bump_alert_generation()
+
+
+@receiver(post_save, sender=Alert)
+def publish_alert_change(sender, instance, created, **kwargs):
+    if created:
+        publish_alerts([instance.pk], [])
+    else:
+        publish_alerts([], [instance.pk])
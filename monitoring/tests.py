@@ -119,6 +119,31 @@ class ThreatMonitoringTests(APITestCase):
         response = self.client.patch(self.detail_url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_alert_reopen_conflicts_with_newer_open_alert(self):
+        """Reopening an alert whose events raised a new open alert meanwhile is a conflict."""
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.patch(self.detail_url, {'status': 'ACKNOWLEDGED'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # The same event again raises a new alert, the acknowledged one is not counted on
+        data = {'source': 'Test', 'event_type': 'Virus', 'severity': 'HIGH', 'description': 'Danger'}
+        response = self.client.post(self.events_url, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        newer = Alert.objects.get(status='OPEN')
+        self.assertNotEqual(newer.pk, self.alert.pk)
+        self.assertEqual(newer.fingerprint, self.alert.fingerprint)
+
+        response = self.client.patch(self.detail_url, {'status': 'OPEN'})
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['alert'], newer.pk)
+        self.alert.refresh_from_db()
+        self.assertEqual(self.alert.status, 'ACKNOWLEDGED')
+
+        # Without an open alert for its events it can be reopened
+        newer.delete()
+        response = self.client.patch(self.detail_url, {'status': 'OPEN'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     def test_alert_update_readonly_fields(self):
         """Attempting to update the event link should be ignored or explicitly failed (depending on checks).
         DRF usually ignores read-only fields in serializer validation.
@@ -45,14 +45,15 @@ class AdvancedIntegrationTests(APITestCase):
         self.assertEqual(len(response.data['results']), 0)
 
     def test_pagination(self):
-        """Test pagination response structure."""
+        """Test page-number pagination response structure."""
         # Create enough alerts to trigger pagination (PAGE_SIZE=10 in settings)
         for i in range(15):
             e = SecurityEvent.objects.create(source=f'Bulk{i}', event_type='T', severity='HIGH', description='D')
         
         self.client.force_authenticate(user=self.analyst)
         url = reverse('alert_list')
-        response = self.client.get(url)
+        # Page-number mode (with total counts) is selected with ?page=
+        response = self.client.get(url + '?page=1')
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('count', response.data)
@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from .apikeys import create_ingest_key, hash_ingest_key
+from .models import SecurityEvent, IngestKey
+
+
+def event_payload(source='Sensor-1'):
+    return {'source': source, 'event_type': 'Scan', 'severity': 'LOW', 'description': 'Port scan'}
+
+
+class IngestKeyTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.key, self.raw_key = create_ingest_key('fleet', source='Sensor-1')
+
+    def post(self, url, data, raw_key=None, header='Authorization'):
+        raw_key = raw_key or self.raw_key
+        headers = {'HTTP_AUTHORIZATION': f'Api-Key {raw_key}'} if header == 'Authorization' else {'HTTP_X_API_KEY': raw_key}
+        return self.client.post(url, data, format='json', **headers)
+
+    def test_key_is_stored_hashed(self):
+        self.assertEqual(self.key.key_hash, hash_ingest_key(self.raw_key))
+        self.assertFalse(IngestKey.objects.filter(key_hash__contains=self.raw_key[3:]).exists())
+        self.assertTrue(self.raw_key.startswith(self.key.prefix))
+
+    def test_ingest_endpoints_accept_key(self):
+        self.assertEqual(self.post(reverse('event_ingest'), event_payload()).status_code, 201)
+        response = self.post(reverse('event_batch_ingest'), [event_payload()] * 2, header='X-API-Key')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.post(reverse('event_queue_ingest'), [event_payload()]).status_code, 202)
+        self.assertEqual(SecurityEvent.objects.count(), 3)
+
+    def test_key_is_scoped_to_ingest(self):
+        response = self.client.get(reverse('alert_list'), HTTP_AUTHORIZATION=f'Api-Key {self.raw_key}')
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get(reverse('event_queue_stats'), HTTP_AUTHORIZATION=f'Api-Key {self.raw_key}')
+        self.assertEqual(response.status_code, 401)
+
+    def test_key_is_scoped_to_source(self):
+        response = self.post(reverse('event_ingest'), event_payload('Sensor-2'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('source', response.data)
+        response = self.post(reverse('event_batch_ingest'), [event_payload(), event_payload('Sensor-2')])
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 1))
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+
+    def test_verification_is_cached(self):
+        self.post(reverse('event_ingest'), event_payload())
+        self.post(reverse('event_ingest'), 'not json')
+        with CaptureQueriesContext(connection) as ctx:
+            self.post(reverse('event_ingest'), event_payload())
+            self.post(reverse('event_ingest'), event_payload(), raw_key='ik_unknown')
+            self.post(reverse('event_ingest'), event_payload(), raw_key='ik_unknown')
+        self.assertFalse([q for q in ctx.captured_queries if IngestKey._meta.db_table in q['sql']][1:])
+
+    def test_invalid_and_deactivated_keys(self):
+        self.assertEqual(self.post(reverse('event_ingest'), event_payload(), raw_key='ik_wrong').status_code, 401)
+        self.assertEqual(self.post(reverse('event_ingest'), event_payload()).status_code, 201)
+        self.key.is_active = False
+        self.key.save()
+        self.assertEqual(self.post(reverse('event_ingest'), event_payload()).status_code, 401)
+
+    def test_per_key_rate_limits(self):
+        _, limited = create_ingest_key('limited', rate='2/min,1000/day')
+        statuses = [self.post(reverse('event_ingest'), event_payload(), raw_key=limited).status_code for _ in range(3)]
+        self.assertEqual(statuses, [201, 201, 429])
+        # Other keys have their own budget
+        self.assertEqual(self.post(reverse('event_ingest'), event_payload()).status_code, 201)
+
+    def test_create_command(self):
+        out = StringIO()
+        call_command('create_ingest_key', 'edge', '--source', 'Edge-1', '--rate', '10/s', stdout=out, stderr=StringIO())
+        raw_key = out.getvalue().strip()
+        self.assertEqual(IngestKey.objects.get(key_hash=hash_ingest_key(raw_key)).source, 'Edge-1')
+        with self.assertRaises(Exception):
+            call_command('create_ingest_key', 'bad', '--rate', 'ten per second', stdout=out, stderr=StringIO())
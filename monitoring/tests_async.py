@@ -0,0 +1,72 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from django.contrib.auth import get_user_model
+from .models import SecurityEvent, Alert
+from .views import EventIngestView, AlertListView
+
+User = get_user_model()
+
+class AsyncViewTests(TestCase):
+    """The async views served through Django's async request path."""
+
+    def setUp(self):
+        self.analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.analyst)}'}
+
+    def test_views_are_async(self):
+        self.assertTrue(EventIngestView.view_is_async)
+        self.assertTrue(AlertListView.view_is_async)
+
+    async def test_ingest_creates_event_and_alert(self):
+        response = await self.async_client.post(
+            reverse('event_ingest'),
+            {'source': 'FW', 'event_type': 'Exploit', 'severity': 'CRITICAL', 'description': 'D'},
+            content_type='application/json',
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        event = await SecurityEvent.objects.aget(pk=response.json()['id'])
+        self.assertTrue(await Alert.objects.filter(event=event).aexists())
+
+    async def test_ingest_validation_and_auth(self):
+        url = reverse('event_ingest')
+        response = await self.async_client.post(
+            url, {'source': 'FW', 'severity': 'EXTREME'}, content_type='application/json', headers=self.headers,
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('severity', response.json())
+        response = await self.async_client.post(url, {}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_method_not_allowed(self):
+        response = await self.async_client.get(reverse('event_ingest'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    @override_settings(ALERT_CACHE_TIMEOUT=0)
+    async def test_list_keyset_and_page_number(self):
+        for i in range(3):
+            await SecurityEvent.objects.acreate(source=f'S{i}', event_type='Exploit', severity='HIGH', description='D')
+        url = reverse('alert_list')
+        first = (await self.async_client.get(url, {'page_size': 2}, headers=self.headers)).json()
+        self.assertEqual(len(first['results']), 2)
+        second = (await self.async_client.get(first['next'], headers=self.headers)).json()
+        self.assertEqual(len(second['results']), 1)
+        self.assertIsNone(second['next'])
+
+        numbered = (await self.async_client.get(url, {'page': 1, 'page_size': 2}, headers=self.headers)).json()
+        self.assertEqual(numbered['count'], 3)
+        self.assertEqual(
+            [alert['id'] for alert in numbered['results']], [alert['id'] for alert in first['results']]
+        )
+
+    @override_settings(ALERT_CACHE_TIMEOUT=300)
+    async def test_list_etag(self):
+        url = reverse('alert_list')
+        first = await self.async_client.get(url, {'status': 'OPEN'}, headers=self.headers)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        response = await self.async_client.get(
+            url, {'status': 'OPEN'}, headers={**self.headers, 'If-None-Match': first['ETag']}
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
@@ -0,0 +1,72 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from .models import SecurityEvent, Alert
+from .ingest import ingest_events
+
+User = get_user_model()
+
+@override_settings(ALERT_CACHE_TIMEOUT=300)
+class AlertResponseCacheTests(APITestCase):
+    def setUp(self):
+        self.url = reverse('alert_list')
+        self.admin = User.objects.create_user(username='admin', password='password', role='ADMIN', is_staff=True)
+        self.analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.client.force_authenticate(user=self.analyst)
+        self.event = SecurityEvent.objects.create(source='FW', event_type='Exploit', severity='HIGH', description='D')
+        self.alert = Alert.objects.get(event=self.event)
+
+    def test_second_request_skips_the_database(self):
+        first = self.client.get(self.url, {'status': 'OPEN'})
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get(self.url, {'status': 'OPEN'})
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_parameter_order_does_not_matter(self):
+        first = self.client.get(self.url + '?status=OPEN&ordering=created_at')
+        second = self.client.get(self.url + '?ordering=created_at&status=OPEN')
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertNotEqual(first['ETag'], self.client.get(self.url)['ETag'])
+
+    def test_role_is_part_of_the_key(self):
+        analyst = self.client.get(self.url)
+        self.client.force_authenticate(user=self.admin)
+        self.assertNotEqual(self.client.get(self.url)['ETag'], analyst['ETag'])
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.content)
+
+    def test_new_alert_invalidates(self):
+        etag = self.client.get(self.url)['ETag']
+        ingest_events([{'source': 'IDS', 'event_type': 'Beacon', 'severity': 'CRITICAL', 'description': 'D'}])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_status_update_invalidates_detail(self):
+        detail_url = reverse('alert_detail', kwargs={'pk': self.alert.pk})
+        self.assertEqual(self.client.get(detail_url).data['status'], 'OPEN')
+        self.client.force_authenticate(user=self.admin)
+        self.client.patch(reverse('alert_status', kwargs={'pk': self.alert.pk}), {'status': 'RESOLVED'})
+        self.client.force_authenticate(user=self.analyst)
+        self.assertEqual(self.client.get(detail_url).data['status'], 'RESOLVED')
+
+    def test_errors_are_not_cached(self):
+        missing = reverse('alert_detail', kwargs={'pk': self.alert.pk + 1000})
+        self.assertEqual(self.client.get(missing).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', self.client.get(missing))
+
+    @override_settings(ALERT_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        response = self.client.get(self.url)
+        self.assertNotIn('ETag', response)
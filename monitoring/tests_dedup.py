@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from .models import SecurityEvent, Alert
+from .ingest import ingest_events
+from .signals import create_alerts_for_events
+
+EVENT = {'source': 'FW', 'event_type': 'PortScan', 'severity': 'HIGH', 'description': 'scan'}
+
+@override_settings(ALERT_DEDUP_WINDOW=3600, ALERT_DEDUP_FIELDS=['source', 'event_type', 'severity'])
+class AlertDedupTests(TestCase):
+    def test_repeated_events_share_one_alert(self):
+        first = SecurityEvent.objects.create(**EVENT)
+        ingest_events([EVENT] * 5)
+        last = SecurityEvent.objects.create(**EVENT)
+
+        alert = Alert.objects.get()
+        self.assertEqual(alert.event_id, first.pk)
+        self.assertEqual(alert.occurrences, 7)
+        self.assertEqual(alert.last_seen, last.timestamp)
+
+    def test_fingerprint_fields(self):
+        ingest_events([EVENT, {**EVENT, 'source': 'IDS'}, {**EVENT, 'severity': 'CRITICAL'}, {**EVENT, 'description': 'x'}])
+        self.assertEqual(
+            sorted(Alert.objects.values_list('event__source', 'event__severity', 'occurrences')),
+            [('FW', 'CRITICAL', 1), ('FW', 'HIGH', 2), ('IDS', 'HIGH', 1)],
+        )
+
+    def test_new_window_opens_new_alert(self):
+        events = SecurityEvent.objects.bulk_create([SecurityEvent(**EVENT), SecurityEvent(**EVENT)])
+        events[1].timestamp = events[0].timestamp + timedelta(hours=2)
+        created, _ = create_alerts_for_events(events)
+        self.assertEqual(len(created), 2)
+
+    def test_closed_alert_is_not_reused(self):
+        SecurityEvent.objects.create(**EVENT)
+        Alert.objects.update(status='ACKNOWLEDGED')
+        SecurityEvent.objects.create(**EVENT)
+        self.assertEqual(
+            sorted(Alert.objects.values_list('status', 'occurrences')),
+            [('ACKNOWLEDGED', 1), ('OPEN', 1)],
+        )
+
+    def test_reports_created_and_updated(self):
+        events = SecurityEvent.objects.bulk_create([SecurityEvent(**EVENT), SecurityEvent(**EVENT)])
+        created, updated = create_alerts_for_events(events)
+        self.assertEqual((len(created), updated), (1, []))
+        again, updated = create_alerts_for_events(events[:1])
+        self.assertEqual((again, updated), ([], created))
+        self.assertEqual(Alert.objects.get().occurrences, 3)
+
+    @override_settings(ALERT_DEDUP_WINDOW=0)
+    def test_disabled(self):
+        ingest_events([EVENT] * 3)
+        self.assertEqual(Alert.objects.count(), 3)
+        self.assertFalse(Alert.objects.exclude(fingerprint=None).exists())
@@ -0,0 +1,103 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from .models import SecurityEvent, Alert
+from .backfill import backfill_alert_event_fields
+
+User = get_user_model()
+
+
+def copies(alert):
+    return {name: getattr(alert, name) for name in Alert.EVENT_FIELDS}
+
+
+def event_values(event):
+    return {name: getattr(event, source) for name, source in Alert.EVENT_FIELDS.items()}
+
+
+class EventCopyTests(TestCase):
+    def create_event(self, **fields):
+        return SecurityEvent.objects.create(
+            **{'source': 'Sensor', 'event_type': 'Exploit', 'severity': 'CRITICAL', 'description': 'D', **fields}
+        )
+
+    @override_settings(ALERT_DEDUP_WINDOW=3600)
+    def test_deduplicated_alerts_copy_event(self):
+        event = self.create_event()
+        self.assertEqual(copies(Alert.objects.get(event=event)), event_values(event))
+
+    @override_settings(ALERT_DEDUP_WINDOW=0)
+    def test_bulk_created_alerts_copy_event(self):
+        event = self.create_event()
+        self.assertEqual(copies(Alert.objects.get(event=event)), event_values(event))
+
+    def test_save_copies_event(self):
+        event = self.create_event(severity='LOW')
+        self.assertEqual(copies(Alert.objects.create(event=event)), event_values(event))
+
+    def test_backfill(self):
+        events = [self.create_event(source=f'S{i}') for i in range(5)]
+        Alert.objects.update(severity=None, source=None, event_type=None, event_timestamp=None)
+        call_command('backfill_alert_events', '--chunk-size', '2', stdout=StringIO())
+        for event in events:
+            self.assertEqual(copies(Alert.objects.get(event=event)), event_values(event))
+        # Nothing left to do on a rerun
+        self.assertEqual(backfill_alert_event_fields(), 0)
+
+
+@override_settings(ALERT_CACHE_TIMEOUT=0)
+class MigrationBackfillTests(APITestCase):
+    def test_existing_alerts_are_filled(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='analyst', password='password'))
+        for severity in ('HIGH', 'CRITICAL'):
+            SecurityEvent.objects.create(source='Sensor', event_type='Exploit', severity=severity, description='D')
+        # Alerts raised before 0011 added the copies
+        Alert.objects.update(severity=None, source=None, event_type=None, event_timestamp=None)
+        migration = import_module('monitoring.migrations.0015_backfill_alert_event_fields')
+        migration.backfill(apps, None)
+        response = self.client.get(reverse('alert_list'), {'event__severity': 'HIGH'})
+        [alert] = response.data['results']
+        self.assertEqual(
+            {key: alert['event_details'][key] for key in ('severity', 'source', 'event_type')},
+            {'severity': 'HIGH', 'source': 'Sensor', 'event_type': 'Exploit'},
+        )
+        self.assertIsNotNone(alert['event_details']['timestamp'])
+
+
+@override_settings(ALERT_CACHE_TIMEOUT=0)
+class JoinFreeListTests(APITestCase):
+    def setUp(self):
+        analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.client.force_authenticate(user=analyst)
+        for severity in ('HIGH', 'CRITICAL'):
+            SecurityEvent.objects.create(source='Sensor', event_type='Exploit', severity=severity, description='D')
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('alert_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'], ctx.captured_queries[-1]['sql']
+
+    def test_filters_without_join(self):
+        results, sql = self.get(
+            fields='id,status,event_details.severity,event_details.timestamp',
+            event__severity='HIGH', source='Sensor', event__timestamp__gte='2000-01-01T00:00:00Z',
+        )
+        self.assertEqual([item['event_details']['severity'] for item in results], ['HIGH'])
+        self.assertNotIn('JOIN', sql)
+
+    def test_window_bounds_joined_event(self):
+        # Reading the description joins the event table, which is then
+        # bounded by its own timestamp for partition pruning.
+        results, sql = self.get(event__timestamp__gte='2000-01-01T00:00:00Z')
+        self.assertEqual(len(results), 2)
+        self.assertIn('JOIN', sql)
+        self.assertIn('"monitoring_securityevent"."timestamp" >=', sql)
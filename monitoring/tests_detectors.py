@@ -0,0 +1,88 @@
+import time
+
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from .models import SecurityEvent, Alert, AlertRule
+from .ingest import ingest_events
+from .detectors import SlidingWindowCounter
+from .rules import invalidate_rules
+
+DETECTION_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'detection': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'detection-tests'},
+}
+
+def failed_login(source):
+    return {'source': source, 'event_type': 'FailedLogin', 'severity': 'LOW', 'description': 'bad password'}
+
+@override_settings(CACHES=DETECTION_CACHES, DETECTION_CACHE='detection')
+class SlidingWindowCounterTests(TestCase):
+    def setUp(self):
+        self.cache = caches['detection']
+        self.cache.clear()
+        self.counter = SlidingWindowCounter(self.cache)
+
+    def test_counts_within_window(self):
+        self.assertEqual(self.counter.add('k', 3, 60, now=120), 3)
+        self.assertEqual(self.counter.add('k', 2, 60, now=150), 5)
+
+    def test_previous_window_is_weighted(self):
+        self.counter.add('k', 10, 60, now=150)
+        # 45s into the next window a quarter of the previous one still counts.
+        self.assertEqual(self.counter.add('k', 1, 60, now=225), 10 * 0.25 + 1)
+        # Two windows later the old hits are gone.
+        self.assertEqual(self.counter.add('k', 1, 60, now=300), 1)
+
+    def test_buckets_expire_after_two_windows(self):
+        before = time.time()
+        self.counter.add('k', 1, 60)
+        (expiry,) = self.cache._expire_info.values()
+        self.assertGreaterEqual(expiry, before + 120)
+        self.assertLessEqual(expiry, time.time() + 120)
+
+
+@override_settings(CACHES=DETECTION_CACHES, DETECTION_CACHE='detection', ALERT_DEDUP_WINDOW=0)
+class ThresholdRuleTests(TestCase):
+    def setUp(self):
+        caches['detection'].clear()
+        self.addCleanup(invalidate_rules)
+        self.rule = AlertRule.objects.create(
+            name='Brute force', event_type='FailedLogin', threshold=5, window_seconds=60, group_by='source',
+        )
+
+    def test_alerts_once_threshold_is_crossed(self):
+        ingest_events([failed_login('10.0.0.1')] * 4)
+        self.assertFalse(Alert.objects.exists())
+        ingest_events([failed_login('10.0.0.1')] * 2)
+        self.assertEqual(Alert.objects.filter(rule=self.rule).count(), 1)
+        SecurityEvent.objects.create(**failed_login('10.0.0.1'))
+        self.assertEqual(Alert.objects.filter(rule=self.rule).count(), 2)
+
+    def test_counts_per_group(self):
+        ingest_events([failed_login('10.0.0.1')] * 3 + [failed_login('10.0.0.2')] * 3)
+        self.assertFalse(Alert.objects.exists())
+
+    def test_threshold_alerts_are_deduplicated(self):
+        with self.settings(ALERT_DEDUP_WINDOW=3600):
+            ingest_events([failed_login('10.0.0.1')] * 20)
+        alert = Alert.objects.get()
+        self.assertEqual((alert.rule_id, alert.occurrences), (self.rule.pk, 15))
+
+    def test_plain_rule_still_applies(self):
+        ingest_events([{**failed_login('10.0.0.1'), 'severity': 'HIGH'}])
+        self.assertEqual(Alert.objects.get().rule.name, 'High and critical events')
+
+    def test_threshold_needs_window(self):
+        rule = AlertRule(name='No window', threshold=5, window_seconds=0)
+        with self.assertRaises(ValidationError):
+            rule.full_clean()
+
+    def test_database_refuses_threshold_without_window(self):
+        # bulk_create() and update() skip full_clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AlertRule.objects.filter(pk=self.rule.pk).update(window_seconds=0)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AlertRule.objects.bulk_create([AlertRule(name='No window', threshold=5, window_seconds=0)])
+        AlertRule.objects.bulk_create([AlertRule(name='Plain', window_seconds=0)])
@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import SecurityEvent, Alert
+from .serializers import AlertSerializer
+
+User = get_user_model()
+
+
+def create_alerts(count):
+    for i in range(count):
+        SecurityEvent.objects.create(
+            source=f'S{i % 2}', event_type=f'Exploit-{i}', severity=('HIGH', 'CRITICAL')[i % 2],
+            description=f'Exploit, "attempt" {i}\nsecond line',
+        )
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.client.force_authenticate(user=self.analyst)
+        create_alerts(5)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_alert_ndjson_matches_serializer(self):
+        response, body = self.get(reverse('alert_export'))
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertIn('alerts.ndjson', response['Content-Disposition'])
+        rows = [json.loads(line) for line in body.splitlines()]
+        alerts = Alert.objects.select_related('event').order_by('-created_at')
+        self.assertEqual(rows, json.loads(json.dumps(AlertSerializer(alerts, many=True).data)))
+
+    def test_alert_csv_with_filters_and_fields(self):
+        response, body = self.get(
+            reverse('alert_export'), format='csv', event__severity='CRITICAL',
+            fields='id,status,event_details.description',
+        )
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], ['id', 'event_details.description', 'status'])
+        expected = Alert.objects.filter(severity='CRITICAL').order_by('-created_at')
+        self.assertEqual([int(row[0]) for row in rows[1:]], [alert.pk for alert in expected])
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1][1], expected[0].event.description)
+
+    def test_csv_by_accept_header(self):
+        response = self.client.get(reverse('event_export'), HTTP_ACCEPT='text/csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+
+    def test_event_export(self):
+        _, body = self.get(reverse('event_export'), source='S0', format='csv')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row['source'] for row in rows}, {'S0'})
+        self.assertEqual(set(rows[0]), {'id', 'source', 'event_type', 'severity', 'description', 'timestamp'})
+
+    def test_csv_escapes_formulas(self):
+        for description in ('=HYPERLINK("http://evil")', '+1', '-2', '@SUM(A1)', '\tx', '\rx'):
+            SecurityEvent.objects.create(source='S9', event_type='Exploit', severity='LOW', description=description)
+        _, body = self.get(reverse('event_export'), source='S9', format='csv')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(
+            sorted(row['description'] for row in rows),
+            sorted(["'=HYPERLINK(\"http://evil\")", "'+1", "'-2", "'@SUM(A1)", "'\tx", "'\rx"]),
+        )
+        self.assertEqual({row['source'] for row in rows}, {'S9'})
+
+    def test_errors_and_auth(self):
+        response = self.client.get(reverse('alert_export'), {'fields': 'nope'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(reverse('alert_export')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class AsyncExportTests(TestCase):
+    def setUp(self):
+        analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(analyst)}'}
+        create_alerts(5)
+
+    async def test_streams_chunks_under_asgi(self):
+        response = await self.async_client.get(reverse('alert_export'), headers=self.headers)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        # An empty start, then 2 + 2 + 1 rows
+        self.assertEqual([chunk.count(b'\n') for chunk in chunks], [0, 2, 2, 1])
@@ -0,0 +1,159 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from .models import SecurityEvent, Alert, QueuedEvent
+
+User = get_user_model()
+
+class BatchIngestTests(APITestCase):
+    def setUp(self):
+        self.url = reverse('event_batch_ingest')
+        self.analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+
+    def test_batch_unauthenticated(self):
+        """Unauthenticated users cannot ingest batches."""
+        response = self.client.post(self.url, [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_batch_json_array(self):
+        """A JSON array is stored in bulk and alerts are created for HIGH/CRITICAL events."""
+        self.client.force_authenticate(user=self.analyst)
+        data = [
+            {'source': 'FW', 'event_type': 'Scan', 'severity': 'LOW', 'description': 'a'},
+            {'source': 'IDS', 'event_type': 'Exploit', 'severity': 'HIGH', 'description': 'b'},
+            {'source': 'EDR', 'event_type': 'Ransomware', 'severity': 'CRITICAL', 'description': 'c'},
+        ]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(response.data['failed'], 0)
+        self.assertEqual(SecurityEvent.objects.count(), 3)
+        self.assertEqual(
+            set(Alert.objects.values_list('event__description', flat=True)), {'b', 'c'}
+        )
+
+    def test_batch_ndjson(self):
+        """An NDJSON body is accepted, blank lines are skipped."""
+        self.client.force_authenticate(user=self.analyst)
+        body = '\n'.join([
+            json.dumps({'source': 'FW', 'event_type': 'Scan', 'severity': 'LOW', 'description': 'a'}),
+            '',
+            json.dumps({'source': 'IDS', 'event_type': 'Exploit', 'severity': 'HIGH', 'description': 'b'}),
+        ])
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(Alert.objects.count(), 1)
+
+    def test_batch_partial_failure(self):
+        """Invalid items are reported by index without failing the valid ones."""
+        self.client.force_authenticate(user=self.analyst)
+        data = [
+            {'source': 'FW', 'event_type': 'Scan', 'severity': 'LOW', 'description': 'a'},
+            {'source': 'FW', 'event_type': 'Scan', 'severity': 'EXTREME', 'description': 'b'},
+            'not an object',
+        ]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([e['index'] for e in response.data['errors']], [1, 2])
+        self.assertIn('severity', response.data['errors'][0]['errors'])
+        self.assertEqual(SecurityEvent.objects.count(), 1)
+
+    def test_batch_all_invalid(self):
+        """A batch with no valid items is rejected."""
+        self.client.force_authenticate(user=self.analyst)
+        response = self.client.post(self.url, [{'source': 'FW'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['failed'], 1)
+
+    def test_batch_requires_list(self):
+        """A single object is not a batch."""
+        self.client.force_authenticate(user=self.analyst)
+        response = self.client.post(self.url, {'source': 'FW'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_size_limit(self):
+        """Batches larger than EVENT_BATCH_MAX_SIZE are refused."""
+        self.client.force_authenticate(user=self.analyst)
+        item = {'source': 'FW', 'event_type': 'Scan', 'severity': 'LOW', 'description': 'a'}
+        with self.settings(EVENT_BATCH_MAX_SIZE=2):
+            response = self.client.post(self.url, [item] * 3, format='json')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+class QueueIngestTests(APITestCase):
+    def setUp(self):
+        self.url = reverse('event_queue_ingest')
+        self.stats_url = reverse('event_queue_stats')
+        self.admin = User.objects.create_user(username='admin', password='password', role='ADMIN', is_staff=True)
+        self.analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+
+    def test_enqueue_returns_receipt(self):
+        """Queued ingest answers 202 with a receipt and does not write events yet."""
+        self.client.force_authenticate(user=self.analyst)
+        data = {'source': 'IDS', 'event_type': 'Exploit', 'severity': 'HIGH', 'description': 'b'}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['queued'], 1)
+        self.assertEqual(QueuedEvent.objects.filter(receipt=response.data['receipt']).count(), 1)
+        self.assertEqual(SecurityEvent.objects.count(), 0)
+
+    def test_enqueue_invalid(self):
+        """Nothing is queued when every item is invalid."""
+        self.client.force_authenticate(user=self.analyst)
+        response = self.client.post(self.url, {'source': 'IDS'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(QueuedEvent.objects.count(), 0)
+
+    def test_worker_drains_queue(self):
+        """The worker writes queued events, creates alerts and empties the queue."""
+        self.client.force_authenticate(user=self.analyst)
+        data = [
+            {'source': 'FW', 'event_type': 'Scan', 'severity': 'LOW', 'description': 'a'},
+            {'source': 'IDS', 'event_type': 'Exploit', 'severity': 'CRITICAL', 'description': 'b'},
+            {'source': 'EDR', 'event_type': 'Beacon', 'severity': 'HIGH', 'description': 'c'},
+        ]
+        self.client.post(self.url, data, format='json')
+
+        out = StringIO()
+        call_command('ingest_worker', '--once', '--batch-size', '2', stdout=out)
+        self.assertEqual(QueuedEvent.objects.count(), 0)
+        self.assertEqual(SecurityEvent.objects.count(), 3)
+        self.assertEqual(Alert.objects.count(), 2)
+        self.assertIn('queue depth', out.getvalue())
+
+    def test_drained_events_keep_their_accept_time(self):
+        """Drained events are stamped with the time they were queued, and still raise alerts."""
+        self.client.force_authenticate(user=self.analyst)
+        data = {'source': 'IDS', 'event_type': 'Exploit', 'severity': 'CRITICAL', 'description': 'b'}
+        self.client.post(self.url, data, format='json')
+        accepted = timezone.now() - timedelta(minutes=5)
+        QueuedEvent.objects.update(enqueued_at=accepted)
+
+        call_command('ingest_worker', '--once', stdout=StringIO())
+        event = SecurityEvent.objects.get()
+        self.assertEqual(event.timestamp, accepted)
+        self.assertEqual(Alert.objects.get().event, event)
+
+    def test_queue_stats(self):
+        """Queue depth and lag are exposed to admins only."""
+        QueuedEvent.objects.create(receipt='00000000-0000-0000-0000-000000000001', payload={})
+        self.client.force_authenticate(user=self.analyst)
+        self.assertEqual(self.client.get(self.stats_url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(self.stats_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['depth'], 1)
+        self.assertGreaterEqual(response.data['lag_seconds'], 0)
+
+        out = StringIO()
+        call_command('ingest_worker', '--stats', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['depth'], 1)
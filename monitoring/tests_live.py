@@ -0,0 +1,204 @@
+import asyncio
+import json
+import os
+import unittest
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from django.contrib.auth import get_user_model
+from .models import SecurityEvent, Alert
+from . import live
+from .live import Subscription, AlertHub, RedisRelay, OVERFLOW
+
+User = get_user_model()
+
+def message(pk, severity='HIGH', alert_status='OPEN', kind='alert.created'):
+    return {'kind': kind, 'id': pk, 'severity': severity, 'status': alert_status, 'data': {}}
+
+class RecordingRelay:
+    """Stands in for ``RedisRelay``, keeping what was published."""
+
+    def __init__(self):
+        self.published = []
+
+    def has_listeners(self):
+        return True
+
+    def publish(self, created, updated):
+        self.published.append((created, updated))
+
+    def start(self):
+        pass
+
+class AlertHubTests(TestCase):
+    async def test_filters_and_fan_out(self):
+        hub = AlertHub()
+        loop = asyncio.get_running_loop()
+        everything = Subscription(loop, maxsize=10)
+        critical = Subscription(loop, severities={'CRITICAL'}, maxsize=10)
+        hub.subscribe(everything)
+        hub.subscribe(critical)
+        hub.publish([message(1), message(2, severity='CRITICAL')])
+        await asyncio.sleep(0)
+        self.assertEqual(everything.queue.qsize(), 2)
+        self.assertEqual((await critical.queue.get())['id'], 2)
+
+        hub.unsubscribe(everything)
+        hub.publish([message(3)])
+        await asyncio.sleep(0)
+        self.assertEqual(everything.queue.qsize(), 2)
+
+    async def test_overflow_drops_backlog(self):
+        subscription = Subscription(asyncio.get_running_loop(), maxsize=2)
+        for pk in range(1, 5):
+            subscription.offer(message(pk))
+        self.assertTrue(subscription.overflowed)
+        self.assertIs(await subscription.queue.get(), OVERFLOW)
+        self.assertTrue(subscription.queue.empty())
+
+    async def test_overflow_keeps_dropped_update_ids(self):
+        subscription = Subscription(asyncio.get_running_loop(), maxsize=2)
+        subscription.offer(message(1, kind='alert.updated'))
+        subscription.offer(message(2))
+        subscription.offer(message(3, kind='alert.updated'))
+        subscription.offer(message(4))
+        subscription.offer(message(5, kind='alert.updated'))
+        self.assertEqual(subscription.missed, {1, 3, 5})
+        self.assertIs(await subscription.queue.get(), OVERFLOW)
+
+    async def test_catch_up(self):
+        hub = AlertHub()
+        subscription = Subscription(asyncio.get_running_loop(), maxsize=10)
+        hub.subscribe(subscription)
+        subscription.offer(message(1, kind='alert.updated'))
+        hub.catch_up()
+        await asyncio.sleep(0)
+        self.assertEqual(subscription.missed, {1})
+        self.assertIs(await subscription.queue.get(), OVERFLOW)
+
+
+class AlertStreamViewTests(TestCase):
+    def setUp(self):
+        self.url = reverse('alert_stream')
+        self.analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.analyst)}'}
+        self.first = SecurityEvent.objects.create(source='FW', event_type='Exploit', severity='HIGH', description='D')
+
+    def create_alert(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            event = SecurityEvent.objects.create(description='D', **kwargs)
+        return Alert.objects.get(event=event)
+
+    async def read(self, stream):
+        chunk = await asyncio.wait_for(anext(stream), timeout=5)
+        return chunk.decode() if isinstance(chunk, bytes) else chunk
+
+    async def test_resume_then_live(self):
+        alert = await sync_to_async(Alert.objects.get)(event=self.first)
+        response = await self.async_client.get(self.url, {'last_event_id': 0}, headers=self.headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        try:
+            self.assertTrue((await self.read(stream)).startswith('retry:'))
+            replayed = await self.read(stream)
+            self.assertIn(f'id: {alert.pk}\n', replayed)
+
+            new = await sync_to_async(self.create_alert)(source='EDR', event_type='Beacon', severity='CRITICAL')
+            live = await self.read(stream)
+            self.assertTrue(live.startswith('event: alert.created\n'))
+            data = json.loads(live.split('data: ', 1)[1])
+            self.assertEqual((data['id'], data['event_details']['severity']), (new.pk, 'CRITICAL'))
+        finally:
+            await stream.aclose()
+
+    async def test_severity_filter(self):
+        response = await self.async_client.get(self.url, {'severity': 'critical'}, headers=self.headers)
+        stream = response.streaming_content
+        try:
+            await self.read(stream)
+            await sync_to_async(self.create_alert)(source='IDS', event_type='Scan', severity='HIGH')
+            critical = await sync_to_async(self.create_alert)(source='EDR', event_type='Beacon', severity='CRITICAL')
+            self.assertIn(f'id: {critical.pk}\n', await self.read(stream))
+        finally:
+            await stream.aclose()
+
+    @override_settings(LIVE_STREAM_QUEUE_SIZE=1)
+    async def test_overflow_replays_creations_and_updates(self):
+        alert = await sync_to_async(Alert.objects.get)(event=self.first)
+        response = await self.async_client.get(self.url, headers=self.headers)
+        stream = response.streaming_content
+        try:
+            await self.read(stream)
+            # Past the initial replay, the stream waits on its queue.
+            first = await sync_to_async(self.create_alert)(source='IDS', event_type='Scan', severity='HIGH')
+            self.assertIn(f'id: {first.pk}\n', await self.read(stream))
+
+            new = await sync_to_async(self.create_alert)(source='EDR', event_type='Beacon', severity='CRITICAL')
+
+            def acknowledge():
+                with self.captureOnCommitCallbacks(execute=True):
+                    alert.status = 'ACKNOWLEDGED'
+                    alert.save()
+            await sync_to_async(acknowledge)()
+
+            self.assertEqual(await self.read(stream), ': overflow, catching up\n\n')
+            self.assertIn(f'id: {new.pk}\n', await self.read(stream))
+            updated = await self.read(stream)
+            self.assertTrue(updated.startswith('event: alert.updated\n'))
+            data = json.loads(updated.split('data: ', 1)[1])
+            self.assertEqual((data['id'], data['status']), (alert.pk, 'ACKNOWLEDGED'))
+        finally:
+            await stream.aclose()
+
+    async def test_changes_go_through_the_relay(self):
+        relay = RecordingRelay()
+        with mock.patch.object(live, 'relay', relay):
+            response = await self.async_client.get(self.url, headers=self.headers)
+            stream = response.streaming_content
+            try:
+                await self.read(stream)
+                new = await sync_to_async(self.create_alert)(source='EDR', event_type='Beacon', severity='CRITICAL')
+                self.assertEqual(relay.published, [([new.pk], [])])
+                # What the listener thread of each process does
+                await sync_to_async(live.deliver)(*relay.published[0])
+                self.assertIn(f'id: {new.pk}\n', await self.read(stream))
+            finally:
+                await stream.aclose()
+
+    async def test_invalid_filter(self):
+        response = await self.async_client.get(self.url, {'status': 'CLOSED'}, headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@unittest.skipUnless(os.environ.get('REDIS_URL'), 'needs REDIS_URL')
+class RedisRelayTests(TransactionTestCase):
+    async def test_relays_to_the_hub(self):
+        event = await SecurityEvent.objects.acreate(source='FW', event_type='Exploit', severity='HIGH', description='D')
+        alert = await Alert.objects.aget(event=event)
+        subscription = Subscription(asyncio.get_running_loop(), maxsize=10)
+        live.hub.subscribe(subscription)
+        relay = RedisRelay(os.environ['REDIS_URL'], channel='tests_live')
+        try:
+            relay.start()
+            while not await sync_to_async(relay.has_listeners)():
+                await asyncio.sleep(0.05)
+            await sync_to_async(relay.publish)([], [alert.pk])
+            message = await asyncio.wait_for(subscription.queue.get(), timeout=5)
+            if message is OVERFLOW:  # caught up on subscribing
+                message = await asyncio.wait_for(subscription.queue.get(), timeout=5)
+            self.assertEqual((message['kind'], message['id']), ('alert.updated', alert.pk))
+        finally:
+            live.hub.unsubscribe(subscription)
+
+
+class AlertStreamWSGITests(APITestCase):
+    def test_requires_asgi(self):
+        analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.client.force_authenticate(user=analyst)
+        response = self.client.get(reverse('alert_stream'))
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
@@ -0,0 +1,72 @@
+import re
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from .models import SecurityEvent
+from .metrics import Histogram, registry
+
+User = get_user_model()
+
+class HistogramTests(TestCase):
+    def test_buckets_are_cumulative(self):
+        histogram = Histogram((1, 5))
+        for value in (0, 1, 3, 10):
+            histogram.observe(value)
+        samples = list(histogram.samples('q', 'view="v"'))
+        self.assertEqual(samples, [
+            'q_bucket{view="v",le="1"} 2',
+            'q_bucket{view="v",le="5"} 3',
+            'q_bucket{view="v",le="+Inf"} 4',
+            'q_sum{view="v"} 14',
+            'q_count{view="v"} 4',
+        ])
+
+@override_settings(ALERT_CACHE_TIMEOUT=0, METRICS_TOKEN='s3cret')
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        registry.clear()
+        self.analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.client.force_authenticate(user=self.analyst)
+        for i in range(3):
+            SecurityEvent.objects.create(source=f'S{i}', event_type='Exploit', severity='HIGH', description='D')
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('alert_list'))
+        timing = response['Server-Timing']
+        queries = int(re.search(r'desc="(\d+) queries"', timing)[1])
+        self.assertGreater(queries, 0)
+        self.assertGreater(float(re.search(r'serialize;dur=([\d.]+)', timing)[1]), 0)
+        self.assertIn('total;dur=', timing)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        self.assertFalse(self.client.get(reverse('alert_list')).has_header('Server-Timing'))
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('alert_list'))
+        self.client.get(reverse('alert_list'))
+        self.client.get('/api/does-not-exist/')
+        body = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret').content.decode()
+        self.assertIn('# TYPE http_request_db_queries histogram', body)
+        self.assertIn(
+            'http_request_duration_seconds_count{view="alert_list",method="GET",status="2xx"} 2', body
+        )
+        self.assertIn('view="unmatched",method="GET",status="4xx"', body)
+
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_are_staff_only_without_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+        self.client.force_login(self.analyst)
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        admin = User.objects.create_user(username='admin', password='password', role='ADMIN', is_staff=True)
+        self.client.force_login(admin)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from .models import SecurityEvent, Alert
+
+User = get_user_model()
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.url = reverse('alert_list')
+        self.analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.client.force_authenticate(user=self.analyst)
+
+        # 25 alerts, several of them sharing a created_at to exercise the id tie-breaker
+        base = timezone.now()
+        for i in range(25):
+            event = SecurityEvent.objects.create(source=f'S{i}', event_type='T', severity='HIGH', description='D')
+            Alert.objects.filter(event=event).update(created_at=base - timedelta(seconds=i // 3))
+        self.expected = list(Alert.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def collect(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_default_is_keyset(self):
+        """The default list response has no count and pages with a cursor."""
+        response = self.client.get(self.url)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        self.assertIn('cursor=', response.data['next'])
+
+    def test_walk_forward(self):
+        """Following next links visits every alert exactly once in order."""
+        ids, pages = self.collect(self.url)
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(pages, 3)
+
+    def test_walk_backward(self):
+        """The previous link returns the page before."""
+        first = self.client.get(self.url)
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [item['id'] for item in back.data['results']],
+            [item['id'] for item in first.data['results']],
+        )
+        self.assertIsNone(back.data['previous'])
+
+    def test_ascending_and_page_size(self):
+        """Ascending ordering and page_size are honoured."""
+        ids, pages = self.collect(self.url + '?ordering=created_at&page_size=7')
+        self.assertEqual(ids, list(reversed(self.expected)))
+        self.assertEqual(pages, 4)
+
+    def test_filtered_keyset(self):
+        """Keyset pages combine with filters."""
+        Alert.objects.filter(pk__in=self.expected[:5]).update(status='RESOLVED')
+        ids, _ = self.collect(self.url + '?status=OPEN&page_size=4')
+        self.assertEqual(ids, self.expected[5:])
+
+    def test_no_count_query(self):
+        """Keyset pages never run COUNT(*)."""
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in ctx.captured_queries))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_mode(self):
+        """?page= keeps page-number pagination with total counts."""
+        response = self.client.get(self.url + '?page=2')
+        self.assertEqual(response.data['count'], 25)
+        self.assertFalse(response.data['count_is_estimate'])
+        self.assertIn('page=1', response.data['previous'])
+        self.assertEqual([item['id'] for item in response.data['results']], self.expected[10:20])
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from .models import SecurityEvent, Alert
+from .partitions import (
+    period_start, period_end, partition_name, is_partitioned, list_partitions, ensure_partitions,
+)
+
+User = get_user_model()
+
+class PartitionPeriodTests(TestCase):
+    def test_daily_period(self):
+        moment = datetime(2026, 10, 17, 15, 30, tzinfo=dt_timezone.utc)
+        start = period_start(moment, 'day')
+        self.assertEqual(start, datetime(2026, 10, 17, tzinfo=dt_timezone.utc))
+        self.assertEqual(period_end(start, 'day'), datetime(2026, 10, 18, tzinfo=dt_timezone.utc))
+        self.assertEqual(partition_name(start), 'monitoring_securityevent_p20261017')
+
+    def test_weekly_period_starts_on_monday(self):
+        moment = datetime(2026, 10, 17, 15, 30, tzinfo=dt_timezone.utc)
+        start = period_start(moment, 'week')
+        self.assertEqual(start, datetime(2026, 10, 12, tzinfo=dt_timezone.utc))
+        self.assertEqual(period_end(start, 'week'), datetime(2026, 10, 19, tzinfo=dt_timezone.utc))
+
+    def test_unknown_interval(self):
+        with self.assertRaises(ValueError):
+            period_start(timezone.now(), 'month')
+
+
+class PartitionMaintenanceTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.old = SecurityEvent.objects.create(source='FW', event_type='Scan', severity='HIGH', description='old')
+        self.new = SecurityEvent.objects.create(source='IDS', event_type='Scan', severity='HIGH', description='new')
+        SecurityEvent.objects.filter(pk=self.old.pk).update(timestamp=now - timedelta(days=40))
+
+    @override_settings(EVENT_RETENTION_DAYS=30)
+    def test_expires_old_events_and_alerts(self):
+        out = StringIO()
+        call_command('partition_events', stdout=out)
+        self.assertFalse(SecurityEvent.objects.filter(pk=self.old.pk).exists())
+        self.assertTrue(SecurityEvent.objects.filter(pk=self.new.pk).exists())
+        self.assertEqual(list(Alert.objects.values_list('event_id', flat=True)), [self.new.pk])
+
+    @override_settings(EVENT_RETENTION_DAYS=30)
+    def test_dry_run_changes_nothing(self):
+        call_command('partition_events', '--dry-run', stdout=StringIO())
+        self.assertEqual(SecurityEvent.objects.count(), 2)
+        self.assertEqual(Alert.objects.count(), 2)
+
+    def test_zero_retention_keeps_everything(self):
+        call_command('partition_events', '--retention-days', '0', stdout=StringIO())
+        self.assertEqual(SecurityEvent.objects.count(), 2)
+
+    @override_settings(EVENT_PARTITION_INTERVAL='day', EVENT_PARTITIONS_AHEAD=3)
+    def test_future_partitions_created(self):
+        if not is_partitioned(connection):
+            self.skipTest('SecurityEvent is only partitioned on PostgreSQL')
+        ensure_partitions(connection)
+        names = {name for name, _, _ in list_partitions(connection)}
+        start = period_start(timezone.now(), 'day')
+        for _ in range(4):
+            self.assertIn(partition_name(start), names)
+            start = period_end(start, 'day')
+        self.assertEqual(ensure_partitions(connection), [])
+
+
+class AlertTimeWindowTests(APITestCase):
+    def test_event_timestamp_window(self):
+        analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.client.force_authenticate(user=analyst)
+        now = timezone.now()
+        recent = SecurityEvent.objects.create(source='A', event_type='T', severity='HIGH', description='D')
+        older = SecurityEvent.objects.create(source='B', event_type='T', severity='HIGH', description='D')
+        SecurityEvent.objects.filter(pk=older.pk).update(timestamp=now - timedelta(days=3))
+        Alert.objects.filter(event=older).update(event_timestamp=now - timedelta(days=3))
+
+        response = self.client.get(reverse('alert_list'), {
+            'event__timestamp__gte': (now - timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['event'] for item in response.data['results']], [recent.pk])
+
+        response = self.client.get(reverse('alert_list'), {
+            'event__timestamp__lt': (now - timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual([item['event'] for item in response.data['results']], [older.pk])
@@ -0,0 +1,197 @@
+"""
+Query-count regression guard.
+
+Each endpoint is requested at several table sizes. A test fails if the
+number of SQL queries grows with the number of rows, which is the mark of
+an N+1, or if it exceeds the budget stored in ``query_count_baselines.json``
+for the database vendor in use. After an intended change, rerun with
+``UPDATE_QUERY_BASELINES=1`` to rewrite the budgets and the recorded query
+shapes, and commit the JSON file with the change:
+
+    UPDATE_QUERY_BASELINES=1 python manage.py test monitoring.tests_query_counts
+
+Budgets are only checked on vendors that have been recorded. Record a new
+one by running the command above against it.
+"""
+import difflib
+import json
+import os
+import re
+import uuid
+from pathlib import Path
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from .models import SecurityEvent, Alert
+
+User = get_user_model()
+
+BASELINE_FILE = Path(__file__).with_name('query_count_baselines.json')
+UPDATE_BASELINES = bool(os.environ.get('UPDATE_QUERY_BASELINES'))
+SIZES = (1, 10, 1000)
+
+SHAPE_RULES = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'"s\d+_x\d+"'), '?'),  # savepoint ids
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\?(?:, \?)*\)'), '(?)'),
+    (re.compile(r'\(\?\)(?:, \(\?\))+'), '(?)'),
+)
+
+
+def query_shape(sql):
+    """``sql`` with literals and value lists collapsed, so it only changes with the query's structure."""
+    for pattern, replacement in SHAPE_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+def event_payload(severity='HIGH', n=0):
+    return {'source': f'Sensor-{n}', 'event_type': 'Exploit', 'severity': severity, 'description': 'Exploit attempt'}
+
+
+@override_settings(ALERT_CACHE_TIMEOUT=0)
+class QueryCountTests(APITestCase):
+    def setUp(self):
+        # Throttle history and compiled rules are process-wide; start clean.
+        cache.clear()
+        self.analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.admin = User.objects.create_user(username='admin', password='password', role='ADMIN', is_staff=True)
+        self.rows = 0
+
+    def grow_to(self, size):
+        """Add events, each with an alert, until there are ``size`` of them."""
+        events = SecurityEvent.objects.bulk_create([
+            SecurityEvent(source=f'S{i % 50}', event_type='Exploit', severity=('HIGH', 'CRITICAL')[i % 2],
+                          description=f'Exploit attempt {i}')
+            for i in range(self.rows, size)
+        ])
+        Alert.objects.bulk_create([
+            Alert.for_event(event, status=('OPEN', 'ACKNOWLEDGED')[i % 2], last_seen=event.timestamp)
+            for i, event in enumerate(events, start=self.rows)
+        ])
+        self.rows = size
+
+    def send(self, method, url, data, content_type):
+        """Make the request and read the response, streamed or not."""
+        if method == 'get':
+            kwargs = {}
+        elif content_type:
+            kwargs = {'content_type': content_type}
+        else:
+            kwargs = {'format': 'json'}
+        response = getattr(self.client, method)(url, data, **kwargs)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        self.assertLess(response.status_code, 400, content)
+        return response
+
+    def measure(self, user, method, url, data=None, content_type=None):
+        """``url`` may be a callable, called before each request."""
+        self.client.force_authenticate(user=user)
+        # The first request compiles rules and fills per-process caches.
+        self.send(method, url() if callable(url) else url, data, content_type)
+        target = url() if callable(url) else url
+        with CaptureQueriesContext(connection) as ctx:
+            self.send(method, target, data, content_type)
+        return [query_shape(query['sql']) for query in ctx.captured_queries]
+
+    def assertQueryBudget(self, name, method, url, data=None, user=None, content_type=None):
+        shapes = {}
+        for size in SIZES:
+            self.grow_to(size)
+            shapes[size] = self.measure(user or self.analyst, method, url, data, content_type)
+
+        counts = {size: len(queries) for size, queries in shapes.items()}
+        smallest, largest = shapes[SIZES[0]], shapes[SIZES[-1]]
+        self.assertLessEqual(
+            counts[SIZES[-1]], counts[SIZES[0]],
+            f'{name}: query count grows with table size {counts}. New queries:\n'
+            + '\n'.join(difflib.unified_diff(smallest, largest, lineterm='')),
+        )
+
+        vendor = connection.vendor
+        baselines = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+        entry = baselines.setdefault(name, {'queries': {}, 'shapes': {}})
+        if UPDATE_BASELINES:
+            entry['queries'][vendor] = max(counts.values())
+            entry['shapes'][vendor] = largest
+            BASELINE_FILE.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+            return
+
+        if not any(vendor in other['queries'] for other in baselines.values()):
+            self.skipTest(f'No {vendor} baselines recorded')
+        budget = entry['queries'].get(vendor)
+        self.assertIsNotNone(budget, f'{name}: no {vendor} baseline, run with UPDATE_QUERY_BASELINES=1')
+        diff = '\n'.join(difflib.unified_diff(entry['shapes'].get(vendor, []), largest, lineterm=''))
+        self.assertLessEqual(
+            max(counts.values()), budget,
+            f'{name}: {max(counts.values())} queries, budget is {budget}.\n'
+            + (diff or '\n'.join(largest)),
+        )
+
+    def test_alert_list(self):
+        self.assertQueryBudget('alert_list', 'get', reverse('alert_list'))
+
+    def test_alert_list_filtered(self):
+        self.assertQueryBudget(
+            'alert_list_filtered', 'get', reverse('alert_list') + '?status=OPEN&event__severity=HIGH'
+        )
+
+    def test_alert_list_page_number(self):
+        self.assertQueryBudget('alert_list_page_number', 'get', reverse('alert_list') + '?page=1')
+
+    def test_alert_search(self):
+        self.assertQueryBudget('alert_search', 'get', reverse('alert_list') + '?search=exploit')
+
+    def test_alert_detail(self):
+        self.assertQueryBudget(
+            'alert_detail', 'get', lambda: reverse('alert_detail', args=[Alert.objects.latest('id').pk])
+        )
+
+    def test_alert_status_update(self):
+        self.assertQueryBudget(
+            'alert_status_update', 'patch',
+            lambda: reverse('alert_status', args=[Alert.objects.latest('id').pk]),
+            {'status': 'ACKNOWLEDGED'}, user=self.admin,
+        )
+
+    def test_alert_bulk_status(self):
+        self.assertQueryBudget(
+            'alert_bulk_status', 'post', reverse('alert_bulk_status') + '?event__severity=HIGH',
+            {'status': 'RESOLVED'}, user=self.admin,
+        )
+
+    def test_event_ingest(self):
+        self.assertQueryBudget('event_ingest', 'post', reverse('event_ingest'), event_payload())
+
+    def test_event_batch_ingest(self):
+        batch = [event_payload(('LOW', 'HIGH')[n % 2], n) for n in range(10)]
+        self.assertQueryBudget('event_batch_ingest', 'post', reverse('event_batch_ingest'), batch)
+
+    def test_event_queue_ingest(self):
+        batch = [event_payload('LOW', n) for n in range(10)]
+        self.assertQueryBudget('event_queue_ingest', 'post', reverse('event_queue_ingest'), batch)
+
+    def test_event_queue_stats(self):
+        self.assertQueryBudget('event_queue_stats', 'get', reverse('event_queue_stats'), user=self.admin)
+
+    def test_event_stats(self):
+        self.assertQueryBudget('event_stats', 'get', reverse('event_stats') + '?window=24h')
+
+    def test_alert_export(self):
+        self.assertQueryBudget('alert_export', 'get', reverse('alert_export') + '?event__severity=HIGH')
+
+    def test_event_export(self):
+        self.assertQueryBudget('event_export', 'get', reverse('event_export') + '?format=csv')
+
+    def test_event_upload(self):
+        body = ''.join(json.dumps(event_payload(('LOW', 'HIGH')[n % 2], n)) + '\n' for n in range(10))
+        self.assertQueryBudget(
+            'event_upload', 'post', lambda: reverse('event_upload', args=[uuid.uuid4()]), body,
+            content_type='application/x-ndjson',
+        )
@@ -0,0 +1,73 @@
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from .models import SecurityEvent, Alert, AlertRule
+from .ingest import ingest_events
+from .rules import RuleIndex, get_rule_index, invalidate_rules
+
+class AlertRuleEngineTests(TestCase):
+    def setUp(self):
+        # Rules created here vanish with the test transaction, without a
+        # post_delete, so drop the compiled copy afterwards.
+        self.addCleanup(invalidate_rules)
+        self.default_rule = AlertRule.objects.get(name='High and critical events')
+
+    def create_event(self, **kwargs):
+        data = {'source': 'FW', 'event_type': 'Scan', 'severity': 'LOW', 'description': ''}
+        data.update(kwargs)
+        return SecurityEvent.objects.create(**data)
+
+    def test_default_rule_matches_high_and_critical(self):
+        high = self.create_event(severity='HIGH')
+        self.create_event(severity='MEDIUM')
+        self.assertEqual(list(Alert.objects.values_list('event_id', 'rule_id')), [(high.pk, self.default_rule.pk)])
+
+    def test_rule_criteria(self):
+        rule = AlertRule.objects.create(
+            name='Failed SSH logins', priority=10, source='sshd', event_type='Auth',
+            severities='LOW,MEDIUM', description_regex=r'failed password for \w+',
+        )
+        ingest_events([
+            {'source': 'sshd', 'event_type': 'Auth', 'severity': 'LOW', 'description': 'failed password for root'},
+            {'source': 'sshd', 'event_type': 'Auth', 'severity': 'LOW', 'description': 'accepted password for root'},
+            {'source': 'nginx', 'event_type': 'Auth', 'severity': 'LOW', 'description': 'failed password for root'},
+            {'source': 'sshd', 'event_type': 'Auth', 'severity': 'HIGH', 'description': 'failed password for root'},
+        ])
+        self.assertEqual(
+            sorted(Alert.objects.values_list('event__source', 'event__severity', 'rule_id')),
+            [('sshd', 'HIGH', self.default_rule.pk), ('sshd', 'LOW', rule.pk)],
+        )
+
+    def test_priority_decides_between_rules(self):
+        rule = AlertRule.objects.create(name='Ransomware', priority=1, event_type='Ransomware')
+        self.create_event(event_type='Ransomware', severity='CRITICAL')
+        self.assertEqual(Alert.objects.get().rule_id, rule.pk)
+
+    def test_changes_invalidate_compiled_rules(self):
+        index = get_rule_index()
+        self.assertIs(get_rule_index(), index)
+        rule = AlertRule.objects.create(name='Everything from honeypot', source='honeypot')
+        self.create_event(source='honeypot')
+        self.assertEqual(Alert.objects.count(), 1)
+
+        rule.enabled = False
+        rule.save()
+        self.create_event(source='honeypot')
+        self.assertEqual(Alert.objects.count(), 1)
+
+        self.default_rule.delete()
+        self.create_event(severity='CRITICAL')
+        self.assertEqual(Alert.objects.count(), 1)
+
+    def test_only_candidate_rules_are_checked(self):
+        AlertRule.objects.create(name='Scans', event_type='Scan')
+        AlertRule.objects.create(name='IDS', source='IDS')
+        AlertRule.objects.create(name='IDS exploits', source='IDS', event_type='Exploit')
+        index = RuleIndex(AlertRule.objects.filter(enabled=True))
+        event = SecurityEvent(source='FW', event_type='Exploit', severity='LOW', description='')
+        self.assertEqual([rule.id for rule in index.candidates(event)], [self.default_rule.pk])
+
+    def test_invalid_rule_is_rejected(self):
+        rule = AlertRule(name='Broken', severities='HIGH,URGENT', description_regex='(')
+        with self.assertRaises(ValidationError) as ctx:
+            rule.full_clean()
+        self.assertEqual(set(ctx.exception.message_dict), {'severities', 'description_regex'})
@@ -0,0 +1,75 @@
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from .models import SecurityEvent
+from .ingest import ingest_events
+from .search import search_tokens
+
+User = get_user_model()
+
+class AlertSearchTests(APITestCase):
+    def setUp(self):
+        self.url = reverse('alert_list')
+        self.analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.client.force_authenticate(user=self.analyst)
+
+        self.brute = SecurityEvent.objects.create(
+            source='Firewall', event_type='BruteForce', severity='HIGH',
+            description='Repeated failed logins from one address',
+        )
+        self.malware = SecurityEvent.objects.create(
+            source='EDR', event_type='Malware', severity='CRITICAL',
+            description='Malware signature matched, malware quarantined',
+        )
+        self.mention = SecurityEvent.objects.create(
+            source='IDS', event_type='Scan', severity='HIGH',
+            description='Port scan, possible malware staging',
+        )
+
+    def search(self, query, **params):
+        response = self.client.get(self.url, {'search': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['event'] for item in response.data['results']]
+
+    def test_matches_each_field(self):
+        self.assertEqual(self.search('firewall'), [self.brute.id])
+        self.assertEqual(self.search('bruteforce'), [self.brute.id])
+        self.assertEqual(self.search('logins'), [self.brute.id])
+
+    def test_prefix_and_all_terms(self):
+        """Terms match as prefixes and every term must match."""
+        self.assertEqual(self.search('quarant'), [self.malware.id])
+        self.assertEqual(self.search('malware staging'), [self.mention.id])
+        self.assertEqual(self.search('malware firewall'), [])
+
+    def test_ranked(self):
+        """Better matches come first unless an explicit ordering is given."""
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            self.skipTest('No full-text index on this database')
+        self.assertEqual(self.search('malware'), [self.malware.id, self.mention.id])
+        self.assertEqual(
+            self.search('malware', ordering='created_at'), [self.malware.id, self.mention.id]
+        )
+        self.assertEqual(
+            self.search('malware', ordering='-created_at'), [self.mention.id, self.malware.id]
+        )
+
+    def test_query_syntax_is_ignored(self):
+        self.assertEqual(self.search('"malware*'), [self.malware.id, self.mention.id])
+        self.assertEqual(self.search('!!'), [])
+
+    def test_bulk_ingested_events_are_indexed(self):
+        events = ingest_events([
+            {'source': 'Proxy', 'event_type': 'Exfiltration', 'severity': 'HIGH', 'description': 'Large upload'},
+        ])
+        self.assertEqual(self.search('exfiltration'), [events[0].id])
+
+    def test_updates_are_indexed(self):
+        SecurityEvent.objects.filter(pk=self.brute.pk).update(description='Credential stuffing')
+        self.assertEqual(self.search('stuffing'), [self.brute.id])
+        self.assertEqual(self.search('logins'), [])
+
+    def test_search_tokens(self):
+        self.assertEqual(search_tokens('Mal-ware "C2" & | *'), ['mal', 'ware', 'c2'])
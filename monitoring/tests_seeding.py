@@ -0,0 +1,26 @@
+from django.db.models import Sum
+from django.test import TestCase
+from .models import SecurityEvent, Alert, EventRollup
+from .seeding import seed_events, generate_events
+
+class SeedEventsTests(TestCase):
+    def test_generator_is_reproducible(self):
+        first = [(e.source, e.severity, e.description) for e in generate_events(20, seed=7)]
+        second = [(e.source, e.severity, e.description) for e in generate_events(20, seed=7)]
+        self.assertEqual(first, second)
+
+    def test_seeds_events_alerts_and_rollups(self):
+        SecurityEvent.objects.create(source='FW', event_type='Exploit', severity='HIGH', description='D')
+        progress = []
+        events, alerts = seed_events(250, days=2, batch_size=100, progress=progress.append)
+
+        self.assertEqual((events, progress), (250, [100, 200, 250]))
+        self.assertEqual(SecurityEvent.objects.count(), 251)
+        seeded = SecurityEvent.objects.exclude(source='FW')
+        self.assertEqual(alerts, seeded.filter(severity__in=['HIGH', 'CRITICAL']).count())
+        self.assertEqual(Alert.objects.count(), alerts + 1)
+        self.assertEqual(
+            EventRollup.objects.filter(resolution='hour').aggregate(total=Sum('count'))['total'], 251
+        )
+        alert = Alert.objects.select_related('event').exclude(event__source='FW').first()
+        self.assertEqual(alert.created_at, alert.event.timestamp)
@@ -1,7 +1,18 @@
-from django.test import TestCase
-from .serializers import SecurityEventSerializer, AlertSerializer
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from .serializers import SecurityEventSerializer, AlertSerializer, AlertValuesSerializer
+from .renderers import FastJSONRenderer
 from .models import SecurityEvent, Alert
 
+User = get_user_model()
+
 class SerializerTests(TestCase):
     def test_security_event_serializer_validation(self):
         """Test strict validation of SecurityEventSerializer."""
@@ -62,3 +73,117 @@ class SerializerTests(TestCase):
         
         # Verify created_at was NOT set to the past
         self.assertNotEqual(instance.created_at.year, 2000)
+
+
+class FastPathTests(APITestCase):
+    """Test that the values() serializer and orjson renderer match DRF byte for byte."""
+
+    def setUp(self):
+        self.analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.client.force_authenticate(user=self.analyst)
+        for i, description in enumerate(['plain', 'ünïcødé \u2028 "quoted" \\ \x01', '']):
+            SecurityEvent.objects.create(
+                source=f'S{i}', event_type='Exploit', severity='CRITICAL', description=description
+            )
+        Alert.objects.filter(event__source='S0').update(status='ACKNOWLEDGED')
+
+    def expected(self, alerts):
+        """The alerts as DRF's model serializer and JSONRenderer produce them."""
+        return JSONRenderer().render(AlertSerializer(alerts, many=True).data)
+
+    def test_values_rows_match_model_serializer(self):
+        """Test that AlertValuesSerializer turns values() rows into AlertSerializer's data."""
+        alerts = Alert.objects.select_related('event').order_by('id')
+        rows = Alert.objects.order_by('id').values(*AlertValuesSerializer.columns())
+        self.assertEqual(AlertValuesSerializer(rows, many=True).data, AlertSerializer(alerts, many=True).data)
+
+    @override_settings(ALERT_CACHE_TIMEOUT=0)
+    def test_list_and_detail_bytes(self):
+        """Test that list and detail responses are the bytes the DRF path would send."""
+        alerts = list(Alert.objects.select_related('event').order_by('-created_at', '-id'))
+        response = self.client.get(reverse('alert_list'))
+        self.assertEqual(response.content, b'{"next":null,"previous":null,"results":%s}' % self.expected(alerts))
+        response = self.client.get(reverse('alert_detail', args=[alerts[1].pk]))
+        self.assertEqual(response.content, JSONRenderer().render(AlertSerializer(alerts[1]).data))
+
+    def test_renderer_matches_json_renderer(self):
+        """Test FastJSONRenderer against JSONRenderer on escapes, datetimes and indented output."""
+        data = {
+            'text': 'line\u2028sep\u2029 \x00\x1f\x7f é 😀 </script>',
+            'when': datetime(2026, 10, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'nested': [{'n': 1, 'ok': True, 'none': None}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+
+
+@override_settings(ALERT_CACHE_TIMEOUT=0)
+class SparseFieldsetTests(APITestCase):
+    """Test ?fields= and ?expand= on the alert list and detail endpoints."""
+
+    def setUp(self):
+        self.analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.client.force_authenticate(user=self.analyst)
+        for i in range(3):
+            SecurityEvent.objects.create(
+                source=f'S{i}', event_type='Exploit', severity='CRITICAL', description='x' * 1000
+            )
+
+    def test_fields_limit_response_and_columns(self):
+        """Test that only the requested fields are returned and their columns selected."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('alert_list'), {'fields': 'id,status,event_details.severity'})
+        self.assertEqual(response.status_code, 200)
+        for item in response.data['results']:
+            self.assertEqual(set(item), {'id', 'status', 'event_details'})
+            self.assertEqual(item['event_details'], {'severity': 'CRITICAL'})
+        sql = ctx.captured_queries[-1]['sql']
+        self.assertIn('"severity"', sql)
+        self.assertNotIn('"description"', sql)
+
+    def test_no_join_without_event_fields(self):
+        """Test that the event table is not joined when no event field is requested."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('alert_list'), {'fields': 'id,status'})
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertNotIn('JOIN', ctx.captured_queries[-1]['sql'])
+
+    def test_expand_embeds_whole_object(self):
+        """Test that an expanded relation is embedded with all its fields."""
+        alert = Alert.objects.latest('id')
+        response = self.client.get(
+            reverse('alert_detail', args=[alert.pk]), {'fields': 'id', 'expand': 'event_details'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {'id', 'event_details'})
+        self.assertEqual(response.data['event_details']['description'], 'x' * 1000)
+
+    def test_matches_model_serializer(self):
+        """Test that both serializers produce the same data for a fieldset."""
+        fieldset = AlertValuesSerializer.parse_fieldset('status,created_at,event_details.source,event')
+        alerts = Alert.objects.select_related('event').order_by('id')
+        rows = Alert.objects.order_by('id').values(*AlertValuesSerializer.columns(fieldset))
+        self.assertEqual(
+            AlertValuesSerializer(rows, many=True, fieldset=fieldset).data,
+            AlertSerializer(alerts, many=True, fieldset=fieldset).data,
+        )
+
+    def test_cursor_works_without_ordering_fields(self):
+        """Test cursor pagination when the fieldset leaves out the ordering fields."""
+        response = self.client.get(reverse('alert_list'), {'fields': 'status', 'page_size': 2})
+        self.assertEqual([set(item) for item in response.data['results']], [{'status'}] * 2)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_unknown_fields_rejected(self):
+        """Test that unknown fields and non-expandable relations are rejected with 400."""
+        response = self.client.get(reverse('alert_list'), {'fields': 'id,secret,event_details.nope'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.data['fields'][0])
+        self.assertIn('event_details.nope', response.data['fields'][0])
+        response = self.client.get(reverse('alert_list'), {'fields': 'id', 'expand': 'status'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expand', response.data)
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from .models import SecurityEvent, EventRollup
+from .ingest import ingest_events
+from .rollups import record_rollups, event_counts
+
+User = get_user_model()
+
+class RollupTests(TestCase):
+    def test_single_and_bulk_ingest_update_rollups(self):
+        SecurityEvent.objects.create(source='FW', event_type='Scan', severity='LOW', description='a')
+        ingest_events([
+            {'source': 'FW', 'event_type': 'Scan', 'severity': 'LOW', 'description': 'b'},
+            {'source': 'IDS', 'event_type': 'Exploit', 'severity': 'HIGH', 'description': 'c'},
+        ])
+        for resolution in ('minute', 'hour'):
+            rows = EventRollup.objects.filter(resolution=resolution)
+            self.assertEqual(
+                sorted(rows.values_list('source', 'severity', 'count')),
+                [('FW', 'LOW', 2), ('IDS', 'HIGH', 1)],
+            )
+
+    def test_window_combines_minute_and_hour_buckets(self):
+        now = datetime(2026, 10, 17, 12, 30, tzinfo=dt_timezone.utc)
+        for minutes_ago in (5, 90, 130, 200):
+            record_rollups([SecurityEvent(
+                source='FW', event_type='Scan', severity='HIGH', description='',
+                timestamp=now - timedelta(minutes=minutes_ago),
+            )])
+        # 2h window starts at 10:30: minute buckets cover 10:30-11:00, whole hours after that.
+        self.assertEqual(event_counts(timedelta(hours=2), now=now), [{'severity': 'HIGH', 'count': 2}])
+        self.assertEqual(event_counts(timedelta(hours=3), now=now), [{'severity': 'HIGH', 'count': 3}])
+
+
+class EventStatsViewTests(APITestCase):
+    def setUp(self):
+        self.url = reverse('event_stats')
+        analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.client.force_authenticate(user=analyst)
+        ingest_events([
+            {'source': 'FW', 'event_type': 'Scan', 'severity': 'LOW', 'description': 'a'},
+            {'source': 'FW', 'event_type': 'Scan', 'severity': 'LOW', 'description': 'b'},
+            {'source': 'IDS', 'event_type': 'Exploit', 'severity': 'CRITICAL', 'description': 'c'},
+        ])
+
+    def test_counts_by_severity(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual(
+            response.data['results'],
+            [{'severity': 'CRITICAL', 'count': 1}, {'severity': 'LOW', 'count': 2}],
+        )
+
+    def test_counts_by_source(self):
+        response = self.client.get(self.url, {'window': '15m', 'by': 'source'})
+        self.assertEqual(
+            response.data['results'], [{'source': 'FW', 'count': 2}, {'source': 'IDS', 'count': 1}]
+        )
+
+    def test_does_not_read_events(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+        self.assertFalse(any(SecurityEvent._meta.db_table in q['sql'] for q in ctx.captured_queries))
+
+    def test_invalid_parameters(self):
+        for params in ({'window': 'yesterday'}, {'window': '90d'}, {'window': '0h'}, {'by': 'description'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_unauthenticated(self):
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
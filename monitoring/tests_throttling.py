@@ -0,0 +1,140 @@
+import os
+import unittest
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from users.models import User
+from . import ratelimit
+from .ratelimit import RateLimiter, redis_client
+
+
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], **rates},
+    })
+
+
+def event_payload(source='Sensor-1'):
+    return {'source': source, 'event_type': 'Scan', 'severity': 'LOW', 'description': 'Port scan'}
+
+
+class RateLimiterTestsMixin:
+    def get_cache(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.cache = self.get_cache()
+        self.cache.clear()
+        self.limiter = RateLimiter(self.cache)
+
+    def test_burst_then_steady_rate(self):
+        now = 1_700_000_000.0
+        decisions = [self.limiter.consume('k', '3/min', now=now) for _ in range(4)]
+        self.assertEqual([d.allowed for d in decisions], [True, True, True, False])
+        self.assertEqual([d.remaining for d in decisions], [2, 1, 0, 0])
+        self.assertAlmostEqual(decisions[-1].retry_after, 20)
+        # One unit comes back every 20 seconds
+        self.assertFalse(self.limiter.consume('k', '3/min', now=now + 19).allowed)
+        self.assertTrue(self.limiter.consume('k', '3/min', now=now + 20).allowed)
+        self.assertTrue(self.limiter.consume('k', '3/min', cost=3, now=now + 80).allowed)
+
+    def test_cost_and_refund(self):
+        now = 1_700_000_000.0
+        self.assertTrue(self.limiter.consume('k', '100/s', cost=60, now=now).allowed)
+        denied = self.limiter.consume('k', '100/s', cost=60, now=now)
+        self.assertEqual((denied.allowed, denied.remaining), (False, 40))
+        self.assertAlmostEqual(denied.retry_after, 0.2)
+        # More than the whole allowance can never fit
+        oversized = self.limiter.consume('k', '100/s', cost=500, now=now)
+        self.assertEqual((oversized.allowed, oversized.retry_after, oversized.limit), (False, None, 100))
+        self.limiter.refund('k', '100/s', 60, now=now)
+        self.assertTrue(self.limiter.consume('k', '100/s', cost=100, now=now).allowed)
+
+    def test_keys_and_rates_are_independent(self):
+        self.assertTrue(self.limiter.consume('a', '1/h').allowed)
+        self.assertFalse(self.limiter.consume('a', '1/h').allowed)
+        self.assertTrue(self.limiter.consume('b', '1/h').allowed)
+        self.assertTrue(self.limiter.consume('a', '5/d').allowed)
+
+
+class RateLimiterTests(RateLimiterTestsMixin, SimpleTestCase):
+    def get_cache(self):
+        return cache
+
+    def test_redis_client(self):
+        self.assertIsNone(redis_client(cache))
+        # Only builds the client, no connection is made
+        client = redis_client(RedisCache('redis://localhost:6379/0', {}))
+        self.assertIsInstance(client, redis.Redis)
+
+
+@unittest.skipUnless(os.environ.get('REDIS_URL'), 'needs REDIS_URL')
+class RedisRateLimiterTests(RateLimiterTestsMixin, SimpleTestCase):
+    def get_cache(self):
+        return RedisCache(os.environ['REDIS_URL'], {'KEY_PREFIX': 'tests_throttling'})
+
+    def test_script_is_registered_once(self):
+        self.limiter.consume('k', '1/s')
+        script = ratelimit._gcra_script
+        self.assertIsNotNone(script)
+        self.limiter.consume('k', '1/s')
+        self.assertIs(ratelimit._gcra_script, script)
+
+
+class IngestThrottleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='sensor', password='password', role='ANALYST')
+        self.client.force_authenticate(user=self.user)
+
+    def post_batch(self, *sources):
+        return self.client.post(reverse('event_batch_ingest'), [event_payload(s) for s in sources], format='json')
+
+    @throttle_rates(ingest='10/min', query='100/min')
+    def test_ingest_is_charged_per_event(self):
+        self.assertEqual(self.post_batch(*['Sensor-1'] * 8).status_code, 201)
+        response = self.post_batch(*['Sensor-1'] * 5)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.data['available'], 2)
+        self.assertAlmostEqual(response.data['retry_after'], 18, delta=1)
+        self.assertEqual(response['Retry-After'], str(18))
+        self.assertEqual(self.post_batch('Sensor-1', 'Sensor-1').status_code, 201)
+        # Reads have their own scope
+        self.assertEqual(self.client.get(reverse('alert_list')).status_code, 200)
+
+    @throttle_rates(query='2/min')
+    def test_query_scope(self):
+        statuses = [self.client.get(reverse('alert_list')).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(self.post_batch('Sensor-1').status_code, 201)
+
+    @throttle_rates(ingest='6/min')
+    @override_settings(THROTTLE_SOURCE_RATES={'Sensor-1': '3/min'})
+    def test_source_quota_refunds_client(self):
+        self.assertEqual(self.post_batch('Sensor-1', 'Sensor-1', 'Sensor-2', 'Sensor-2').status_code, 201)
+        response = self.post_batch('Sensor-1', 'Sensor-1')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.data['available'], 1)
+        # The refused batch was not charged to the client
+        self.assertEqual(self.post_batch('Sensor-2', 'Sensor-2').status_code, 201)
+
+    @throttle_rates(ingest='3/min')
+    def test_batch_over_the_whole_allowance(self):
+        response = self.post_batch(*['Sensor-1'] * 4)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.data['max_batch'], 3)
+        self.assertNotIn('Retry-After', response)
+        self.assertEqual(self.post_batch(*['Sensor-1'] * 3).status_code, 201)
+
+    @override_settings(THROTTLE_SOURCE_RATES={'*': '1/min'})
+    def test_default_source_quota(self):
+        self.assertEqual(self.post_batch('Sensor-1', 'Sensor-2').status_code, 201)
+        self.assertEqual(self.post_batch('Sensor-3').status_code, 201)
+        self.assertEqual(self.post_batch('Sensor-2').status_code, 429)
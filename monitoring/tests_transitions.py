@@ -0,0 +1,91 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from .models import SecurityEvent, Alert
+
+User = get_user_model()
+
+
+class BulkStatusTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='password', role='ADMIN', is_staff=True)
+        self.analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.client.force_authenticate(user=self.admin)
+        events = SecurityEvent.objects.bulk_create([
+            SecurityEvent(source=f'S{i}', event_type='Exploit', severity=('HIGH', 'CRITICAL')[i % 2],
+                          description=f'Exploit attempt {i}')
+            for i in range(9)
+        ])
+        self.alerts = Alert.objects.bulk_create([
+            Alert.for_event(event, status=('OPEN', 'ACKNOWLEDGED', 'RESOLVED')[i % 3], last_seen=event.timestamp)
+            for i, event in enumerate(events)
+        ])
+        self.url = reverse('alert_bulk_status')
+
+    def statuses(self):
+        return dict(Alert.objects.values_list('pk', 'status'))
+
+    def test_ids_acknowledge(self):
+        ids = [alert.pk for alert in self.alerts] + [999999]
+        response = self.client.post(self.url, {'status': 'ACKNOWLEDGED', 'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'status': 'ACKNOWLEDGED', 'matched': 9, 'changed': 3, 'skipped': 3, 'invalid': 3, 'not_found': 1,
+        })
+        self.assertEqual(
+            sorted(self.statuses().values()), ['ACKNOWLEDGED'] * 6 + ['RESOLVED'] * 3,
+        )
+
+    def test_filter_resolve_in_one_update(self):
+        url = self.url + '?event__severity=CRITICAL'
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url, {'status': 'RESOLVED'}, format='json')
+        self.assertEqual(response.data['matched'], 4)
+        self.assertEqual(response.data['changed'] + response.data['skipped'], 4)
+        self.assertEqual(response.data['invalid'], 0)
+        self.assertEqual(sum(1 for query in ctx.captured_queries if query['sql'].startswith('UPDATE')), 1)
+        self.assertFalse(Alert.objects.filter(event__severity='CRITICAL').exclude(status='RESOLVED').exists())
+        self.assertEqual(Alert.objects.filter(event__severity='HIGH', status='RESOLVED').count(), 2)
+
+    def test_status_filter_counts(self):
+        response = self.client.post(self.url + '?status=RESOLVED', {'status': 'RESOLVED'}, format='json')
+        self.assertEqual(response.data, {'status': 'RESOLVED', 'matched': 3, 'changed': 0, 'skipped': 3, 'invalid': 0})
+        response = self.client.post(self.url + '?status=RESOLVED', {'status': 'ACKNOWLEDGED'}, format='json')
+        self.assertEqual(response.data, {'status': 'ACKNOWLEDGED', 'matched': 3, 'changed': 0, 'skipped': 0, 'invalid': 3})
+
+    def test_search_filter(self):
+        response = self.client.post(self.url + '?search=exploit', {'status': 'RESOLVED'}, format='json')
+        self.assertEqual((response.data['matched'], response.data['changed']), (9, 6))
+
+    def test_invalidates_cached_list(self):
+        self.client.force_authenticate(user=self.analyst)
+        self.client.get(reverse('alert_list'), {'status': 'OPEN'})
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(self.url + '?status=OPEN', {'status': 'ACKNOWLEDGED'}, format='json')
+        # Counted before the UPDATE moves the alerts out of the filter
+        self.assertEqual(response.data, {
+            'status': 'ACKNOWLEDGED', 'matched': 3, 'changed': 3, 'skipped': 0, 'invalid': 0,
+        })
+        self.client.force_authenticate(user=self.analyst)
+        response = self.client.get(reverse('alert_list'), {'status': 'OPEN'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_rejects_bad_requests(self):
+        # Moving back to OPEN is not a transition
+        response = self.client.post(self.url, {'status': 'OPEN', 'ids': [self.alerts[0].pk]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        # Without ids or filters nothing is selected on purpose
+        response = self.client.post(self.url, {'status': 'RESOLVED'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.url, {'status': 'RESOLVED', 'ids': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.statuses(), {alert.pk: alert.status for alert in self.alerts})
+
+    def test_admin_only(self):
+        self.client.force_authenticate(user=self.analyst)
+        response = self.client.post(self.url, {'status': 'RESOLVED', 'ids': [self.alerts[0].pk]}, format='json')
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,226 @@
+import asyncio
+import io
+import json
+import math
+import uuid
+from datetime import timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .apikeys import create_ingest_key
+from .asgi import StreamingBodyASGIHandler
+from .tests_throttling import throttle_rates
+from .models import SecurityEvent, Alert, EventRollup, EventUpload
+from .uploads import UploadConflict, ingest_upload
+
+User = get_user_model()
+
+
+def ndjson(*sources):
+    return ''.join(
+        json.dumps({'source': source, 'event_type': 'Scan', 'severity': 'LOW', 'description': 'Backfill'}) + '\n'
+        for source in sources
+    ).encode()
+
+
+class IngestUploadTests(TestCase):
+    def setUp(self):
+        self.upload = EventUpload.objects.create(id=uuid.uuid4(), owner='1')
+
+    def ingest(self, body, offset=0, **kwargs):
+        self.upload, truncated = ingest_upload(self.upload, io.BytesIO(body), offset, batch_size=2, **kwargs)
+        return self.upload, truncated
+
+    def test_batches_and_errors(self):
+        body = ndjson('A', 'B') + b'\n{not json\n' + ndjson('C') + b'[1]\n'
+        upload, truncated = self.ingest(body)
+        self.assertFalse(truncated)
+        self.assertEqual((upload.lines, upload.created, upload.failed), (6, 3, 2))
+        self.assertEqual([error['line'] for error in upload.errors], [4, 6])
+        self.assertEqual(SecurityEvent.objects.count(), 3)
+
+    def test_resume_skips_committed_lines(self):
+        body = ndjson('A', 'B', 'C', 'D', 'E')
+        # The connection drops in the middle of line 4; lines 0-1 were committed
+        cut = body[:body.index(b'"D"') + 2]
+        upload, truncated = self.ingest(cut)
+        self.assertTrue(truncated)
+        self.assertEqual(upload.lines, 3)
+        # The client resends from an earlier point: nothing is inserted twice
+        upload, _ = self.ingest(body[len(ndjson('A')):], offset=1)
+        self.assertEqual((upload.lines, upload.created), (5, 5))
+        self.assertEqual(sorted(SecurityEvent.objects.values_list('source', flat=True)), ['A', 'B', 'C', 'D', 'E'])
+        with self.assertRaises(UploadConflict):
+            self.ingest(ndjson('F'), offset=7)
+
+    def test_last_line_without_newline(self):
+        upload, truncated = self.ingest(ndjson('A', 'B').rstrip(b'\n'))
+        self.assertFalse(truncated)
+        self.assertEqual(upload.created, 2)
+
+    def test_historical_timestamps(self):
+        now = timezone.now()
+        lines = [
+            {'severity': 'CRITICAL', 'timestamp': (now - timedelta(days=3)).isoformat()},
+            {'severity': 'CRITICAL'},
+            {'severity': 'LOW', 'timestamp': (now + timedelta(hours=1)).isoformat()},
+            {'severity': 'LOW', 'timestamp': (now - timedelta(days=400)).isoformat()},
+            {'severity': 'LOW', 'timestamp': 'yesterday'},
+        ]
+        body = b''.join(
+            json.dumps({'source': 'A', 'event_type': 'Scan', 'description': 'Backfill', **line}).encode() + b'\n'
+            for line in lines
+        )
+        upload, _ = self.ingest(body)
+        self.assertEqual((upload.created, upload.failed), (2, 3))
+        self.assertEqual({error['line'] for error in upload.errors}, {3, 4, 5})
+        old, live = SecurityEvent.objects.order_by('timestamp')
+        self.assertAlmostEqual(old.timestamp, now - timedelta(days=3), delta=timedelta(seconds=1))
+        self.assertAlmostEqual(live.timestamp, now, delta=timedelta(minutes=1))
+        hour = (now - timedelta(days=3)).astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+        self.assertEqual(EventRollup.objects.get(resolution='hour', bucket=hour).count, 1)
+        # Only the live event is matched against the alert rules
+        self.assertEqual(list(Alert.objects.values_list('event', flat=True)), [live.pk])
+
+    def test_long_lines_and_source(self):
+        body = ndjson('A') + b'{"source": "' + b'x' * 200 + b'"}\n' + ndjson('B')
+        upload, _ = self.ingest(body, max_line_length=120, source='A')
+        self.assertEqual((upload.lines, upload.created, upload.failed), (3, 1, 2))
+        self.assertIn('longer than 120', str(upload.errors[0]['errors']))
+        self.assertIn('source', upload.errors[1]['errors'])
+
+
+@override_settings(UPLOAD_BATCH_SIZE=2)
+class EventUploadViewTests(APITestCase):
+    def setUp(self):
+        self.analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.client.force_authenticate(user=self.analyst)
+        self.url = reverse('event_upload', args=[uuid.uuid4()])
+
+    def post(self, body, offset=0, **extra):
+        return self.client.post(f'{self.url}?offset={offset}', body, content_type='application/x-ndjson', **extra)
+
+    def test_upload_resume_and_progress(self):
+        response = self.post(ndjson('A', 'B', 'C'))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['offset'], response.data['created']), (3, 3))
+        response = self.post(ndjson('D'), offset=5)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['offset'], 3)
+        response = self.post(ndjson('C', 'D'), offset=2)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.url).data['offset'], 4)
+        self.assertEqual(SecurityEvent.objects.count(), 4)
+
+    def test_upload_belongs_to_its_owner(self):
+        self.post(ndjson('A'))
+        other = User.objects.create_user(username='other', password='password', role='ANALYST')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.post(ndjson('B'), offset=1).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bad_requests(self):
+        response = self.client.post(self.url, [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.assertEqual(self.post(ndjson('A'), offset='x').status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.post(ndjson('A')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_ingest_key_source(self):
+        self.client.force_authenticate(user=None)
+        _, raw_key = create_ingest_key('backfill', source='A')
+        response = self.post(ndjson('A', 'B'), HTTP_AUTHORIZATION=f'Api-Key {raw_key}')
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 1))
+
+    @throttle_rates(ingest='20/min')
+    @override_settings(UPLOAD_BATCH_SIZE=1000, THROTTLE_SOURCE_RATES={'B': '3/min'})
+    def test_batches_are_throttled(self):
+        cache.clear()
+        # Batches shrink to the 3 events B's quota allows at once
+        response = self.post(ndjson('A', 'A', 'A', 'B', 'B', 'B', 'B', 'A'))
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual((response.data['offset'], response.data['created']), (6, 6))
+        self.assertEqual(response.data['available'], 0)
+        self.assertGreater(response.data['retry_after'], 0)
+        self.assertEqual(response['Retry-After'], str(math.ceil(response.data['retry_after'])))
+        self.assertEqual(SecurityEvent.objects.count(), 6)
+        # The client is charged the request and the committed events only
+        # (1 + 6 of 20), so 1 + 12 more fit
+        self.assertEqual(self.post(ndjson(*['A'] * 12), offset=6).data['offset'], 18)
+        self.assertEqual(self.post(ndjson('A'), offset=18).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+@override_settings(UPLOAD_BATCH_SIZE=2)
+class ASGIUploadTests(TestCase):
+    def setUp(self):
+        analyst = User.objects.create_user(username='analyst', password='password', role='ANALYST')
+        self.token = str(AccessToken.for_user(analyst))
+        self.upload_id = uuid.uuid4()
+        # As the test client does: keep the test's connection open
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+
+    async def post(self, messages, on_receive=None):
+        """Drive the ASGI handler with ``messages`` from the client; returns the status and JSON body."""
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST',
+            'scheme': 'http', 'path': reverse('event_upload', args=[self.upload_id]), 'root_path': '',
+            'query_string': b'offset=0', 'server': ('testserver', 80),
+            'headers': [
+                (b'content-type', b'application/x-ndjson'),
+                (b'authorization', f'Bearer {self.token}'.encode()),
+            ],
+        }
+        received, sent = [], []
+
+        async def receive():
+            if on_receive:
+                await on_receive(len(received))
+            if len(received) < len(messages):
+                received.append(messages[len(received)])
+                return received[-1]
+            await asyncio.Event().wait()
+
+        async def send(message):
+            sent.append(message)
+
+        # Skips the per-request thread of __call__, as the async test client does
+        await StreamingBodyASGIHandler().handle(scope, receive, send)
+        body = b''.join(message.get('body', b'') for message in sent if message['type'] == 'http.response.body')
+        return sent[0]['status'], json.loads(body)
+
+    async def test_lines_are_committed_as_they_arrive(self):
+        seen = []
+
+        async def on_receive(count):
+            seen.append(await SecurityEvent.objects.acount())
+
+        body = ndjson('A', 'B', 'C')
+        status_code, data = await self.post([
+            {'type': 'http.request', 'body': body[:10], 'more_body': True},
+            {'type': 'http.request', 'body': body[10:], 'more_body': True},
+            {'type': 'http.request', 'body': ndjson('D'), 'more_body': False},
+        ], on_receive)
+        self.assertEqual((status_code, data['offset'], data['created']), (201, 4, 4))
+        # A and B were in the database before D was received
+        self.assertEqual(seen[2], 2)
+
+    async def test_disconnect_keeps_committed_batches(self):
+        body = ndjson('A', 'B', 'C')
+        _, data = await self.post([
+            {'type': 'http.request', 'body': body[:-5], 'more_body': True},
+            {'type': 'http.disconnect'},
+        ])
+        self.assertEqual(data['detail'], 'The upload was interrupted.')
+        upload = await EventUpload.objects.aget(pk=self.upload_id)
+        self.assertEqual((upload.lines, upload.created), (2, 2))
@@ -0,0 +1,153 @@
+"""
+DRF throttles on ``RateLimiter`` (see monitoring.ratelimit).
+
+Rates live in ``DEFAULT_THROTTLE_RATES`` under a scope: ``anon`` per IP
+address, and per user or ingest key the view's ``throttle_scope``, i.e.
+``query`` for reads, ``ingest`` for ingest and ``user`` otherwise. A view
+may charge more than one unit per request with ``get_throttle_cost``; the
+ingest views charge one per event.
+"""
+import hashlib
+
+from django.conf import settings
+from rest_framework import exceptions, status, throttling
+from rest_framework.settings import api_settings
+
+from .apikeys import IngestKeyIdentity, ingest_source
+from .ratelimit import RateLimiter, parse_rate
+
+
+def throttle_cost(request, view):
+    get_cost = getattr(view, 'get_throttle_cost', None)
+    return get_cost(request) if get_cost else 1
+
+
+class GCRAThrottle(throttling.BaseThrottle):
+    """
+    Base for throttles backed by ``RateLimiter``. Subclasses list the
+    ``(key, rate, cost)`` buckets a request draws from in ``get_buckets``;
+    the request is allowed only if every bucket has room for it.
+    """
+
+    def get_buckets(self, request, view):
+        raise NotImplementedError('.get_buckets() must be overridden')
+
+    def get_limits(self, request, view):
+        """The most units each bucket of ``request`` can ever grant at once."""
+        return [parse_rate(rate)[0] for _, rate, _ in self.get_buckets(request, view)]
+
+    def allow_request(self, request, view):
+        self.limiter = RateLimiter()
+        self.charged = []
+        self.decision = None
+        for key, rate, cost in self.get_buckets(request, view):
+            decision = self.limiter.consume(key, rate, cost)
+            if not decision.allowed:
+                self.decision = decision
+                self.refund()
+                return False
+            self.charged.append((key, rate, cost))
+        return True
+
+    def refund(self):
+        for key, rate, cost in self.charged:
+            self.limiter.refund(key, rate, cost)
+        self.charged = []
+
+    def wait(self):
+        return self.decision.retry_after
+
+
+class ClientRateThrottle(GCRAThrottle):
+    """One bucket per client: user or ingest key in the view's scope, IP address for anonymous requests."""
+
+    def get_buckets(self, request, view):
+        if request.user and request.user.is_authenticated:
+            scope, ident = getattr(view, 'throttle_scope', 'user'), request.user.pk
+        else:
+            scope, ident = 'anon', self.get_ident(request)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate:
+            yield f'{scope}:{ident}', rate, throttle_cost(request, view)
+
+
+class IngestKeyRateThrottle(GCRAThrottle):
+    """Each ingest key's own limits (``IngestKey.rate``). Requests without a key pass."""
+
+    def get_buckets(self, request, view):
+        identity = request.auth
+        if isinstance(identity, IngestKeyIdentity):
+            cost = throttle_cost(request, view)
+            for rate in identity.rates:
+                yield f'ingest_key:{identity.id}', rate, cost
+
+
+class SourceRateThrottle(GCRAThrottle):
+    """
+    Per-source quotas from ``THROTTLE_SOURCE_RATES``, shared by every
+    client sending events from that source. ``'*'`` sets the quota of each
+    source not listed. Views count the events per source of a request with
+    ``get_throttle_sources``.
+    """
+
+    def get_buckets(self, request, view):
+        rates = settings.THROTTLE_SOURCE_RATES
+        if not rates or not hasattr(view, 'get_throttle_sources'):
+            return
+        for source, count in view.get_throttle_sources(request).items():
+            rate = rates.get(source, rates.get('*'))
+            if rate:
+                # Sources are free text; keep them out of the cache key.
+                yield f'source:{hashlib.sha1(source.encode()).hexdigest()[:16]}', rate, count
+
+    def get_limits(self, request, view):
+        # The sources are not known before the events are read; assume the
+        # strictest quota that could apply.
+        source = ingest_source(request)
+        rates = settings.THROTTLE_SOURCE_RATES
+        if source:
+            rates = {source: rates.get(source, rates.get('*'))}
+        return [parse_rate(rate)[0] for rate in rates.values() if rate]
+
+
+class BatchThrottled(exceptions.Throttled):
+    def __init__(self, wait, available):
+        super().__init__(wait)
+        self.detail = {'detail': self.detail, 'retry_after': round(wait, 3), 'available': available}
+
+
+class BatchTooLarge(exceptions.APIException):
+    """A batch costing more than a rate's whole allowance, which no amount of waiting lets through."""
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+    def __init__(self, limit):
+        super().__init__(f'Batch exceeds the rate limit of {limit} events at once.')
+        self.detail = {'detail': self.detail, 'max_batch': limit}
+
+
+class BatchThrottleMixin:
+    """
+    Throttle checks for views charging many units per request. Throttles
+    are checked in order and a refusal refunds what earlier ones charged,
+    so a refused batch costs nothing. The ``429`` body says how many units
+    would be accepted now (``available``) and when the batch would fit
+    (``retry_after``, also sent as ``Retry-After``). A batch larger than a
+    rate allows at once gets a ``413`` with that size (``max_batch``).
+    """
+
+    def check_throttles(self, request):
+        passed = []
+        for throttle in self.get_throttles():
+            if not throttle.allow_request(request, self):
+                for earlier in passed:
+                    earlier.refund()
+                decision = throttle.decision
+                if decision.retry_after is None:
+                    raise BatchTooLarge(decision.limit)
+                raise BatchThrottled(decision.retry_after, decision.remaining)
+            passed.append(throttle)
+
+    def get_max_throttle_cost(self, request):
+        """The largest batch every throttle could ever let through at once, or ``None`` for no limit."""
+        limits = [limit for throttle in self.get_throttles() for limit in throttle.get_limits(request, self)]
+        return min(limits, default=None)
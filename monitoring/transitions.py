@@ -0,0 +1,48 @@
+"""
+Bulk alert status transitions.
+
+Alerts only move forward, from OPEN to ACKNOWLEDGED to RESOLVED (see
+``Alert.TRANSITIONS``). ``transition_alerts`` applies a target status to
+a whole queryset with one set-based UPDATE, restricted to the alerts
+allowed to reach it. Before it, the matched rows are locked (only their
+ids are read) and one conditional aggregate counts them by what the
+UPDATE will do to them, so the counts do not depend on the new status.
+"""
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .caching import bump_alert_generation
+from .live import has_subscribers, publish_alerts
+from .models import Alert
+
+
+def transition_alerts(queryset, target):
+    """
+    Move the alerts of ``queryset`` to ``target`` where the state machine
+    allows it. Returns counts of the alerts ``matched``, ``changed``,
+    ``skipped`` because they already had ``target`` and ``invalid``
+    because they cannot reach it.
+    """
+    queryset = queryset.order_by()
+    candidates = queryset.filter(status__in=Alert.TRANSITIONS[target])
+    with transaction.atomic(using=queryset.db):
+        # Locked, the rows keep their status between the count and the UPDATE.
+        list(queryset.select_for_update(of=('self',)).values_list('pk', flat=True))
+        counts = queryset.aggregate(
+            matched=Count('pk'),
+            skipped=Count('pk', filter=Q(status=target)),
+            movable=Count('pk', filter=Q(status__in=Alert.TRANSITIONS[target])),
+        )
+        # Ids are only needed to notify live stream clients.
+        ids = list(candidates.values_list('pk', flat=True)) if has_subscribers() else None
+        changed = candidates.update(status=target)
+        if changed:
+            bump_alert_generation()
+            if ids:
+                publish_alerts([], ids)
+    return {
+        'matched': counts['matched'],
+        'changed': changed,
+        'skipped': counts['skipped'],
+        'invalid': counts['matched'] - counts['skipped'] - counts['movable'],
+    }
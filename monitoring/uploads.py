@@ -0,0 +1,160 @@
+"""
+Resumable NDJSON uploads for backfills.
+
+The body is read one line at a time as it arrives, never as a whole. Every
+``UPLOAD_BATCH_SIZE`` lines are validated and inserted in one transaction
+together with the upload's progress (``EventUpload.lines``), so the
+committed offset always matches what is in the database. After a broken
+connection the client reads the offset back and sends the rest of the file
+from there. Lines it sends again from before the offset are skipped, so
+resuming never inserts an event twice.
+
+Lines may carry the ``timestamp`` the event happened at. Such events are
+filed under that time, in the partitions and rollups, and raise no alerts
+(see ``ingest_events``). Rate limits are charged one batch
+at a time, before it is committed, so a refused batch leaves the offset
+where the client resumes once its allowance is back.
+"""
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .ingest import validate_events, ingest_events
+from .models import EventUpload
+from .partitions import ensure_partitions, is_partitioned, period_start
+from .serializers import BackfillEventSerializer
+
+
+class UploadConflict(Exception):
+    """The upload's committed offset is not where this request expected it."""
+
+    def __init__(self, offset):
+        super().__init__(f'The upload is at line offset {offset}.')
+        self.offset = offset
+
+
+def body_stream(request):
+    """
+    A file-like object for the body of ``request`` (a Django request) that
+    reads as the data arrives. Django's WSGI handler reads nothing from a
+    chunked body, which has no Content-Length; servers that decode one
+    (``wsgi.input_terminated``, e.g. gunicorn) are read from directly.
+    Under ASGI the request streams its body itself, provided the view sets
+    ``stream_request_body`` (see monitoring.asgi).
+    """
+    environ = getattr(request, 'environ', {})
+    if not request.META.get('CONTENT_LENGTH') and environ.get('wsgi.input_terminated'):
+        return environ['wsgi.input']
+    return request
+
+
+def read_lines(stream, max_length):
+    """
+    Yield ``(line, complete)`` for each line of ``stream``, where
+    ``complete`` is false for a last line without a newline. Lines longer
+    than ``max_length`` bytes are read to their end and yielded as ``None``.
+    """
+    while True:
+        line = stream.readline(max_length + 1)
+        if not line:
+            return
+        if len(line) > max_length:
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(max_length)
+            yield None, line.endswith(b'\n')
+            continue
+        yield line, line.endswith(b'\n')
+
+
+def parse_line(line, max_length):
+    """Returns ``(item, error)`` for one non-blank line."""
+    if line is None:
+        return None, {'non_field_errors': [f'Line is longer than {max_length} bytes.']}
+    try:
+        return json.loads(line), None
+    except ValueError as exc:
+        return None, {'non_field_errors': [f'Invalid JSON - {exc}']}
+
+
+def commit_batch(upload, first_line, count, items, errors, source, charge=None):
+    """
+    Insert the valid ``(line, item)`` pairs of the ``count`` lines from
+    ``first_line`` on and advance the upload past them, all or nothing.
+    ``charge`` is called first with the valid events and may raise to
+    refuse them.
+    """
+    valid, invalid = validate_events(
+        [item for _, item in items], source=source, serializer_class=BackfillEventSerializer,
+    )
+    if charge and valid:
+        charge([data for _, data in valid])
+    prepare_partitions([data for _, data in valid])
+    errors = sorted(
+        errors + [{'line': items[error['index']][0], 'errors': error['errors']} for error in invalid],
+        key=lambda error: error['line'],
+    )
+    with transaction.atomic():
+        upload = EventUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.lines != first_line:
+            raise UploadConflict(upload.lines)
+        if valid:
+            ingest_events([data for _, data in valid])
+        upload.lines += count
+        upload.created += len(valid)
+        upload.failed += len(errors)
+        upload.errors = (upload.errors + errors)[:settings.UPLOAD_MAX_ERRORS]
+        upload.save()
+    return upload
+
+
+def prepare_partitions(validated_data):
+    """
+    Create the partitions backfilled events from before today fall in, so
+    they are not left in the default partition.
+    """
+    earliest = min((data['timestamp'] for data in validated_data if 'timestamp' in data), default=None)
+    interval = settings.EVENT_PARTITION_INTERVAL
+    if earliest and earliest < period_start(timezone.now(), interval) and is_partitioned():
+        ensure_partitions(since=earliest)
+
+
+def ingest_upload(upload, stream, offset, source=None, batch_size=None, max_line_length=None, charge=None):
+    """
+    Ingest the NDJSON ``stream`` into ``upload``, its first line being line
+    ``offset`` of the whole upload (counted from 0). Returns the updated
+    upload and whether the stream ended in an incomplete line, which is left
+    uncommitted to be sent again. Errors give 1-based line numbers. See
+    ``commit_batch`` for ``charge``.
+    """
+    batch_size = batch_size or settings.UPLOAD_BATCH_SIZE
+    max_line_length = max_line_length or settings.UPLOAD_MAX_LINE_BYTES
+    if offset > upload.lines:
+        raise UploadConflict(upload.lines)
+    skip = upload.lines - offset
+    first_line = upload.lines
+    count, items, errors = 0, [], []
+    truncated = False
+    for line, complete in read_lines(stream, max_line_length):
+        if skip:
+            skip -= 1
+            continue
+        if line is None or line.strip():
+            item, error = parse_line(line, max_line_length)
+            if not complete and (error or line is None):
+                # Cut off mid-line by a broken connection
+                truncated = True
+                break
+            lineno = first_line + count + 1
+            if error:
+                errors.append({'line': lineno, 'errors': error})
+            else:
+                items.append((lineno, item))
+        count += 1
+        if count == batch_size:
+            upload = commit_batch(upload, first_line, count, items, errors, source, charge)
+            first_line, count, items, errors = upload.lines, 0, [], []
+    if count:
+        upload = commit_batch(upload, first_line, count, items, errors, source, charge)
+    return upload, truncated
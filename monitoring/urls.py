@@ -1,9 +1,22 @@
 from django.urls import path
-from .views import EventIngestView, AlertListView, AlertDetailView, AlertStatusUpdateView
+from .views import (
+    EventIngestView, EventBatchIngestView, EventQueueIngestView, EventQueueStatsView, EventStatsView,
+    EventUploadView, EventExportView, AlertListView, AlertExportView, AlertStreamView, AlertDetailView, AlertStatusUpdateView,
+    AlertBulkStatusView,
+)
 
 urlpatterns = [
     path('events/', EventIngestView.as_view(), name='event_ingest'),
+    path('events/batch/', EventBatchIngestView.as_view(), name='event_batch_ingest'),
+    path('events/queue/', EventQueueIngestView.as_view(), name='event_queue_ingest'),
+    path('events/queue/stats/', EventQueueStatsView.as_view(), name='event_queue_stats'),
+    path('events/uploads/<uuid:pk>/', EventUploadView.as_view(), name='event_upload'),
+    path('events/export/', EventExportView.as_view(), name='event_export'),
+    path('stats/', EventStatsView.as_view(), name='event_stats'),
     path('alerts/', AlertListView.as_view(), name='alert_list'),
+    path('alerts/status/', AlertBulkStatusView.as_view(), name='alert_bulk_status'),
+    path('alerts/export/', AlertExportView.as_view(), name='alert_export'),
+    path('alerts/stream/', AlertStreamView.as_view(), name='alert_stream'),
     path('alerts/<int:pk>/', AlertDetailView.as_view(), name='alert_detail'),
     path('alerts/<int:pk>/status/', AlertStatusUpdateView.as_view(), name='alert_status'),
 ]
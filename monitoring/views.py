@@ -1,34 +1,476 @@
-from rest_framework import generics, permissions, filters
+import math
+import re
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse, UnreadablePostError
+from django.utils.functional import cached_property
+from rest_framework import generics, permissions, filters, status
+from rest_framework.exceptions import APIException, NotFound, UnsupportedMediaType
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import SecurityEvent, Alert
-from .serializers import SecurityEventSerializer, AlertSerializer
+from .models import SecurityEvent, Alert, QueuedEvent, EventRollup, EventUpload
+from .serializers import (
+    SecurityEventSerializer, EventValuesSerializer, AlertSerializer, AlertValuesSerializer,
+    AlertBulkStatusSerializer, EventUploadSerializer,
+)
+from .renderers import FastJSONRenderer, NDJSONRenderer, CSVRenderer
 from .permissions import IsAdminOrReadOnly
+from .apikeys import IngestKeyAuthentication, ingest_source
+from .throttling import (
+    BatchThrottled, BatchThrottleMixin, ClientRateThrottle, IngestKeyRateThrottle, SourceRateThrottle,
+)
+from .parsers import NDJSONParser
+from .search import FullTextSearchFilter
+from .filters import AlertFilter, EventFilter
+from .caching import CachedResponseMixin, AsyncCachedResponseMixin
+from .async_views import AsyncCreateAPIView, AsyncListAPIView
+from .live import alert_stream
+from .export import export_chunks, aexport_chunks
+from .ingest import validate_events, ingest_events, enqueue_events, queue_stats
+from .uploads import UploadConflict, body_stream, ingest_upload
+from .rollups import ROLLUP_DIMENSIONS, event_counts
+from .transitions import transition_alerts
+
+class IngestMixin(BatchThrottleMixin):
+    """
+    Accept ingest API keys (see monitoring.apikeys) next to JWTs, and
+    charge the ``ingest`` rate, the key's own rates and the per-source
+    quotas one unit per event. Requests made with a key may only send
+    events from the key's source.
+    """
+    authentication_classes = [*api_settings.DEFAULT_AUTHENTICATION_CLASSES, IngestKeyAuthentication]
+    throttle_classes = [ClientRateThrottle, IngestKeyRateThrottle, SourceRateThrottle]
+    throttle_scope = 'ingest'
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'ingest_source': ingest_source(self.request)}
+
+    def throttle_items(self, request):
+        # Bodies the view rejects outright are charged as one request.
+        items = request.data
+        if isinstance(items, dict):
+            return [items]
+        if isinstance(items, list) and len(items) <= settings.EVENT_BATCH_MAX_SIZE:
+            return items
+        return []
+
+    def get_throttle_cost(self, request):
+        return max(len(self.throttle_items(request)), 1)
 
-class EventIngestView(generics.CreateAPIView):
+    def get_throttle_sources(self, request):
+        return Counter(
+            item['source'] for item in self.throttle_items(request)
+            if isinstance(item, dict) and isinstance(item.get('source'), str)
+        )
+
+class EventIngestView(IngestMixin, AsyncCreateAPIView):
     queryset = SecurityEvent.objects.all()
     serializer_class = SecurityEventSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
-class AlertListView(generics.ListAPIView):
-    queryset = Alert.objects.select_related('event').all()
+class BatchPayloadMixin:
+    """
+    Shared request handling for the endpoints that accept many events at
+    once, either as a JSON array or as an NDJSON body.
+    """
+    parser_classes = (JSONParser, NDJSONParser)
+    allow_single = False
+
+    def get_batch(self, request):
+        """Return the list of raw items, or an error ``Response``."""
+        items = request.data
+        if self.allow_single and isinstance(items, dict):
+            items = [items]
+        if not isinstance(items, list):
+            return None, Response(
+                {'detail': 'Expected a list of events.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > settings.EVENT_BATCH_MAX_SIZE:
+            return None, Response(
+                {'detail': f'Batch exceeds the maximum of {settings.EVENT_BATCH_MAX_SIZE} events.'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        return items, None
+
+class EventBatchIngestView(IngestMixin, BatchPayloadMixin, generics.GenericAPIView):
+    """
+    Ingest many events per request. Invalid items are reported by index
+    and do not prevent the valid ones from being stored.
+    """
+    queryset = SecurityEvent.objects.all()
+    serializer_class = SecurityEventSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        items, error = self.get_batch(request)
+        if error:
+            return error
+
+        valid, errors = validate_events(items, source=ingest_source(request))
+        events = ingest_events([data for _, data in valid]) if valid else []
+        return Response(
+            {
+                'created': len(events),
+                'failed': len(errors),
+                'ids': [event.pk for event in events],
+                'errors': errors,
+            },
+            status=status.HTTP_201_CREATED if events else status.HTTP_400_BAD_REQUEST,
+        )
+
+class EventQueueIngestView(IngestMixin, BatchPayloadMixin, generics.GenericAPIView):
+    """
+    Accept-and-enqueue ingest: validated events are staged in the queue
+    table and written later by the ``ingest_worker`` management command.
+    """
+    queryset = QueuedEvent.objects.all()
+    serializer_class = SecurityEventSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    allow_single = True
+
+    def post(self, request, *args, **kwargs):
+        items, error = self.get_batch(request)
+        if error:
+            return error
+
+        valid, errors = validate_events(items, source=ingest_source(request))
+        if not valid:
+            return Response(
+                {'queued': 0, 'failed': len(errors), 'errors': errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        receipt = enqueue_events([data for _, data in valid])
+        return Response(
+            {'receipt': receipt, 'queued': len(valid), 'failed': len(errors), 'errors': errors},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+class EventUploadView(IngestMixin, generics.GenericAPIView):
+    """
+    Resumable NDJSON upload for backfills (see monitoring.uploads). ``POST``
+    an ``application/x-ndjson`` body, plain or chunked, to a UUID of the
+    client's choosing with ``?offset=`` set to the line number (from 0) of
+    its first line. ``GET`` reports progress, and ``offset`` is where an
+    interrupted upload resumes.
+    """
+    queryset = EventUpload.objects.all()
+    serializer_class = EventUploadSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    media_type = 'application/x-ndjson'
+    # Read the body as it arrives under ASGI too (see monitoring.asgi)
+    stream_request_body = True
+    upload_batch = None
+
+    def throttle_items(self, request):
+        # The events are not known before the body is read: the request is
+        # charged as one event, then each batch before it is committed.
+        return self.upload_batch or []
+
+    def charge_batch(self, items):
+        self.upload_batch = items
+        self.check_throttles(self.request)
+
+    def get_queryset(self):
+        return super().get_queryset().filter(owner=str(self.request.user.pk))
+
+    def get(self, request, *args, **kwargs):
+        return Response(self.get_serializer(self.get_object()).data)
+
+    def post(self, request, *args, **kwargs):
+        if request.content_type.split(';')[0].strip() != self.media_type:
+            raise UnsupportedMediaType(request.content_type)
+        offset = request.query_params.get('offset', '0')
+        if not offset.isdigit():
+            return Response({'detail': 'offset must be a line number.'}, status=status.HTTP_400_BAD_REQUEST)
+        upload, created = EventUpload.objects.get_or_create(
+            pk=kwargs['pk'], defaults={'owner': str(request.user.pk)},
+        )
+        if upload.owner != str(request.user.pk):
+            raise NotFound()
+
+        # Batches small enough for every rate limit, so none is refused for good
+        limit = self.get_max_throttle_cost(request)
+        batch_size = min(settings.UPLOAD_BATCH_SIZE, limit) if limit else settings.UPLOAD_BATCH_SIZE
+        detail = None
+        try:
+            upload, truncated = ingest_upload(
+                upload, body_stream(request._request), int(offset), source=ingest_source(request),
+                batch_size=batch_size, charge=self.charge_batch,
+            )
+        except UploadConflict as exc:
+            return Response(
+                {'detail': f'Resume from offset {exc.offset}.', 'offset': exc.offset},
+                status=status.HTTP_409_CONFLICT,
+            )
+        except BatchThrottled as exc:
+            # Stop reading; the client resumes from the committed offset.
+            upload.refresh_from_db()
+            return Response(
+                {**self.get_serializer(upload).data, **exc.detail},
+                status=exc.status_code, headers={'Retry-After': str(math.ceil(exc.wait))},
+            )
+        except UnreadablePostError:
+            # The client went away; what was committed stays.
+            upload.refresh_from_db()
+            detail = 'The upload was interrupted.'
+        else:
+            if truncated:
+                detail = 'The last line was incomplete and was not ingested.'
+        data = self.get_serializer(upload).data
+        if detail:
+            data['detail'] = detail
+        return Response(data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+class EventQueueStatsView(generics.GenericAPIView):
+    queryset = QueuedEvent.objects.all()
+    permission_classes = (permissions.IsAdminUser,)
+    throttle_scope = 'query'
+
+    def get(self, request, *args, **kwargs):
+        return Response(queue_stats())
+
+class EventStatsView(generics.GenericAPIView):
+    """
+    Event counts for a recent window, e.g. ``?window=24h&by=severity``,
+    read from the rollup tables rather than ``SecurityEvent``.
+    """
+    queryset = EventRollup.objects.all()
+    permission_classes = (permissions.IsAuthenticated,)
+    throttle_scope = 'query'
+    window_units = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+    max_window = timedelta(days=31)
+
+    def get(self, request, *args, **kwargs):
+        raw_window = request.query_params.get('window', '24h')
+        by = request.query_params.get('by', 'severity')
+        match = re.fullmatch(r'(\d+)([mhd])', raw_window)
+        window = timedelta(**{self.window_units[match[2]]: int(match[1])}) if match else None
+        if window is None or not timedelta(0) < window <= self.max_window:
+            return Response(
+                {'detail': 'window must look like 15m, 24h or 7d and be at most 31d.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if by not in ROLLUP_DIMENSIONS:
+            return Response(
+                {'detail': f"by must be one of {', '.join(ROLLUP_DIMENSIONS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = event_counts(window, by)
+        return Response({
+            'window': raw_window,
+            'by': by,
+            'total': sum(row['count'] for row in results),
+            'results': results,
+        })
+
+class ValuesReadMixin:
+    """
+    Serve reads from ``.values()`` rows through ``values_serializer_class``
+    (see ``ValuesSerializer``) and render them with orjson when available.
+    ``serializer_class`` still describes the response in the API schema.
+    """
+    values_serializer_class = None
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    @cached_property
+    def fieldset(self):
+        """The fields selected with ``?fields=`` and ``?expand=``, ``None`` for all."""
+        params = self.request.query_params
+        return self.values_serializer_class.parse_fieldset(params.get('fields'), params.get('expand'))
+
+    def get_queryset(self):
+        # Only the selected fields' columns are read.
+        return super().get_queryset().values(*self.values_serializer_class.columns(self.fieldset))
+
+    def get_serializer(self, *args, **kwargs):
+        if not getattr(self, 'swagger_fake_view', False):
+            kwargs.setdefault('fieldset', self.fieldset)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_serializer_class(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return super().get_serializer_class()
+        return self.values_serializer_class
+
+class AlertFilterMixin:
+    """The alert list's query-string filters, shared with the bulk status endpoint."""
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
+    filterset_class = AlertFilter
+    search_event_field = 'event'
+    # Only used on databases without a full-text index
+    search_fields = ['source', 'event__description', 'event_type']
+
+class ExportMixin:
+    """
+    Stream every row the request's filters match, as NDJSON or as CSV with
+    ``?format=csv`` or ``Accept: text/csv`` (see monitoring.export).
+    ``?fields=`` selects columns as on the list.
+    """
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    throttle_scope = 'query'
+    export_name = None
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        renderer = request.accepted_renderer
+        stream = aexport_chunks if isinstance(request._request, ASGIRequest) else export_chunks
+        response = StreamingHttpResponse(
+            stream(queryset, serializer, renderer, settings.EXPORT_CHUNK_SIZE),
+            content_type=f'{renderer.media_type}; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.export_name}.{renderer.format}"'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+class AlertListView(ValuesReadMixin, AlertFilterMixin, AsyncCachedResponseMixin, AsyncListAPIView):
+    queryset = Alert.objects.all()
     serializer_class = AlertSerializer
+    values_serializer_class = AlertValuesSerializer
     permission_classes = (permissions.IsAuthenticated,)
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
-    filterset_fields = ['status', 'event__severity']
-    ordering_fields = ['created_at', 'status']
-    search_fields = ['event__source', 'event__description', 'event__event_type']
+    throttle_scope = 'query'
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
+    ordering_fields = ['created_at', 'last_seen', 'status']
+    ordering = ['-created_at']
 
-class AlertDetailView(generics.RetrieveAPIView):
-    queryset = Alert.objects.select_related('event').all()
+class AlertExportView(ExportMixin, ValuesReadMixin, AlertFilterMixin, generics.GenericAPIView):
+    queryset = Alert.objects.all()
     serializer_class = AlertSerializer
+    values_serializer_class = AlertValuesSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
+    ordering_fields = ['created_at', 'last_seen', 'status']
+    ordering = ['-created_at']
+    export_name = 'alerts'
 
-class AlertStatusUpdateView(generics.UpdateAPIView):
+class EventExportView(ExportMixin, ValuesReadMixin, generics.GenericAPIView):
+    queryset = SecurityEvent.objects.all()
+    serializer_class = SecurityEventSerializer
+    values_serializer_class = EventValuesSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = EventFilter
+    export_name = 'events'
+
+    def get_queryset(self):
+        return super().get_queryset().order_by('-timestamp')
+
+class AlertStreamView(generics.GenericAPIView):
+    """
+    Server-sent events for new and updated alerts. ``?severity=`` and
+    ``?status=`` take comma-separated filters, ``Last-Event-ID`` (or
+    ``?last_event_id=``) resumes after that alert.
+    """
     queryset = Alert.objects.all()
+    permission_classes = (permissions.IsAuthenticated,)
+    throttle_scope = 'query'
+
+    def get_filter(self, request, name, choices):
+        values = {v.strip().upper() for v in request.query_params.get(name, '').split(',') if v.strip()}
+        unknown = values - {value for value, _ in choices}
+        if unknown:
+            return None, Response(
+                {'detail': f"Unknown {name}: {', '.join(sorted(unknown))}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return values or None, None
+
+    def get(self, request, *args, **kwargs):
+        if not isinstance(request._request, ASGIRequest):
+            return Response(
+                {'detail': 'The alert stream is only served by the ASGI application.'},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        severities, error = self.get_filter(request, 'severity', SecurityEvent.SEVERITY_CHOICES)
+        if error:
+            return error
+        statuses, error = self.get_filter(request, 'status', Alert.STATUS_CHOICES)
+        if error:
+            return error
+        last_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+        if last_id is not None and not last_id.isdigit():
+            return Response({'detail': 'Invalid last event id.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            alert_stream(int(last_id) if last_id else None, severities, statuses),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+class AlertDetailView(ValuesReadMixin, CachedResponseMixin, generics.RetrieveAPIView):
+    queryset = Alert.objects.all()
+    serializer_class = AlertSerializer
+    values_serializer_class = AlertValuesSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    throttle_scope = 'query'
+
+class AlertBulkStatusView(AlertFilterMixin, generics.GenericAPIView):
+    """
+    Move many alerts to a new status in one UPDATE. The body names the
+    target ``status`` and either the alert ``ids`` or nothing else, in which
+    case every alert matched by the query string is moved. The query string
+    takes the same filters as the alert list, e.g.
+    ``?event__severity=CRITICAL&search=ransomware``.
+    """
+    queryset = Alert.objects.all()
+    serializer_class = AlertBulkStatusSerializer
+    permission_classes = (permissions.IsAdminUser,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        target = serializer.validated_data['status']
+        ids = serializer.validated_data.get('ids')
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        elif not queryset.query.has_filters():
+            return Response(
+                {'detail': 'Give alert ids or at least one filter.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        result = {'status': target, **transition_alerts(queryset, target)}
+        if ids is not None:
+            result['not_found'] = len(set(ids)) - result['matched']
+        return Response(result)
+
+class AlertConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+
+    def __init__(self, alert_id):
+        super().__init__(f'Alert {alert_id} is open for the same events.')
+        self.detail = {'detail': self.detail, 'alert': alert_id}
+
+class AlertStatusUpdateView(generics.UpdateAPIView):
+    # The response embeds the event, load it with the alert
+    queryset = Alert.objects.select_related('event')
     serializer_class = AlertSerializer
     permission_classes = (permissions.IsAdminUser,)
     http_method_names = ['patch']
 
     def perform_update(self, serializer):
         # Only allow updating status
-        serializer.save()
+        if serializer.validated_data.get('status') != 'OPEN':
+            serializer.save()
+            return
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            # Reopened while a newer open alert holds its fingerprint
+            # (alert_open_fingerprint_uniq); that one counts its events now.
+            alert = serializer.instance
+            open_alert = Alert.objects.filter(fingerprint=alert.fingerprint, status='OPEN')
+            raise AlertConflict(open_alert.values_list('pk', flat=True).first())
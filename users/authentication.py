@@ -0,0 +1,120 @@
+"""
+Stateless JWT authentication.
+
+Access tokens carry the user's ``role`` and ``is_staff`` next to the user
+id (see users.tokens), so ``CachedJWTAuthentication`` authenticates a
+request without loading the user row. It still rejects tokens of users who
+were deleted, deactivated, had their tokens revoked or their role changed,
+by checking the token against the user's status: a few columns held in a
+per-process LRU of ``AUTH_USER_CACHE_SIZE`` users for at most
+``AUTH_USER_CACHE_TTL`` seconds. The refresh view checks refresh tokens
+the same way (see users.serializers). Saving or deleting a user bumps a version
+in the shared cache, which drops every cached status in all processes.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+
+from .tokens import USER_CLAIMS
+
+AUTH_VERSION_KEY = 'users:auth:version'
+STATUS_FIELDS = ('is_active', 'role', 'is_staff', 'tokens_revoked_at')
+
+_statuses = OrderedDict()
+_lock = threading.Lock()
+
+
+class ClaimsUser(TokenUser):
+    """User built from token claims. Enough for the role and staff checks of the API."""
+
+    @cached_property
+    def role(self):
+        return self.token.get('role', '')
+
+
+def auth_version():
+    # Seeded from the clock so a version lost to eviction or a cache clear
+    # never comes back at a value cached statuses were stored under.
+    return cache.get_or_set(AUTH_VERSION_KEY, time.time_ns, timeout=None)
+
+
+def user_status(user_id):
+    """The user's ``STATUS_FIELDS`` as a dict, or ``None`` if there is no such user."""
+    user_id = str(user_id)  # as the token's claim has it
+    version = auth_version()
+    now = time.monotonic()
+    with _lock:
+        entry = _statuses.get(user_id)
+        if entry is not None and entry[0] == version and now - entry[1] < settings.AUTH_USER_CACHE_TTL:
+            _statuses.move_to_end(user_id)
+            return entry[2]
+    status = get_user_model().objects.filter(pk=user_id).values(*STATUS_FIELDS).first()
+    with _lock:
+        _statuses[user_id] = (version, now, status)
+        _statuses.move_to_end(user_id)
+        while len(_statuses) > settings.AUTH_USER_CACHE_SIZE:
+            _statuses.popitem(last=False)
+    return status
+
+
+def check_token_status(token, status):
+    """
+    Raise ``AuthenticationFailed`` unless ``token`` is still good for the
+    user whose ``user_status()`` is ``status``.
+    """
+    if status is None:
+        raise AuthenticationFailed(_('User not found'), code='user_not_found')
+    if not status['is_active']:
+        raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+    revoked_at = status['tokens_revoked_at']
+    # ``iat`` has whole seconds, so tokens issued in the second of the
+    # revocation stay valid rather than rejecting those issued after it.
+    if revoked_at is not None and token.get('iat', 0) < int(revoked_at.timestamp()):
+        raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+    if any(claim in token and token[claim] != status[claim] for claim in USER_CLAIMS):
+        raise AuthenticationFailed(_('Token is out of date, log in again'), code='token_stale')
+
+
+class CachedJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication that returns a ``ClaimsUser`` (``TOKEN_USER_CLASS``)
+    instead of querying the user table, see the module docstring. Tokens issued without the claims
+    fall back to loading the user.
+    """
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in USER_CLAIMS):
+            return JWTAuthentication.get_user(self, validated_token)
+        user = super().get_user(validated_token)
+        check_token_status(validated_token, user_status(user.id))
+        return user
+
+
+def bump_auth_version():
+    try:
+        cache.incr(AUTH_VERSION_KEY)
+    except ValueError:
+        cache.set(AUTH_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_status(sender, instance, created=False, update_fields=None, **kwargs):
+    # New users hold no tokens yet and logins only touch last_login.
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    with _lock:
+        _statuses.pop(str(instance.pk), None)
+    transaction.on_commit(bump_auth_version)
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 class User(AbstractUser):
     ROLE_CHOICES = (
@@ -7,8 +8,15 @@ class User(AbstractUser):
         ('ANALYST', 'Analyst'),
     )
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='ANALYST')
+    # Tokens issued before this are rejected (see users.authentication)
+    tokens_revoked_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     def save(self, *args, **kwargs):
         if self.is_superuser:
             self.role = 'ADMIN'
         super().save(*args, **kwargs)
+
+    def revoke_tokens(self):
+        """Invalidate every token issued to the user so far."""
+        self.tokens_revoked_at = timezone.now()
+        self.save(update_fields=['tokens_revoked_at'])
@@ -1,5 +1,9 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .authentication import check_token_status, user_status
 from .models import User
+from .tokens import ClaimsRefreshToken
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -16,3 +20,20 @@ class UserSerializer(serializers.ModelSerializer):
             role=validated_data.get('role', 'ANALYST')
         )
         return user
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Login that issues tokens carrying the user's role and staff flag."""
+    token_class = ClaimsRefreshToken
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh that rejects tokens of deleted or inactive users, tokens issued
+    before the user's tokens were revoked and tokens whose claims are stale.
+    """
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        check_token_status(refresh, user_status(user_id) if user_id is not None else None)
+        return super().validate(attrs)
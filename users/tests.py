@@ -1,7 +1,19 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.request import Request
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken, UntypedToken
 from django.contrib.auth import get_user_model
+from monitoring.permissions import IsAdminOrReadOnly
+from .authentication import CachedJWTAuthentication, ClaimsUser
 
 User = get_user_model()
 
@@ -51,3 +63,122 @@ class AuthTests(APITestCase):
         }
         response = self.client.post(self.login_url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(ALERT_CACHE_TIMEOUT=0)
+class ClaimsAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.analyst = User.objects.create_user(username='analyst', password='password123', role='ANALYST')
+        self.admin = User.objects.create_user(
+            username='boss', password='password123', role='ADMIN', is_staff=True
+        )
+
+    def login(self, username):
+        response = self.client.post(reverse('token_obtain_pair'), {'username': username, 'password': 'password123'})
+        return response.data
+
+    def get_alerts(self, access):
+        return self.client.get(reverse('alert_list'), HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def user_queries(self, access):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.get_alerts(access)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [q['sql'] for q in ctx.captured_queries if User._meta.db_table in q['sql']]
+
+    def test_tokens_carry_claims(self):
+        tokens = self.login('boss')
+        for kind in ('access', 'refresh'):
+            payload = UntypedToken(tokens[kind]).payload
+            self.assertEqual((payload['role'], payload['is_staff']), ('ADMIN', True))
+        refreshed = self.client.post(reverse('token_refresh'), {'refresh': tokens['refresh']}).data['access']
+        self.assertEqual(UntypedToken(refreshed)['role'], 'ADMIN')
+
+    def test_no_user_query_once_status_is_cached(self):
+        access = self.login('analyst')['access']
+        self.assertEqual(len(self.user_queries(access)), 1)
+        self.assertEqual(self.user_queries(access), [])
+
+    def test_tokens_without_claims_load_the_user(self):
+        access = AccessToken.for_user(self.analyst)
+        self.assertEqual(len(self.user_queries(access)), 1)
+        self.assertEqual(len(self.user_queries(access)), 1)
+
+    def test_deactivation_revocation_and_role_change(self):
+        access = self.login('analyst')['access']
+        self.assertEqual(self.get_alerts(access).status_code, status.HTTP_200_OK)
+
+        self.analyst.is_active = False
+        self.analyst.save()
+        self.assertEqual(self.get_alerts(access).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.analyst.is_active = True
+        self.analyst.save()
+        self.assertEqual(self.get_alerts(access).status_code, status.HTTP_200_OK)
+
+        self.analyst.role = 'ADMIN'
+        self.analyst.save()
+        self.assertEqual(self.get_alerts(access).status_code, status.HTTP_401_UNAUTHORIZED)
+        access = self.login('analyst')['access']
+        self.assertEqual(self.get_alerts(access).status_code, status.HTTP_200_OK)
+
+        # Tokens are issued with second precision.
+        self.analyst.tokens_revoked_at = timezone.now() + timedelta(seconds=1)
+        self.analyst.save()
+        self.assertEqual(self.get_alerts(access).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user(self):
+        access = self.login('analyst')['access']
+        self.analyst.delete()
+        self.assertEqual(self.get_alerts(access).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def refresh(self, refresh):
+        return self.client.post(reverse('token_refresh'), {'refresh': refresh})
+
+    def test_refresh_checks_user_status(self):
+        tokens = self.login('analyst')
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, status.HTTP_200_OK)
+
+        self.analyst.is_active = False
+        self.analyst.save()
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.analyst.is_active = True
+        self.analyst.save()
+
+        self.analyst.role = 'ADMIN'
+        self.analyst.save()
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, status.HTTP_401_UNAUTHORIZED)
+        tokens = self.login('analyst')
+
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(seconds=1)):
+            self.analyst.revoke_tokens()
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.analyst.delete()
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_issued_in_the_second_of_the_revocation(self):
+        tokens = self.login('analyst')
+        # Revoked at the very start of the second the tokens were issued in.
+        issued = UntypedToken(tokens['access'])['iat']
+        self.analyst.tokens_revoked_at = datetime.fromtimestamp(issued, dt_timezone.utc) + timedelta(microseconds=1)
+        self.analyst.save()
+        self.assertEqual(self.get_alerts(tokens['access']).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, status.HTTP_200_OK)
+
+    def test_admin_permissions(self):
+        admin_access = self.login('boss')['access']
+        analyst_access = self.login('analyst')['access']
+        url = reverse('alert_bulk_status')
+        body = {'status': 'RESOLVED', 'ids': [1]}
+        response = self.client.post(url, body, format='json', HTTP_AUTHORIZATION=f'Bearer {analyst_access}')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.post(url, body, format='json', HTTP_AUTHORIZATION=f'Bearer {admin_access}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        permission = IsAdminOrReadOnly()
+        for access, allowed in ((admin_access, True), (analyst_access, False)):
+            request = Request(RequestFactory().post('/', HTTP_AUTHORIZATION=f'Bearer {access}'),
+                              authenticators=[CachedJWTAuthentication()])
+            self.assertIsInstance(request.user, ClaimsUser)
+            self.assertEqual(permission.has_permission(request, None), allowed)
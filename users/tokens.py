@@ -0,0 +1,26 @@
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+# Claims users.authentication.CachedJWTAuthentication builds the user from
+USER_CLAIMS = ('role', 'is_staff')
+
+
+def add_user_claims(token, user):
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token carrying ``USER_CLAIMS``, which its access tokens inherit."""
+
+    @classmethod
+    def for_user(cls, user):
+        return add_user_claims(super().for_user(user), user)
+
+
+class ClaimsAccessToken(AccessToken):
+    """Access token carrying ``USER_CLAIMS``."""
+
+    @classmethod
+    def for_user(cls, user):
+        return add_user_claims(super().for_user(user), user)